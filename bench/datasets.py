@@ -0,0 +1,142 @@
+"""压测数据集: 读写录制的 Gamma 响应 (gzip JSON)，以及确定性的合成市场数据
+
+目录结构 (bench/fixtures/<名称>/):
+- meta.json            录制时间、来源与条数
+- markets.json.gz      /markets 原始记录列表
+- tags.json.gz         /tags 原始响应
+- tag_members.json.gz  {tag_id: [market id, ...]} (录制时按预设用到的品类逐个拉取)
+"""
+import os
+import json
+import gzip
+import random
+from datetime import datetime, timedelta, timezone
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+
+def _read_gz(path, default=None):
+    if not os.path.exists(path):
+        return default
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _write_gz(path, data):
+    with gzip.open(path, "wt", encoding="utf-8", compresslevel=6) as f:
+        json.dump(data, f, ensure_ascii=False, separators=(",", ":"))
+
+
+def save_fixture(path, markets, tags, tag_members, source=""):
+    os.makedirs(path, exist_ok=True)
+    _write_gz(os.path.join(path, "markets.json.gz"), markets)
+    _write_gz(os.path.join(path, "tags.json.gz"), tags)
+    _write_gz(os.path.join(path, "tag_members.json.gz"), tag_members)
+    meta = {
+        "recorded_at": datetime.now(timezone.utc).isoformat(),
+        "source": source,
+        "markets": len(markets),
+        "tags": len(tags),
+    }
+    with open(os.path.join(path, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump(meta, f, ensure_ascii=False, indent=2)
+    return meta
+
+
+def _shift_iso(value, delta):
+    """把 ISO 时间串平移 delta，保持原有格式；无法解析的原样返回"""
+    if not isinstance(value, str) or not value[:1].isdigit():
+        return value
+    try:
+        if len(value) == 10:
+            return (datetime.strptime(value, "%Y-%m-%d") + delta).strftime("%Y-%m-%d")
+        ts = datetime.fromisoformat(value.replace("Z", "+00:00")) + delta
+    except ValueError:
+        return value
+    text = ts.isoformat()
+    return text.replace("+00:00", "Z") if value.endswith("Z") else text
+
+
+def load_fixture(path, shift_dates=True):
+    """读取录制的数据集，返回 (markets, tags, tag_members)
+
+    shift_dates=True 时把 endDate / updatedAt 按 (现在 - 录制时间) 平移，
+    使 "N 天内结盘" 之类的过滤在任何时候重放都得到与录制时相同的结果。
+    """
+    with open(os.path.join(path, "meta.json"), "r", encoding="utf-8") as f:
+        meta = json.load(f)
+    markets = _read_gz(os.path.join(path, "markets.json.gz"), [])
+    tags = _read_gz(os.path.join(path, "tags.json.gz"), [])
+    tag_members = _read_gz(os.path.join(path, "tag_members.json.gz"), {})
+    if shift_dates and meta.get("recorded_at"):
+        delta = datetime.now(timezone.utc) - datetime.fromisoformat(meta["recorded_at"])
+        for m in markets:
+            for key in ("endDate", "updatedAt"):
+                if key in m:
+                    m[key] = _shift_iso(m[key], delta)
+    return markets, tags, tag_members
+
+
+# ---------- 合成数据 ----------
+
+SYNTHETIC_TAGS = [
+    ("2", "Politics"), ("1", "Sports"), ("235", "Crypto"), ("107", "Business"), ("74", "Science"),
+    ("596", "Pop Culture"), ("620", "Bitcoin"), ("21", "Crypto Prices"), ("144", "Elections"), ("450", "NFL"),
+]
+WORDS = ("Bitcoin BTC ETH Ethereum Solana SOL ETF Price Airdrop Token Layer Stablecoin Trump Election Senate "
+         "NFL Super Bowl Earnings EPS Revenue Beat Q1 Q2 Q3 Q4 Report Quarterly NFT Memecoin Ordinals Fed Rate "
+         "Apple Nvidia Tesla GTA Oscars Champions League ATH Market Cap").split()
+
+
+def synthetic_markets(n, seed=7, now=None):
+    """生成 n 个字段与体积接近真实 /markets 响应的市场 (同一 seed 结果完全相同，时间相对 now)"""
+    rnd = random.Random(seed)
+    now = now or datetime.now(timezone.utc)
+    tags = [{"id": tag_id, "label": label, "slug": label.lower().replace(" ", "-")} for tag_id, label in SYNTHETIC_TAGS]
+    members = {tag_id: [] for tag_id, _ in SYNTHETIC_TAGS}
+    markets = []
+    for i in range(n):
+        words = rnd.sample(WORDS, 4)
+        p = rnd.random()
+        r = rnd.random()
+        end = now + timedelta(hours=rnd.uniform(-48, 24 * 400))
+        if r < 0.04:
+            end_str = ""
+        elif r < 0.08:
+            end_str = end.strftime("%Y-%m-%d")
+        else:
+            end_str = end.strftime("%Y-%m-%dT%H:%M:%SZ")
+        volume = rnd.lognormvariate(8, 2.5)
+        liquidity = rnd.lognormvariate(6, 2)
+        event_id = str(100000 + i // rnd.choice((1, 2, 4)))
+        slug = f"{'-'.join(w.lower() for w in words)}-{i}"
+        market_id = str(500000 + i)
+        markets.append({
+            "id": market_id,
+            "question": f"Will {' '.join(words[:3])} happen by {end.strftime('%B %d')}? #{i}",
+            "conditionId": f"0x{rnd.getrandbits(256):064x}",
+            "slug": slug,
+            "description": (f"This market will resolve to \"Yes\" if {' '.join(words)} happens before the end date. "
+                            "Otherwise it resolves to \"No\". The resolution source is the official announcement. ") * 2,
+            "outcomes": '["Yes", "No"]',
+            "outcomePrices": json.dumps([f"{p:.4f}", f"{1 - p:.4f}"]) if rnd.random() > 0.02 else "",
+            "volume": f"{volume:.6f}",
+            "volumeNum": volume,
+            "volume24hr": volume * rnd.random() * 0.05,
+            "liquidity": f"{liquidity:.6f}",
+            "liquidityNum": liquidity,
+            "endDate": end_str,
+            "startDate": (now - timedelta(days=rnd.uniform(1, 200))).strftime("%Y-%m-%dT%H:%M:%SZ"),
+            "updatedAt": (now - timedelta(minutes=rnd.uniform(0, 10000))).strftime("%Y-%m-%dT%H:%M:%S.%fZ"),
+            "active": True,
+            "closed": rnd.random() < 0.01,
+            "archived": False,
+            "image": f"https://polymarket-upload.s3.us-east-2.amazonaws.com/{slug}.png",
+            "icon": f"https://polymarket-upload.s3.us-east-2.amazonaws.com/{slug}-icon.png",
+            "clobTokenIds": json.dumps([str(rnd.getrandbits(250)), str(rnd.getrandbits(250))]),
+            "oneDayPriceChange": round(rnd.uniform(-0.1, 0.1), 4),
+            "events": [{"id": event_id, "slug": f"event-{event_id}", "title": f"Event {event_id}: {words[0]}"}],
+        })
+        for tag_id, _ in rnd.sample(SYNTHETIC_TAGS, 2):
+            members[tag_id].append(market_id)
+    return markets, tags, members
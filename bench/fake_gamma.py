@@ -0,0 +1,289 @@
+"""本地 Gamma API 替身: 用录制或合成的数据集提供 /markets、/events、/tags，供离线压测与复现
+
+按 Gamma 的查询语义在本地筛选、排序、分页 (active / closed / tag_id / volume_num_min / liquidity_num_min /
+end_date_max / order / ascending / limit / offset)，并可注入延迟、页大小上限、5xx 与 429 (带 Retry-After)。
+同一查询条件的筛选排序结果会缓存，翻页只做切片与拼接预先编码好的 JSON。
+
+    python bench/fake_gamma.py --synthetic 100000 --latency 0.05
+    python bench/fake_gamma.py --fixtures bench/fixtures/live --throttle-rate 0.05
+
+统计: GET /__bench/stats (请求数、状态码分布、发送字节数)，GET /__bench/reset 清零。
+"""
+import os
+import sys
+import json
+import gzip
+import time
+import random
+import argparse
+import threading
+from collections import OrderedDict
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from datasets import load_fixture, synthetic_markets  # noqa: E402
+
+
+def _num(value):
+    try:
+        return float(value or 0)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def _encode(obj):
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":"))
+
+
+class Dataset:
+    """数据集与查询结果缓存 (线程安全)"""
+
+    def __init__(self, markets, tags, tag_members):
+        self.markets = markets
+        self.encoded = [_encode(m) for m in markets]
+        self.tags_body = _encode(tags).encode("utf-8")
+        self.members = {str(k): set(map(str, v)) for k, v in tag_members.items()}
+        self._events = None
+        self._lock = threading.Lock()
+        self._cache = OrderedDict()
+
+    # ---------- /markets ----------
+
+    def _select_markets(self, q):
+        items = range(len(self.markets))
+        ms = self.markets
+        if q.get("active") == "true":
+            items = [i for i in items if ms[i].get("active", True) is not False]
+        if q.get("closed") == "false":
+            items = [i for i in items if not ms[i].get("closed")]
+        if "tag_id" in q:
+            members = self.members.get(q["tag_id"], set())
+            items = [i for i in items if str(ms[i].get("id")) in members]
+        if "volume_num_min" in q:
+            v = float(q["volume_num_min"])
+            items = [i for i in items if _num(ms[i].get("volumeNum", ms[i].get("volume"))) >= v]
+        if "liquidity_num_min" in q:
+            v = float(q["liquidity_num_min"])
+            items = [i for i in items if _num(ms[i].get("liquidityNum", ms[i].get("liquidity"))) >= v]
+        if "end_date_max" in q:
+            v = q["end_date_max"]
+            items = [i for i in items if str(ms[i].get("endDate") or "")[:1].isdigit() and ms[i]["endDate"] <= v]
+        if "end_date_min" in q:
+            v = q["end_date_min"]
+            items = [i for i in items if str(ms[i].get("endDate") or "")[:1].isdigit() and ms[i]["endDate"] >= v]
+        return self._order(list(items), ms, q, {"volume": "volumeNum", "liquidity": "liquidityNum"})
+
+    @staticmethod
+    def _order(items, rows, q, numeric):
+        order = q.get("order")
+        if not order:
+            return items
+        reverse = q.get("ascending") != "true"
+        if order in numeric:
+            key = lambda i: _num(rows[i].get(numeric[order], rows[i].get(order)))
+        else:
+            key = lambda i: str(rows[i].get(order) or "")
+        return sorted(items, key=key, reverse=reverse)
+
+    # ---------- /events ----------
+
+    def _build_events(self):
+        events = OrderedDict()
+        for m in self.markets:
+            ev = (m.get("events") or [None])[0]
+            if not isinstance(ev, dict) or not ev.get("id"):
+                continue
+            entry = events.get(ev["id"])
+            if entry is None:
+                entry = events[ev["id"]] = {"id": ev["id"], "slug": ev.get("slug", ""), "title": ev.get("title", ""),
+                                            "volume": 0.0, "liquidity": 0.0, "endDate": "", "closed": True,
+                                            "active": True, "markets": [], "_tags": set()}
+            entry["markets"].append({k: v for k, v in m.items() if k != "events"})
+            entry["volume"] += _num(m.get("volumeNum", m.get("volume")))
+            entry["liquidity"] += _num(m.get("liquidityNum", m.get("liquidity")))
+            entry["closed"] = entry["closed"] and bool(m.get("closed"))
+            end = str(m.get("endDate") or "")
+            if end[:1].isdigit():
+                entry["endDate"] = max(entry["endDate"], end)
+        for tag_id, members in self.members.items():
+            for entry in events.values():
+                if any(str(m.get("id")) in members for m in entry["markets"]):
+                    entry["_tags"].add(tag_id)
+        rows = list(events.values())
+        encoded = [_encode({k: v for k, v in e.items() if k != "_tags"}) for e in rows]
+        return rows, encoded
+
+    def _select_events(self, q):
+        if self._events is None:
+            self._events = self._build_events()
+        rows, _ = self._events
+        items = range(len(rows))
+        if q.get("closed") == "false":
+            items = [i for i in items if not rows[i]["closed"]]
+        if "tag_id" in q:
+            items = [i for i in items if q["tag_id"] in rows[i]["_tags"]]
+        if "volume_min" in q:
+            items = [i for i in items if rows[i]["volume"] >= float(q["volume_min"])]
+        if "liquidity_min" in q:
+            items = [i for i in items if rows[i]["liquidity"] >= float(q["liquidity_min"])]
+        if "end_date_max" in q:
+            items = [i for i in items if rows[i]["endDate"] and rows[i]["endDate"] <= q["end_date_max"]]
+        return self._order(list(items), rows, q, {"volume": "volume", "liquidity": "liquidity"})
+
+    # ---------- 分页 ----------
+
+    def page(self, endpoint, q, page_size):
+        """返回 JSON 数组正文 (bytes)；同一筛选条件的结果缓存，翻页只切片"""
+        key = (endpoint,) + tuple(sorted((k, v) for k, v in q.items() if k not in ("limit", "offset")))
+        with self._lock:
+            selected = self._cache.get(key)
+            if selected is not None:
+                self._cache.move_to_end(key)
+        if selected is None:
+            selected = self._select_events(q) if endpoint == "events" else self._select_markets(q)
+            with self._lock:
+                self._cache[key] = selected
+                while len(self._cache) > 64:
+                    self._cache.popitem(last=False)
+        encoded = self._events[1] if endpoint == "events" else self.encoded
+        offset = int(q.get("offset", 0) or 0)
+        limit = min(int(q.get("limit", 100) or 100), page_size)
+        return ("[" + ",".join(encoded[i] for i in selected[offset:offset + limit]) + "]").encode("utf-8")
+
+
+class FakeGammaServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, dataset, latency=0.0, jitter=0.0, page_size=500, error_rate=0.0,
+                 throttle_rate=0.0, retry_after=1.0, gzip_responses=True, seed=7):
+        super().__init__(address, FakeGammaHandler)
+        self.dataset = dataset
+        self.latency = latency
+        self.jitter = jitter
+        self.page_size = page_size
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.retry_after = retry_after
+        self.gzip_responses = gzip_responses
+        self.rnd = random.Random(seed)
+        self.stats_lock = threading.Lock()
+        self.reset_stats()
+
+    def reset_stats(self):
+        with self.stats_lock:
+            self.stats = {"requests": 0, "bytes_sent": 0, "by_path": {}, "by_status": {}}
+
+    def record(self, path, status, nbytes):
+        with self.stats_lock:
+            self.stats["requests"] += 1
+            self.stats["bytes_sent"] += nbytes
+            self.stats["by_path"][path] = self.stats["by_path"].get(path, 0) + 1
+            self.stats["by_status"][str(status)] = self.stats["by_status"].get(str(status), 0) + 1
+
+    def inject(self):
+        """按概率返回注入的故障: None / 'error' / 'throttle'"""
+        with self.stats_lock:
+            r = self.rnd.random()
+        if r < self.throttle_rate:
+            return "throttle"
+        if r < self.throttle_rate + self.error_rate:
+            return "error"
+        return None
+
+
+class FakeGammaHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def _send(self, status, body, content_type="application/json", headers=None, record=True):
+        if self.server.gzip_responses and len(body) > 1024 and "gzip" in self.headers.get("Accept-Encoding", ""):
+            body = gzip.compress(body, compresslevel=1)
+            headers = {**(headers or {}), "Content-Encoding": "gzip"}
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.end_headers()
+        self.wfile.write(body)
+        if record:
+            self.server.record(urlparse(self.path).path, status, len(body))
+
+    def do_GET(self):
+        server = self.server
+        url = urlparse(self.path)
+        q = {k: v[0] for k, v in parse_qs(url.query).items()}
+
+        if url.path == "/__bench/stats":
+            with server.stats_lock:
+                body = _encode(server.stats).encode("utf-8")
+            return self._send(200, body, record=False)
+        if url.path == "/__bench/reset":
+            server.reset_stats()
+            return self._send(200, b"{}", record=False)
+
+        if server.latency or server.jitter:
+            time.sleep(server.latency + (server.rnd.random() * server.jitter if server.jitter else 0))
+
+        fault = server.inject()
+        if fault == "throttle":
+            return self._send(429, b"<html><body>Too Many Requests</body></html>", "text/html",
+                              {"Retry-After": f"{server.retry_after:g}"})
+        if fault == "error":
+            return self._send(502, b"<html><body>502 Bad Gateway</body></html>", "text/html")
+
+        if url.path == "/tags":
+            return self._send(200, server.dataset.tags_body)
+        if url.path in ("/markets", "/events"):
+            try:
+                body = server.dataset.page(url.path.strip("/"), q, server.page_size)
+            except ValueError as e:
+                return self._send(422, _encode({"error": str(e)}).encode("utf-8"))
+            return self._send(200, body)
+        return self._send(404, b'{"error":"not found"}')
+
+
+def build_dataset(fixtures=None, synthetic=0, seed=7, shift_dates=True):
+    if fixtures:
+        markets, tags, members = load_fixture(fixtures, shift_dates=shift_dates)
+    else:
+        markets, tags, members = synthetic_markets(synthetic or 20000, seed=seed)
+    return Dataset(markets, tags, members)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="本地 Gamma API 替身 (离线压测)")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--fixtures", help="录制的数据集目录 (bench/record.py 生成)")
+    parser.add_argument("--synthetic", type=int, default=0, help="不使用录制数据时合成的市场数 (默认 20000)")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--no-shift-dates", action="store_true", help="不按录制时间平移日期")
+    parser.add_argument("--latency", type=float, default=0.0, help="每个请求的固定延迟 (秒)")
+    parser.add_argument("--jitter", type=float, default=0.0, help="额外随机延迟上限 (秒)")
+    parser.add_argument("--page-size", type=int, default=500, help="单页条数上限")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="返回 502 的概率")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="返回 429 的概率")
+    parser.add_argument("--retry-after", type=float, default=1.0, help="429 响应的 Retry-After (秒)")
+    parser.add_argument("--no-gzip", action="store_true", help="不压缩响应")
+    args = parser.parse_args(argv)
+
+    t0 = time.time()
+    dataset = build_dataset(args.fixtures, args.synthetic, args.seed, not args.no_shift_dates)
+    server = FakeGammaServer((args.host, args.port), dataset, latency=args.latency, jitter=args.jitter,
+                             page_size=args.page_size, error_rate=args.error_rate,
+                             throttle_rate=args.throttle_rate, retry_after=args.retry_after,
+                             gzip_responses=not args.no_gzip, seed=args.seed)
+    print(f"fake gamma: {len(dataset.markets)} markets, ready in {time.time() - t0:.1f}s, "
+          f"listening on http://{args.host}:{server.server_address[1]}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
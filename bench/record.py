@@ -0,0 +1,97 @@
+"""录制 Gamma API 响应为压测数据集 (bench/fixtures/<名称>/)，供 fake_gamma.py 离线重放
+
+- /markets: active=true&closed=false 按成交量降序翻页，最多 --limit 条
+- /tags: 完整标签列表
+- 品类成员: presets/ 中用到的每个 SCOUT_TAG 按 tag_id 翻页，记录其市场 id (成员市场一并收入数据集)
+
+    python bench/record.py --limit 20000 --name live
+"""
+import os
+import sys
+import glob
+import json
+import time
+import argparse
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from rich.console import Console  # noqa: E402
+
+from http_client import client as http, GAMMA_API  # noqa: E402
+from tag_index import TagIndex, fetch_tags  # noqa: E402
+from datasets import FIXTURES_DIR, save_fixture  # noqa: E402
+
+PAGE_SIZE = 500
+console = Console()
+
+
+def fetch_all(query, limit):
+    """顺序翻页拉取 /markets，返回原始记录列表"""
+    rows = []
+    offset = 0
+    while offset < limit:
+        page = http.get_json(f"{GAMMA_API}/markets?{query}&limit={PAGE_SIZE}&offset={offset}",
+                             timeout=30, conditional=False)
+        if not isinstance(page, list) or not page:
+            break
+        rows.extend(page)
+        offset += len(page)
+        if len(page) < PAGE_SIZE:
+            break
+    return rows[:limit]
+
+
+def preset_tags():
+    """presets/ 中用到的全部品类 (名称或 id)"""
+    names = set()
+    for path in glob.glob(os.path.join(REPO_DIR, "presets", "*.json")):
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                tag = str(json.load(f).get("SCOUT_TAG") or "")
+        except (OSError, ValueError):
+            continue
+        names.update(t.strip() for t in tag.split(",") if t.strip())
+    return sorted(names)
+
+
+def record(name, limit, tag_limit):
+    t0 = time.time()
+    console.print(f"[cyan]📼 录制 {GAMMA_API} -> bench/fixtures/{name}[/cyan]")
+    tags = fetch_tags()
+    index = TagIndex(tags, time.time())
+
+    markets = {}
+    for m in fetch_all("active=true&closed=false&order=volume&ascending=false", limit):
+        markets[str(m.get("id"))] = m
+    console.print(f"  /markets: {len(markets)} 条")
+
+    members = {}
+    for tag in preset_tags():
+        tag_id = tag if tag.isdigit() else index.lookup(tag)[0]
+        if tag_id is None:
+            console.print(f"  [yellow]⚠️ 品类 {tag} 未找到，跳过[/yellow]")
+            continue
+        rows = fetch_all(f"active=true&closed=false&tag_id={tag_id}&order=volume&ascending=false", tag_limit)
+        for m in rows:
+            markets.setdefault(str(m.get("id")), m)
+        members[str(tag_id)] = [str(m.get("id")) for m in rows]
+        console.print(f"  品类 {tag} (tag_id={tag_id}): {len(rows)} 条")
+
+    path = os.path.join(FIXTURES_DIR, name)
+    meta = save_fixture(path, list(markets.values()), tags, members, source=GAMMA_API)
+    console.print(f"[green]✅ 已保存 {meta['markets']} 个市场、{meta['tags']} 个标签，用时 {time.time() - t0:.1f}s[/green]")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="录制 Gamma API 响应为离线压测数据集")
+    parser.add_argument("--name", default="live", help="数据集名称 (bench/fixtures/<名称>)")
+    parser.add_argument("--limit", type=int, default=20000, help="/markets 最多录制条数")
+    parser.add_argument("--tag-limit", type=int, default=10000, help="每个品类最多录制条数")
+    args = parser.parse_args(argv)
+    record(args.name, args.limit, args.tag_limit)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,321 @@
+"""离线压测: 启动本地 Gamma 替身 (fake_gamma.py)，按预设 × 拉取规模逐个运行完整侦察并汇总性能
+
+每次侦察在独立子进程中运行 scout.scout() (拉取 -> 过滤 -> 排序 -> 表格 -> markets_list.txt)，记录:
+- 端到端耗时、市场/秒、峰值内存 (ru_maxrss)、替身服务收到的请求数
+- result.metrics 中的分阶段耗时 (fetch / parse / filter / render ...)
+
+    python bench/run_bench.py                                   # 合成数据集，200 / 5000 + 合成 100k
+    python bench/run_bench.py --fixtures bench/fixtures/live    # 重放录制的数据集
+    python bench/run_bench.py --micro --baseline bench/results/base.json --threshold 0.15
+
+--baseline 给出时与之前保存的结果比较，任何一项吞吐下降超过阈值则以退出码 1 结束 (可用于 CI)。
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import subprocess
+import urllib.request
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCH_DIR)
+RESULTS_DIR = os.path.join(BENCH_DIR, "results")
+DEFAULT_RUN = "(默认)"  # 不套用预设，使用默认配置 (全品类)
+
+sys.path.insert(0, REPO_DIR)
+sys.path.insert(0, BENCH_DIR)
+
+from rich.console import Console  # noqa: E402
+from rich.table import Table  # noqa: E402
+
+console = Console()
+
+# 子进程: 运行一次完整侦察并把结果写入 argv[1]
+CHILD_CODE = """
+import sys, io, json, time, contextlib
+t0 = time.perf_counter()
+with contextlib.redirect_stdout(io.StringIO()):
+    import scout
+    import_s = time.perf_counter() - t0
+    result = scout.scout()
+try:
+    import resource
+    rss_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+except ImportError:
+    rss_kb = None
+with open(sys.argv[1], 'w', encoding='utf-8') as f:
+    json.dump({
+        'elapsed': result.elapsed, 'wall': time.perf_counter() - t0, 'import_s': import_s,
+        'markets_scanned': result.markets_scanned, 'pages_fetched': result.pages_fetched,
+        'rows': len(result.rows), 'timed_out': result.timed_out, 'error': result.error,
+        'rss_kb': rss_kb, 'metrics': result.metrics,
+    }, f)
+"""
+
+
+# ---------- 替身服务 ----------
+
+class FakeGamma:
+    """以子进程运行 fake_gamma.py (端口自动分配)"""
+
+    def __init__(self, args):
+        cmd = [sys.executable, os.path.join(BENCH_DIR, "fake_gamma.py"), "--port", "0"] + args
+        self.proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
+        self.base = None
+        for line in self.proc.stdout:
+            if "listening on " in line:
+                self.base = line.rsplit("listening on ", 1)[1].strip()
+                break
+        if self.base is None:
+            self.close()
+            raise RuntimeError("fake_gamma 启动失败")
+        self.banner = line.strip()
+
+    def _get(self, path):
+        with urllib.request.urlopen(f"{self.base}{path}", timeout=10) as resp:
+            return json.loads(resp.read())
+
+    def reset(self):
+        self._get("/__bench/reset")
+
+    def stats(self):
+        return self._get("/__bench/stats")
+
+    def close(self):
+        self.proc.terminate()
+        try:
+            self.proc.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            self.proc.kill()
+
+
+# ---------- 端到端 ----------
+
+def preset_names():
+    return sorted(os.path.splitext(f)[0] for f in os.listdir(os.path.join(REPO_DIR, "presets")) if f.endswith(".json"))
+
+
+def prepare_workdir(workdir, limit, runtime):
+    """复制 presets/ 到临时工作目录并改写拉取上限与限时 (快照与价格历史关闭，保证各次可比)"""
+    dst = os.path.join(workdir, "presets")
+    shutil.rmtree(dst, ignore_errors=True)
+    os.makedirs(dst)
+    for name in preset_names():
+        with open(os.path.join(REPO_DIR, "presets", f"{name}.json"), "r", encoding="utf-8") as f:
+            data = json.load(f)
+        data.update({"SCOUT_FETCH_LIMIT": str(limit), "SCOUT_RUNTIME_LIMIT": str(runtime),
+                     "SCOUT_STORE": "0", "SCOUT_HISTORY": "0"})
+        with open(os.path.join(dst, f"{name}.json"), "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+
+
+def run_case(server, preset, limit, runtime, workdir):
+    prepare_workdir(workdir, limit, runtime)
+    # 标签索引与限速状态都在工作目录的 .cache/ 下，每次从空白开始
+    shutil.rmtree(os.path.join(workdir, ".cache"), ignore_errors=True)
+    env = {
+        **os.environ,
+        "PYTHONPATH": REPO_DIR + os.pathsep + os.environ.get("PYTHONPATH", ""),
+        "SCOUT_GAMMA_BASE": server.base,
+        "SCOUT_AUTO_PRESET": "" if preset == DEFAULT_RUN else preset,
+        "SCOUT_FETCH_LIMIT": str(limit),
+        "SCOUT_RUNTIME_LIMIT": str(runtime),
+        "SCOUT_RATE_LIMIT": "0",
+        "SCOUT_STORE": "0",
+        "SCOUT_HISTORY": "0",
+        "SCOUT_FETCH_MODE": "markets",
+        "SCOUT_WEBHOOK_URL": "",
+        "SCOUT_METRICS_FILE": "",
+    }
+    out_path = os.path.join(workdir, "result.json")
+    server.reset()
+    t0 = time.perf_counter()
+    proc = subprocess.run([sys.executable, "-c", CHILD_CODE, out_path], cwd=workdir, env=env,
+                          capture_output=True, text=True)
+    wall = time.perf_counter() - t0
+    if proc.returncode != 0:
+        raise RuntimeError(f"{preset} @ {limit} 运行失败:\n{proc.stderr[-2000:]}")
+    with open(out_path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    stats = server.stats()
+    stages = {k: round(v["sum_s"], 4) for k, v in (data.pop("metrics") or {}).get("stages", {}).items()}
+    return {
+        "preset": preset,
+        "limit": limit,
+        "markets": data["markets_scanned"],
+        "rows": data["rows"],
+        "elapsed_s": round(data["elapsed"], 4),
+        "process_s": round(wall, 4),
+        "import_s": round(data["import_s"], 4),
+        "markets_per_s": round(data["markets_scanned"] / data["elapsed"], 1) if data["elapsed"] else 0.0,
+        "peak_rss_mb": round(data["rss_kb"] / 1024, 1) if data["rss_kb"] else None,
+        "requests": stats["requests"],
+        "bytes": stats["bytes_sent"],
+        "timed_out": data["timed_out"],
+        "error": data["error"],
+        "stages": stages,
+    }
+
+
+def run_suite(server, presets, limits, runtime, repeat):
+    """每个用例运行 repeat 次，取端到端耗时最短的一次"""
+    cases = []
+    with tempfile.TemporaryDirectory(prefix="scout-bench-") as workdir:
+        for limit in limits:
+            for preset in presets:
+                best = None
+                for _ in range(repeat):
+                    case = run_case(server, preset, limit, runtime, workdir)
+                    if best is None or case["elapsed_s"] < best["elapsed_s"]:
+                        best = case
+                console.print(f"  [dim]{preset} @ {limit}: {best['markets']} 个市场 "
+                              f"{best['elapsed_s']:.2f}s ({best['markets_per_s']:,.0f}/s)[/dim]")
+                cases.append(best)
+    return cases
+
+
+# ---------- 阶段微基准 (进程内) ----------
+
+def run_micro(n, seed):
+    """JSON 解析 + 投影、批量过滤、结束日期解析的单独吞吐 (合成数据，不经网络)"""
+    import contextlib
+    import io
+    from datetime import datetime, timezone
+    from datasets import synthetic_markets
+    with contextlib.redirect_stdout(io.StringIO()):
+        import scout
+    markets, _, _ = synthetic_markets(n, seed=seed)
+    pages = [json.dumps(markets[i:i + 500], ensure_ascii=False) for i in range(0, n, 500)]
+    cfg = scout.ScoutConfig.from_env({}, console=Console(file=io.StringIO()))
+    now = datetime.now(timezone.utc)
+    results = {}
+
+    def timed(name, fn, count):
+        t0 = time.perf_counter()
+        fn()
+        seconds = time.perf_counter() - t0
+        results[name] = {"seconds": round(seconds, 4), "items_per_s": round(count / seconds, 1)}
+
+    records = []
+    timed("parse_project", lambda: records.extend(
+        scout.project_market(m) for text in pages for m in scout.iter_json_array(text)), n)
+    timed("filter_batch", lambda: [
+        scout.filter_page_batch(records[i:i + 500], set(), cfg, now) for i in range(0, n, 500)], n)
+    end_strs = [str(m.get("endDate") or "") for m in markets]
+    timed("parse_end_dates", lambda: scout._parse_end_dates(end_strs, now), n)
+    return results
+
+
+# ---------- 输出与回归检查 ----------
+
+def render(cases, micro):
+    table = Table(title="🏁 离线压测结果", header_style="bold magenta")
+    for col in ("方案", "上限", "市场数", "耗时 s", "市场/s", "峰值内存 MB", "请求数", "fetch s", "parse s", "filter s", "render s"):
+        table.add_column(col, justify="left" if col == "方案" else "right")
+    for c in cases:
+        st = c["stages"]
+        table.add_row(
+            c["preset"], str(c["limit"]), f"{c['markets']:,}", f"{c['elapsed_s']:.2f}", f"{c['markets_per_s']:,.0f}",
+            "-" if c["peak_rss_mb"] is None else f"{c['peak_rss_mb']:.0f}", str(c["requests"]),
+            *(f"{st.get(k, 0):.2f}" for k in ("fetch", "parse", "filter", "render")),
+        )
+    console.print(table)
+    if micro:
+        console.print("[bold]阶段微基准:[/bold] " + " · ".join(
+            f"{k} {v['items_per_s']:,.0f}/s" for k, v in micro.items()))
+
+
+def _case_key(c):
+    return f"{c['preset']}@{c['limit']}"
+
+
+def compare(report, baseline, threshold):
+    """吞吐下降超过 threshold (比例) 的项目列表"""
+    regressions = []
+    base_cases = {_case_key(c): c for c in baseline.get("cases", [])}
+    for c in report["cases"]:
+        base = base_cases.get(_case_key(c))
+        if base and base["markets_per_s"] and c["markets_per_s"] < base["markets_per_s"] * (1 - threshold):
+            regressions.append((_case_key(c), base["markets_per_s"], c["markets_per_s"]))
+    for name, cur in report.get("micro", {}).items():
+        base = baseline.get("micro", {}).get(name)
+        if base and cur["items_per_s"] < base["items_per_s"] * (1 - threshold):
+            regressions.append((f"micro:{name}", base["items_per_s"], cur["items_per_s"]))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Scout 离线压测 (本地 Gamma 替身)")
+    parser.add_argument("--fixtures", help="录制的数据集目录；不给出时使用合成数据集")
+    parser.add_argument("--synthetic", type=int, default=20000, help="合成数据集的市场数 (用于常规规模)")
+    parser.add_argument("--presets", default="", help="逗号分隔的方案名 (默认 presets/ 下全部)")
+    parser.add_argument("--limits", default="200,5000", help="逗号分隔的 SCOUT_FETCH_LIMIT")
+    parser.add_argument("--large", type=int, default=100000, help="合成大数据集规模 (0 跳过)")
+    parser.add_argument("--latency", type=float, default=0.02, help="替身服务每个请求的延迟 (秒)")
+    parser.add_argument("--page-size", type=int, default=500)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--throttle-rate", type=float, default=0.0)
+    parser.add_argument("--runtime", type=int, default=600, help="每次侦察的限时 (秒)")
+    parser.add_argument("--repeat", type=int, default=1, help="每个用例的重复次数 (取最快一次)")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--micro", action="store_true", help="同时运行进程内的阶段微基准")
+    parser.add_argument("--out", help="结果 JSON 路径 (默认 bench/results/<时间>.json)")
+    parser.add_argument("--baseline", help="对比的基线结果 JSON")
+    parser.add_argument("--threshold", type=float, default=0.2, help="吞吐下降超过该比例视为回归")
+    args = parser.parse_args(argv)
+
+    presets = [p.strip() for p in args.presets.split(",") if p.strip()] or preset_names()
+    limits = [int(x) for x in args.limits.split(",") if x.strip()]
+    server_args = ["--latency", str(args.latency), "--page-size", str(args.page_size), "--seed", str(args.seed),
+                   "--error-rate", str(args.error_rate), "--throttle-rate", str(args.throttle_rate)]
+
+    cases = []
+    dataset = ["--fixtures", args.fixtures] if args.fixtures else ["--synthetic", str(args.synthetic)]
+    server = FakeGamma(dataset + server_args)
+    try:
+        console.print(f"[cyan]🧪 {server.banner}[/cyan]")
+        cases += run_suite(server, presets, limits, args.runtime, args.repeat)
+    finally:
+        server.close()
+
+    if args.large:
+        server = FakeGamma(["--synthetic", str(args.large)] + server_args)
+        try:
+            console.print(f"[cyan]🧪 {server.banner}[/cyan]")
+            cases += run_suite(server, [DEFAULT_RUN] + presets, [args.large], args.runtime, args.repeat)
+        finally:
+            server.close()
+
+    micro = run_micro(args.synthetic, args.seed) if args.micro else {}
+    report = {
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": sys.version.split()[0],
+        "dataset": args.fixtures or f"synthetic:{args.synthetic}",
+        "server": {"latency": args.latency, "page_size": args.page_size,
+                   "error_rate": args.error_rate, "throttle_rate": args.throttle_rate},
+        "cases": cases,
+        "micro": micro,
+    }
+    render(cases, micro)
+
+    out = args.out or os.path.join(RESULTS_DIR, time.strftime("%Y%m%d-%H%M%S") + ".json")
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    console.print(f"[dim]结果已写入 {out}[/dim]")
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            regressions = compare(report, json.load(f), args.threshold)
+        if regressions:
+            for name, base, cur in regressions:
+                console.print(f"[red]📉 {name}: {base:,.0f}/s -> {cur:,.0f}/s[/red]")
+            sys.exit(1)
+        console.print(f"[green]✅ 相对基线无超过 {args.threshold:.0%} 的吞吐回退[/green]")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,238 @@
+"""共享 HTTP 客户端 (scout.py / server.py / tag_index.py 共用)
+
+- 单个 requests.Session 连接池，keep-alive 复用 TCP+TLS 连接
+- 压缩协商: gzip/deflate，安装了 brotli 时自动追加 br
+- 条件请求: 记住 ETag / Last-Modified，未变化的响应走 304 并复用本地正文
+- 有界重试: 5xx、超时、连接错误按指数退避 + 随机抖动重试
+- 限速: 发往 Gamma API 的请求先经过共享的自适应令牌桶 (rate_governor)，429/503 按 Retry-After 暂停后重试
+- 统计: 请求数、连接复用数、压缩与 304 节省的字节数、限流次数与限速等待时间
+"""
+import os
+import time
+import random
+import threading
+from collections import OrderedDict
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util import make_headers
+
+from rate_governor import governor as rate_governor, parse_retry_after
+
+# 可指向本地替身服务 (bench/fake_gamma.py) 做离线压测
+GAMMA_API = (os.getenv("SCOUT_GAMMA_BASE") or "https://gamma-api.polymarket.com").rstrip("/")
+
+# 增加 User-Agent 伪装
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
+
+HTTP_POOL_SIZE = int(os.getenv("SCOUT_HTTP_POOL_SIZE", 20) or 20)
+HTTP_RETRIES = int(os.getenv("SCOUT_HTTP_RETRIES", 3) or 3)
+HTTP_BACKOFF = float(os.getenv("SCOUT_HTTP_BACKOFF", 0.5) or 0.5)
+
+RETRY_STATUS = {500, 502, 503, 504}
+THROTTLE_STATUS = {429, 503}  # 上游限流: 交给限速器降速，而不是按普通 5xx 退避
+
+
+class HttpClient:
+    """带连接池、条件请求缓存和重试的 HTTP 客户端 (线程安全)"""
+
+    def __init__(self, pool_size=HTTP_POOL_SIZE, retries=HTTP_RETRIES, backoff=HTTP_BACKOFF,
+                 cache_max_bytes=64 * 1024 * 1024, governor=None, governed_prefix=GAMMA_API):
+        self.retries = max(0, retries)
+        self.backoff = backoff
+        self.cache_max_bytes = cache_max_bytes
+        self.governor = governor
+        self.governed_prefix = governed_prefix
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers.update({"User-Agent": USER_AGENT})
+        # urllib3 按已安装的解码库给出 gzip,deflate[,br][,zstd]
+        self.session.headers.update(make_headers(accept_encoding=True))
+
+        self._lock = threading.Lock()
+        self._cache = OrderedDict()  # url -> (validators, content, headers)
+        self._cache_bytes = 0
+        self._stats = {
+            'requests': 0,
+            'retries': 0,
+            'not_modified': 0,
+            'bytes_received': 0,
+            'bytes_saved_compression': 0,
+            'bytes_saved_304': 0,
+            'throttled': 0,
+            'rate_wait_s': 0.0,
+        }
+        self.first_request_at = None  # 进程内第一个请求发出的 perf_counter 时刻 (冷启动计时)
+
+    # ---------- 统计 ----------
+
+    def _count(self, key, n=1):
+        with self._lock:
+            self._stats[key] += n
+
+    def stats(self):
+        """返回统计快照，其中 reused_connections 来自 urllib3 连接池计数"""
+        with self._lock:
+            data = dict(self._stats)
+        reused = 0
+        # http:// 与 https:// 挂载的是同一个 adapter，去重后再统计
+        for adapter in {id(a): a for a in self.session.adapters.values()}.values():
+            pools = getattr(adapter.poolmanager, 'pools', None)
+            if pools is None:
+                continue
+            for key in list(pools.keys()):
+                pool = pools.get(key)
+                if pool is not None:
+                    reused += max(0, pool.num_requests - pool.num_connections)
+        data['reused_connections'] = reused
+        return data
+
+    def _record_transfer(self, resp):
+        """记录线上传输字节数与压缩节省"""
+        wire = None
+        length = resp.headers.get('Content-Length')
+        if length and length.isdigit():
+            wire = int(length)
+        elif hasattr(resp.raw, 'tell'):
+            try:
+                wire = resp.raw.tell()
+            except Exception:
+                wire = None
+        if wire is None:
+            wire = len(resp.content)
+        self._count('bytes_received', wire)
+        if resp.headers.get('Content-Encoding'):
+            self._count('bytes_saved_compression', max(0, len(resp.content) - wire))
+
+    # ---------- 条件请求缓存 ----------
+
+    def _cache_get(self, url):
+        with self._lock:
+            entry = self._cache.get(url)
+            if entry is not None:
+                self._cache.move_to_end(url)
+            return entry
+
+    def _cache_put(self, url, resp):
+        validators = {}
+        if resp.headers.get('ETag'):
+            validators['If-None-Match'] = resp.headers['ETag']
+        if resp.headers.get('Last-Modified'):
+            validators['If-Modified-Since'] = resp.headers['Last-Modified']
+        if not validators:
+            return
+        content = resp.content
+        if len(content) > self.cache_max_bytes // 4:
+            return
+        with self._lock:
+            old = self._cache.pop(url, None)
+            if old is not None:
+                self._cache_bytes -= len(old[1])
+            self._cache[url] = (validators, content, dict(resp.headers))
+            self._cache_bytes += len(content)
+            while self._cache_bytes > self.cache_max_bytes and self._cache:
+                _, (_, evicted, _) = self._cache.popitem(last=False)
+                self._cache_bytes -= len(evicted)
+
+    # ---------- 请求 ----------
+
+    def _sleep_before_retry(self, attempt, deadline):
+        # 指数退避 + 全抖动，且不越过调用方的截止时间
+        delay = random.uniform(0, self.backoff * (2 ** attempt))
+        if deadline is not None:
+            remaining = deadline - time.time()
+            if remaining <= delay:
+                return False
+        time.sleep(delay)
+        return True
+
+    def request(self, method, url, retries=None, deadline=None, retry_read_timeout=True, **kwargs):
+        """发送请求，对 5xx / 超时 / 连接错误有界重试
+
+        deadline 为 time.time() 时间戳，重试等待与限速等待都不会越过它。
+        retry_read_timeout=False 时读超时不重试 (用于非幂等的 POST)。
+        """
+        retries = self.retries if retries is None else retries
+        if self.first_request_at is None:
+            self.first_request_at = time.perf_counter()
+        governed = self.governor is not None and url.startswith(self.governed_prefix)
+        attempt = 0
+        while True:
+            if governed:
+                waited = self.governor.acquire(deadline)
+                if waited is None:
+                    raise requests.Timeout(f"限速等待超过截止时间: {url}")
+                if waited:
+                    self._count('rate_wait_s', waited)
+            self._count('requests')
+            try:
+                resp = self.session.request(method, url, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                is_read_timeout = isinstance(e, requests.ReadTimeout)
+                if attempt >= retries or (is_read_timeout and not retry_read_timeout) \
+                        or not self._sleep_before_retry(attempt, deadline):
+                    raise
+                attempt += 1
+                self._count('retries')
+                continue
+
+            if governed and resp.status_code in THROTTLE_STATUS:
+                # 限流: 降速并暂停 (遵循 Retry-After)，等待在下一轮 acquire 中完成
+                self._count('throttled')
+                self.governor.throttle(parse_retry_after(resp.headers.get('Retry-After')))
+                if attempt < retries:
+                    resp.close()
+                    attempt += 1
+                    self._count('retries')
+                    continue
+                return resp
+
+            if resp.status_code in RETRY_STATUS and attempt < retries \
+                    and self._sleep_before_retry(attempt, deadline):
+                resp.close()
+                attempt += 1
+                self._count('retries')
+                continue
+            if governed and resp.status_code < 400:
+                self.governor.success()
+            return resp
+
+    def get(self, url, timeout=30, conditional=True, deadline=None, headers=None, **kwargs):
+        """GET 请求；conditional=True 时自动带上缓存的 ETag/Last-Modified"""
+        headers = dict(headers or {})
+        entry = self._cache_get(url) if conditional else None
+        if entry is not None:
+            headers.update(entry[0])
+
+        resp = self.request("GET", url, timeout=timeout, deadline=deadline, headers=headers, **kwargs)
+
+        if resp.status_code == 304 and entry is not None:
+            # 未变化: 用缓存正文还原成普通 200 响应
+            self._count('not_modified')
+            self._count('bytes_saved_304', len(entry[1]))
+            resp.status_code = 200
+            resp._content = entry[1]
+            for k, v in entry[2].items():
+                resp.headers.setdefault(k, v)
+            resp.not_modified = True
+            return resp
+
+        resp.not_modified = False
+        self._record_transfer(resp)
+        if conditional and resp.status_code == 200:
+            self._cache_put(url, resp)
+        return resp
+
+    def get_json(self, url, timeout=30, **kwargs):
+        return self.get(url, timeout=timeout, **kwargs).json()
+
+    def post(self, url, timeout=10, retries=None, **kwargs):
+        """POST 请求 (读超时不重试，避免重复推送)"""
+        return self.request("POST", url, timeout=timeout, retries=retries, retry_read_timeout=False, **kwargs)
+
+
+# 进程内共享的客户端实例
+client = HttpClient(governor=rate_governor)
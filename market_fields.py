@@ -0,0 +1,69 @@
+"""Gamma 市场字段解析 (scout.py 过滤流水线、market_store.py 快照库与 search_index.py 检索共用)
+
+- to_float:      数值字段 (volume / liquidity 等)，缺失、无法解析与 NaN 一律按 0
+- first_price:   首个结果的胜率 (outcomePrices，缺失时取 tokens[].price)，无价格返回 NaN
+- parse_iso8601: 结束日期 -> UTC datetime，无法解析返回 None
+"""
+import json
+from datetime import datetime, timezone
+
+
+def to_float(value):
+    """数值字段 -> float；缺失 (None / 空串)、无法解析与 NaN 一律按 0 处理"""
+    try:
+        value = float(value or 0)
+    except (TypeError, ValueError):
+        return 0.0
+    return value if value == value else 0.0
+
+
+def first_price(m):
+    """价格探针 (逐行模式与批量模式的回退路径共用)，无价格或价格无法解析返回 NaN"""
+    prices = m.get('outcomePrices', [])
+    if isinstance(prices, str):
+        try:
+            prices = json.loads(prices)
+        except:
+            prices = []
+
+    if not prices:
+        prices = [t.get('price') for t in m.get('tokens', []) if t.get('price') is not None]
+
+    if not prices:
+        return float('nan')
+    if prices[0] is None:
+        return 0.5
+    try:
+        return float(prices[0])
+    except (TypeError, ValueError):
+        return float('nan')
+
+
+def parse_iso8601(value):
+    """[核心优化] 轻量日期解析 -> UTC datetime (无时区按 UTC)，无法解析返回 None
+
+    ISO-8601 (Gamma 的全部日期格式) 走 datetime.fromisoformat；其余少数格式回退到 pandas
+    (首次用到时才导入)，结果与原先的 pd.to_datetime 一致。非字符串视为无法解析。
+    """
+    if not isinstance(value, str):
+        return None
+    try:
+        if "W" in value:
+            raise ValueError("ISO 周日期 (pandas 不支持，交给回退路径保持一致)")
+        dt = datetime.fromisoformat(value[:-1] + "+00:00" if value[-1:] in ("Z", "z") else value)
+    except ValueError:
+        return _parse_date_fallback(value)
+    return dt.replace(tzinfo=timezone.utc) if dt.tzinfo is None else dt.astimezone(timezone.utc)
+
+
+def _parse_date_fallback(value):
+    try:
+        import pandas as pd
+        ts = pd.to_datetime(value)
+        if pd.isna(ts):  # 空串等解析为 NaT
+            return None
+        if ts.tzinfo is None:
+            ts = ts.tz_localize('UTC')
+        return ts.tz_convert('UTC').to_pydatetime(warn=False)
+    except Exception:
+        return None
@@ -0,0 +1,179 @@
+"""本地市场快照库 (SQLite, .cache/markets.db，scout.py 与 server.py 共用)
+
+每个扫描范围 (全局 / 单个品类) 独立保存一份活跃市场快照和同步水位:
+- 水位为已同步记录中最新的 updatedAt，增量同步只拉取水位之后有变化的市场
+- 已结盘 / 下架的市场在增量同步时随更新一并移除
+- 排序、门槛与截止日期在 SQL 中完成，只解析最终进入过滤阶段的记录
+- 体积最大的 description 单独存列，仅在需要搜索描述时读取
+"""
+import os
+import json
+import time
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+from market_fields import to_float
+
+CACHE_DIR = ".cache"
+DB_FILE = os.path.join(CACHE_DIR, "markets.db")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS markets (
+    scope TEXT NOT NULL,
+    id TEXT NOT NULL,
+    updated_at TEXT NOT NULL DEFAULT '',
+    volume REAL NOT NULL DEFAULT 0,
+    liquidity REAL NOT NULL DEFAULT 0,
+    end_date TEXT NOT NULL DEFAULT '',
+    data TEXT NOT NULL,
+    description TEXT NOT NULL DEFAULT '',
+    PRIMARY KEY (scope, id)
+);
+CREATE TABLE IF NOT EXISTS sync_state (
+    scope TEXT PRIMARY KEY,
+    watermark TEXT NOT NULL DEFAULT '',
+    full_synced_at REAL NOT NULL DEFAULT 0,
+    synced_at REAL NOT NULL DEFAULT 0
+);
+"""
+
+# SQL 排序表达式 (与 Gamma API 的 order 参数对应)；结束日期为空的排在最后
+ORDER_SQL = {
+    'volume': "volume DESC",
+    'liquidity': "liquidity DESC",
+    'enddate': "end_date = '', end_date ASC",
+}
+
+
+def market_key(m):
+    """市场主键: 优先 id，其次 slug"""
+    return str(m.get('id') or m.get('slug') or '')
+
+
+def is_live(m):
+    """仍处于活跃状态的市场才保留在快照中"""
+    return not m.get('closed') and m.get('active', True) is not False and not m.get('archived')
+
+
+class MarketStore:
+    """市场快照存储 (线程安全: 每次操作使用独立连接)"""
+
+    def __init__(self, path=DB_FILE):
+        self.path = path
+        self._init_lock = threading.Lock()
+        self._initialized = False
+
+    @contextmanager
+    def _connect(self):
+        if not self._initialized:
+            with self._init_lock:
+                if not self._initialized:
+                    os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+                    conn = sqlite3.connect(self.path, timeout=30)
+                    try:
+                        conn.execute("PRAGMA journal_mode=WAL")
+                        conn.executescript(SCHEMA)
+                    finally:
+                        conn.close()
+                    self._initialized = True
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            conn.execute("PRAGMA synchronous=NORMAL")
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    # ---------- 同步状态 ----------
+
+    def sync_state(self, scope):
+        """返回 (watermark, full_synced_at, synced_at)；从未同步过返回 ('', 0, 0)"""
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT watermark, full_synced_at, synced_at FROM sync_state WHERE scope = ?", (scope,)
+            ).fetchone()
+        return row if row else ('', 0.0, 0.0)
+
+    def count(self, scope):
+        with self._connect() as conn:
+            return conn.execute("SELECT COUNT(*) FROM markets WHERE scope = ?", (scope,)).fetchone()[0]
+
+    # ---------- 写入 ----------
+
+    @staticmethod
+    def _row(scope, m):
+        record = {k: v for k, v in m.items() if k != 'description'}
+        return (
+            scope,
+            market_key(m),
+            str(m.get('updatedAt') or ''),
+            to_float(m.get('volumeNum', m.get('volume'))),
+            to_float(m.get('liquidityNum', m.get('liquidity'))),
+            str(m.get('endDate') or ''),
+            json.dumps(record, ensure_ascii=False, separators=(',', ':')),
+            str(m.get('description') or ''),
+        )
+
+    def apply(self, scope, markets, watermark=None, full=False):
+        """写入一批市场记录: 活跃的插入/更新，已结盘或下架的删除。
+
+        markets 需按 updatedAt 降序；翻页重叠导致同一市场出现多次时只保留最先出现 (最新) 的记录。
+        full=True 表示这是一次完整快照，会先清空该范围；watermark 非空时推进同步水位。
+        返回 (upserted, removed)。
+        """
+        latest = {}
+        for m in markets:
+            key = market_key(m)
+            if key:
+                latest.setdefault(key, m)
+        live = [self._row(scope, m) for m in latest.values() if is_live(m)]
+        dead = [(scope, key) for key, m in latest.items() if not is_live(m)]
+        now = time.time()
+        with self._connect() as conn:
+            if full:
+                conn.execute("DELETE FROM markets WHERE scope = ?", (scope,))
+            conn.executemany("INSERT OR REPLACE INTO markets VALUES (?, ?, ?, ?, ?, ?, ?, ?)", live)
+            conn.executemany("DELETE FROM markets WHERE scope = ? AND id = ?", dead)
+            conn.execute("INSERT OR IGNORE INTO sync_state (scope) VALUES (?)", (scope,))
+            if watermark:
+                conn.execute("UPDATE sync_state SET watermark = MAX(watermark, ?) WHERE scope = ?", (watermark, scope))
+            if full:
+                conn.execute("UPDATE sync_state SET full_synced_at = ? WHERE scope = ?", (now, scope))
+            conn.execute("UPDATE sync_state SET synced_at = ? WHERE scope = ?", (now, scope))
+        return len(live), len(dead)
+
+    # ---------- 查询 ----------
+
+    def query(self, scope, order_by="volume", limit=None, min_volume=0, min_liquidity=0,
+              end_date_max=None, with_description=False):
+        """按与 Gamma API 相同的语义在本地筛选、排序并截断，返回市场 dict 列表"""
+        sql = "SELECT data" + (", description" if with_description else "") + " FROM markets WHERE scope = ?"
+        args = [scope]
+        if min_volume > 0:
+            sql += " AND volume >= ?"
+            args.append(min_volume)
+        if min_liquidity > 0:
+            sql += " AND liquidity >= ?"
+            args.append(min_liquidity)
+        if end_date_max:
+            sql += " AND end_date != '' AND end_date <= ?"
+            args.append(end_date_max)
+        sql += f" ORDER BY {ORDER_SQL.get(order_by, ORDER_SQL['volume'])}, id"
+        if limit:
+            sql += " LIMIT ?"
+            args.append(int(limit))
+
+        with self._connect() as conn:
+            rows = conn.execute(sql, args).fetchall()
+        markets = []
+        for row in rows:
+            m = json.loads(row[0])
+            if with_description:
+                m['description'] = row[1]
+            markets.append(m)
+        return markets
+
+
+# 进程内共享的快照库实例
+store = MarketStore()
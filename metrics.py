@@ -0,0 +1,213 @@
+"""侦察流水线分阶段指标 (scout.py 记录，server.py 汇总为 Prometheus 格式的 /api/metrics)
+
+- 每次侦察一个 RunMetrics: 各阶段耗时 (次数 / 总和 / 最大值 / 直方图桶) 与计数器
+  (拉取页数与字节数、各过滤阶段剩余的市场数等)
+- 当前侦察通过 contextvars 传递: 拉取线程池与分片线程提交任务时复制上下文，工作线程中同样可以记录
+- 摘要为纯 dict，可直接 JSON 序列化，并可跨侦察累加；每次记录只有一次 perf_counter 和一次加锁
+"""
+import time
+import bisect
+import threading
+import contextvars
+from contextlib import contextmanager
+
+# 延迟直方图桶上限 (秒，与 Prometheus 客户端默认桶一致)，最后一个桶为 +Inf
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_current = contextvars.ContextVar('scout_run_metrics', default=None)
+
+
+def _new_stage():
+    return {'count': 0, 'sum_s': 0.0, 'max_s': 0.0, 'buckets': [0] * (len(LATENCY_BUCKETS) + 1)}
+
+
+def observe_stage(stages, name, seconds):
+    """向阶段摘要 dict 记录一次耗时"""
+    stage = stages.get(name)
+    if stage is None:
+        stage = stages[name] = _new_stage()
+    stage['count'] += 1
+    stage['sum_s'] += seconds
+    if seconds > stage['max_s']:
+        stage['max_s'] = seconds
+    stage['buckets'][bisect.bisect_left(LATENCY_BUCKETS, seconds)] += 1
+
+
+def merge_summary(target, summary):
+    """把一次侦察的摘要累加到 target (同样结构的 dict)"""
+    stages = target.setdefault('stages', {})
+    for name, src in summary.get('stages', {}).items():
+        dst = stages.get(name)
+        if dst is None:
+            dst = stages[name] = _new_stage()
+        dst['count'] += src['count']
+        dst['sum_s'] += src['sum_s']
+        dst['max_s'] = max(dst['max_s'], src['max_s'])
+        dst['buckets'] = [a + b for a, b in zip(dst['buckets'], src['buckets'])]
+    counters = target.setdefault('counters', {})
+    for name, n in summary.get('counters', {}).items():
+        counters[name] = counters.get(name, 0) + n
+    return target
+
+
+class RunMetrics:
+    """单次侦察的指标收集器 (线程安全)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stages = {}
+        self._counters = {}
+
+    def observe(self, name, seconds):
+        with self._lock:
+            observe_stage(self._stages, name, seconds)
+
+    def add(self, name, n=1):
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + n
+
+    @contextmanager
+    def stage(self, name):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - t0)
+
+    def summary(self):
+        """{'stages': {阶段: {count, sum_s, max_s, buckets}}, 'counters': {名称: 数值}}"""
+        with self._lock:
+            return {
+                'stages': {k: {**v, 'buckets': list(v['buckets'])} for k, v in self._stages.items()},
+                'counters': dict(self._counters),
+            }
+
+
+# ---------- 当前侦察 ----------
+
+def current():
+    return _current.get()
+
+
+@contextmanager
+def activate(run):
+    """在当前上下文中把 run 设为进行中的侦察"""
+    token = _current.set(run)
+    try:
+        yield run
+    finally:
+        _current.reset(token)
+
+
+@contextmanager
+def stage(name):
+    """记录一个阶段的耗时到进行中的侦察 (没有时不记录)"""
+    run = _current.get()
+    if run is None:
+        yield
+        return
+    with run.stage(name):
+        yield
+
+
+def observe(name, seconds):
+    run = _current.get()
+    if run is not None:
+        run.observe(name, seconds)
+
+
+def add(name, n=1):
+    run = _current.get()
+    if run is not None:
+        run.add(name, n)
+
+
+@contextmanager
+def timed(summary, name):
+    """侦察结束后的阶段 (渲染 / 落盘 / 推送) 直接记录到结果中的摘要 dict"""
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        if summary is not None:
+            observe_stage(summary.setdefault('stages', {}), name, time.perf_counter() - t0)
+
+
+# ---------- 进程级汇总 (Prometheus 文本格式) ----------
+
+def _labels(**labels):
+    return "{" + ",".join(f'{k}="{v}"' for k, v in labels.items()) + "}" if labels else ""
+
+
+def _fmt(value):
+    value = float(value)
+    return str(int(value)) if value.is_integer() else repr(value)
+
+
+def _split_counter(name):
+    """计数器命名约定: 'family'、'family:stage' (展开为 stage 标签) 或 'family:标签名=值'"""
+    family, _, label = name.partition(':')
+    if not label:
+        return family, {}
+    key, sep, value = label.partition('=')
+    return family, ({key: value} if sep else {'stage': label})
+
+
+class MetricsRegistry:
+    """汇总所有侦察的指标 (Web 服务进程内共享)"""
+
+    def __init__(self, prefix="scout"):
+        self.prefix = prefix
+        self._lock = threading.Lock()
+        self._totals = {}
+        self._runs = {}
+        self._events = {}
+
+    def record_run(self, summary, outcome="ok"):
+        with self._lock:
+            merge_summary(self._totals, summary or {})
+            self._runs[outcome] = self._runs.get(outcome, 0) + 1
+
+    def inc(self, name, n=1):
+        """进程级事件计数 (不属于某次侦察，例如结果缓存命中)"""
+        with self._lock:
+            self._events[name] = self._events.get(name, 0) + n
+
+    def render(self, gauges=None, counters=None):
+        """输出 Prometheus 文本格式；gauges / counters 为调用方附加的 {名称: 数值}"""
+        p = self.prefix
+        with self._lock:
+            totals = merge_summary({}, self._totals)
+            runs = dict(self._runs)
+            events = dict(self._events)
+
+        lines = [f"# TYPE {p}_runs_total counter"]
+        for outcome, n in sorted(runs.items()):
+            lines.append(f"{p}_runs_total{_labels(outcome=outcome)} {n}")
+
+        lines.append(f"# TYPE {p}_stage_duration_seconds histogram")
+        for name, st in sorted(totals.get('stages', {}).items()):
+            cumulative = 0
+            for le, n in zip(LATENCY_BUCKETS + ("+Inf",), st['buckets']):
+                cumulative += n
+                lines.append(f"{p}_stage_duration_seconds_bucket{_labels(stage=name, le=le)} {cumulative}")
+            lines.append(f"{p}_stage_duration_seconds_sum{_labels(stage=name)} {st['sum_s']:.6f}")
+            lines.append(f"{p}_stage_duration_seconds_count{_labels(stage=name)} {st['count']}")
+
+        families = {}
+        for name, n in list(totals.get('counters', {}).items()) + list(events.items()) + list((counters or {}).items()):
+            family, labels = _split_counter(name)
+            families.setdefault(family, []).append((labels, n))
+        for family, samples in sorted(families.items()):
+            lines.append(f"# TYPE {p}_{family}_total counter")
+            for labels, n in sorted(samples, key=lambda s: sorted(s[0].items())):
+                lines.append(f"{p}_{family}_total{_labels(**labels)} {_fmt(n)}")
+
+        for name, value in sorted((gauges or {}).items()):
+            lines.append(f"# TYPE {p}_{name} gauge")
+            lines.append(f"{p}_{name} {_fmt(value)}")
+        return "\n".join(lines) + "\n"
+
+
+# 进程内共享的汇总实例
+registry = MetricsRegistry()
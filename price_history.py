@@ -0,0 +1,233 @@
+"""市场价格历史环形缓冲区 (numpy memmap，落盘到 .cache/history/)
+
+每次侦察把各市场的胜率、成交量、流动性写入一个采样列，按时间优先存储:
+- prob:      uint16，胜率 * 65534 (65535 表示缺失)
+- volume:    uint8，log2(1 + v) * 6 对数编码 (约 12% 精度，255 表示缺失)
+- liquidity: uint8，编码同 volume
+默认 50,000 个市场 × 288 个采样 (5 分钟一采样，覆盖 24 小时) 约 58 MB，
+计算动量时只读取当前与窗口起点两行，耗时为毫秒级。
+
+市场以链接 (与 seen_urls 去重一致) 标识，市场槽位满时回收最久未出现的市场。
+CLI 与 Web 服务进程可能同时写入: 读写都在跨进程锁 (.cache/history/lock.db 上的 SQLite 写事务) 内进行，
+并在锁内重新读取 meta.json，槽位分配与采样指针不会被另一进程的旧副本覆盖。
+"""
+import os
+import json
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+import numpy as np
+
+CACHE_DIR = os.path.join(".cache", "history")
+META_FILE = os.path.join(CACHE_DIR, "meta.json")
+
+HISTORY_CAPACITY = int(os.getenv("SCOUT_HISTORY_CAPACITY", 50000) or 50000)  # 最多跟踪的市场数
+HISTORY_SAMPLES = int(os.getenv("SCOUT_HISTORY_SAMPLES", 288) or 288)        # 每个市场保留的采样数
+HISTORY_STEP = int(os.getenv("SCOUT_HISTORY_STEP", 300) or 300)              # 采样间隔 (秒)，间隔内的扫描覆盖同一采样
+
+PROB_SCALE = 65534
+PROB_MISSING = np.uint16(65535)
+LOG_SCALE = 6
+LOG_MISSING = np.uint8(255)
+LOCK_TIMEOUT = 60  # 等待其它进程释放历史锁的最长秒数
+
+
+def encode_prob(p):
+    return np.clip(np.rint(np.asarray(p, dtype=np.float64) * PROB_SCALE), 0, PROB_SCALE).astype(np.uint16)
+
+
+def decode_prob(codes):
+    out = codes.astype(np.float64) / PROB_SCALE
+    out[codes == PROB_MISSING] = np.nan
+    return out
+
+
+def encode_log(v):
+    v = np.maximum(np.asarray(v, dtype=np.float64), 0)
+    return np.clip(np.rint(np.log2(1 + v) * LOG_SCALE), 0, 254).astype(np.uint8)
+
+
+def decode_log(codes):
+    out = np.exp2(codes.astype(np.float64) / LOG_SCALE) - 1
+    out[codes == LOG_MISSING] = np.nan
+    return out
+
+
+def parse_window(text):
+    """'1h' / '30m' / '1d' / '900' -> 秒"""
+    text = str(text).strip().lower()
+    units = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+    if text and text[-1] in units:
+        return int(float(text[:-1]) * units[text[-1]])
+    return int(float(text))
+
+
+class PriceHistory:
+    """定长环形缓冲区: 行为采样时刻，列为市场槽位"""
+
+    def __init__(self, path=CACHE_DIR, capacity=HISTORY_CAPACITY, samples=HISTORY_SAMPLES, step=HISTORY_STEP):
+        self.path = path
+        self.capacity = capacity
+        self.samples = samples
+        self.step = step
+        self._lock = threading.Lock()
+        self._opened = False
+        self._stamp = None  # 已载入的 meta.json 版本 (inode, mtime, 大小)
+
+    # ---------- 存储 ----------
+
+    def _file(self, name):
+        return os.path.join(self.path, name)
+
+    def _map(self, name, dtype, shape, fill, create):
+        if create:
+            arr = np.lib.format.open_memmap(self._file(name), mode='w+', dtype=dtype, shape=shape)
+            arr[:] = fill
+            return arr
+        return np.load(self._file(name), mmap_mode='r+')
+
+    def _meta_stamp(self):
+        try:
+            st = os.stat(self._file("meta.json"))
+        except OSError:
+            return None
+        return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+    @contextmanager
+    def _locked(self):
+        """进程内 + 跨进程互斥；meta.json 被其它进程改写过 (推进采样或分配槽位) 时重新载入"""
+        with self._lock:
+            os.makedirs(self.path, exist_ok=True)
+            conn = sqlite3.connect(self._file("lock.db"), timeout=LOCK_TIMEOUT, isolation_level=None)
+            try:
+                conn.execute("BEGIN IMMEDIATE")
+                try:
+                    if self._opened and self._meta_stamp() != self._stamp:
+                        self._opened = False
+                    self._open()
+                    yield
+                finally:
+                    conn.execute("ROLLBACK")
+            finally:
+                conn.close()
+
+    def _open(self):
+        if self._opened:
+            return
+        meta = None
+        try:
+            with open(self._file("meta.json"), 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            pass
+        # 尺寸配置变化或文件缺失时重建
+        create = not meta or meta.get('capacity') != self.capacity or meta.get('samples') != self.samples
+        if not create:
+            try:
+                self._load_arrays(create=False)
+            except (OSError, ValueError):
+                create = True
+        if create:
+            os.makedirs(self.path, exist_ok=True)
+            meta = {'capacity': self.capacity, 'samples': self.samples, 'head': -1, 'slots': {}}
+            self._load_arrays(create=True)
+        self.head = meta['head']
+        self.slots = meta['slots']  # 链接 -> 槽位
+        self._free = sorted(set(range(self.capacity)) - set(self.slots.values()), reverse=True)
+        self._stamp = self._meta_stamp()
+        self._opened = True
+
+    def _load_arrays(self, create):
+        shape = (self.samples, self.capacity)
+        self.prob = self._map("prob.npy", np.uint16, shape, PROB_MISSING, create)
+        self.volume = self._map("volume.npy", np.uint8, shape, LOG_MISSING, create)
+        self.liquidity = self._map("liquidity.npy", np.uint8, shape, LOG_MISSING, create)
+        self.times = self._map("times.npy", np.float64, (self.samples,), np.nan, create)
+        self.last_seen = self._map("last_seen.npy", np.float64, (self.capacity,), 0.0, create)
+
+    def _save_meta(self):
+        for arr in (self.prob, self.volume, self.liquidity, self.times, self.last_seen):
+            arr.flush()
+        tmp_path = f"{self._file('meta.json')}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'capacity': self.capacity, 'samples': self.samples, 'head': self.head, 'slots': self.slots},
+                      f, ensure_ascii=False, separators=(',', ':'))
+        os.replace(tmp_path, self._file('meta.json'))
+        self._stamp = self._meta_stamp()
+
+    # ---------- 写入 ----------
+
+    def _slot_for(self, link, now):
+        slot = self.slots.get(link)
+        if slot is not None:
+            # 立即刷新: 同一批中之后的新市场回收槽位时不会选中本批已出现的市场
+            self.last_seen[slot] = now
+            return slot
+        if not self._free:
+            # 槽位已满: 回收最久未出现的市场，并清空其历史
+            slot = int(np.argmin(self.last_seen))
+            for key in [k for k, v in self.slots.items() if v == slot]:
+                del self.slots[key]
+            self.prob[:, slot] = PROB_MISSING
+            self.volume[:, slot] = LOG_MISSING
+            self.liquidity[:, slot] = LOG_MISSING
+        else:
+            slot = self._free.pop()
+        self.slots[link] = slot
+        self.last_seen[slot] = now
+        return slot
+
+    def record(self, rows, now):
+        """写入一次扫描结果 (rows 为侦察结果行: Link / Prob / Volume / Liquidity)"""
+        if not rows:
+            return
+        with self._locked():
+            # 距上一采样不足一个采样间隔时覆盖上一采样，否则推进到下一行并清空
+            if self.head < 0 or now - self.times[self.head] >= self.step:
+                self.head = (self.head + 1) % self.samples
+                self.prob[self.head] = PROB_MISSING
+                self.volume[self.head] = LOG_MISSING
+                self.liquidity[self.head] = LOG_MISSING
+            self.times[self.head] = now
+
+            slots = np.fromiter((self._slot_for(r['Link'], now) for r in rows), dtype=np.int64, count=len(rows))
+            self.prob[self.head, slots] = encode_prob([r['Prob'] for r in rows])
+            self.volume[self.head, slots] = encode_log([r['Volume'] for r in rows])
+            self.liquidity[self.head, slots] = encode_log([r.get('Liquidity', 0) for r in rows])
+            self.last_seen[slots] = now
+            self._save_meta()
+
+    # ---------- 查询 ----------
+
+    def _sample_at(self, ts):
+        """不晚于 ts 的最近一个采样行；历史不足时取最早的采样"""
+        times = np.asarray(self.times)
+        valid = ~np.isnan(times)
+        if not valid.any():
+            return None
+        candidates = np.where(valid & (times <= ts))[0]
+        if len(candidates):
+            return int(candidates[np.argmax(times[candidates])])
+        return int(np.where(valid)[0][np.argmin(times[valid])])
+
+    def prob_deltas(self, links, windows, now):
+        """各市场在各窗口内的胜率变化 (当前 - 窗口起点)，返回 shape (len(links), len(windows))，无历史为 NaN"""
+        out = np.full((len(links), len(windows)), np.nan)
+        with self._locked():
+            if self.head < 0 or not len(links):
+                return out
+            slots = np.fromiter((self.slots.get(l, -1) for l in links), dtype=np.int64, count=len(links))
+            known = slots >= 0
+            current = decode_prob(self.prob[self.head, slots[known]])
+            for j, window in enumerate(windows):
+                past_row = self._sample_at(now - window)
+                if past_row is None or past_row == self.head:
+                    continue
+                past = decode_prob(self.prob[past_row, slots[known]])
+                out[known, j] = current - past
+        return out
+
+
+# 进程内共享的历史实例
+history = PriceHistory()
@@ -0,0 +1,240 @@
+"""侦察性能剖析 (SCOUT_PROFILE，Web 服务为 /api/scout?profile=1)
+
+- sample (SCOUT_PROFILE=1): 采样剖析，每 SCOUT_PROFILE_INTERVAL 秒抓取一次参与本次侦察的线程调用栈
+  (含等待网络/队列的时间)，输出 collapsed stacks，可直接用 flamegraph.pl / speedscope 打开
+- cprofile: 确定性剖析，输出 .prof (pstats / snakeviz) 与累计耗时排名的文本摘要
+- 只采集本次侦察的线程: 侦察线程自身，以及经 traced() 包装后提交到拉取线程池 / 分片线程的任务，
+  Web 服务中并发的其它侦察不会混入
+- 关闭时 capture() 不创建任何对象，traced() 原样返回函数
+- cprofile 每个进程同时只进行一次 (Python 3.12+ 同一时刻只允许一个剖析器)；已有 cprofile 采集进行中、
+  或剖析器被其它工具占用时，本次自动退回 sample 模式
+
+产物保存在 SCOUT_PROFILE_DIR (默认 profiles/)，文件名为 <时间>-<方案>-<模式>，
+另有同名 .json 记录配置、时间与采样数。
+"""
+import io
+import os
+import re
+import sys
+import json
+import time
+import threading
+import contextvars
+from collections import Counter
+from contextlib import contextmanager
+
+PROFILE_DIR = os.getenv("SCOUT_PROFILE_DIR", "profiles")
+PROFILE_INTERVAL = float(os.getenv("SCOUT_PROFILE_INTERVAL", 0.005) or 0.005)  # 采样间隔 (秒)
+PROFILE_TOP = 40  # cprofile 文本摘要的函数数
+
+_active = contextvars.ContextVar('scout_profile_capture', default=None)
+_cprofile_lock = threading.Lock()  # 同一进程同时只允许一次 cprofile 采集
+
+
+def parse_mode(value):
+    """SCOUT_PROFILE 取值 -> 'sample' / 'cprofile' / None (关闭)"""
+    value = str(value or "").strip().lower()
+    if value in ("", "0", "false", "no", "off"):
+        return None
+    if value in ("cprofile", "deterministic"):
+        return "cprofile"
+    return "sample"
+
+
+class ProfileCapture:
+    """一次侦察的剖析采集器 (线程安全)"""
+
+    def __init__(self, mode, interval=PROFILE_INTERVAL):
+        self.mode = mode
+        self.interval = interval
+        self.started_at = time.time()
+        self.elapsed = 0.0
+        self.samples = 0
+        self.stacks = Counter()
+        self._lock = threading.Lock()
+        self._threads = {}     # 线程 ident -> cProfile.Profile (sample 模式为 None)
+        self._profiles = []    # 已退出线程的 cProfile 结果
+        self._labels = {}      # code 对象 -> 栈帧标签
+        self._stop = threading.Event()
+        self._sampler = None
+        self._t0 = 0.0
+
+    # ---------- 线程登记 ----------
+
+    def enter(self):
+        """把当前线程加入采集范围，返回是否新登记 (已登记的线程重复进入时不做任何事)"""
+        ident = threading.get_ident()
+        with self._lock:
+            if ident in self._threads:
+                return False
+            self._threads[ident] = None
+        if self.mode == "cprofile":
+            import cProfile
+            prof = cProfile.Profile()
+            try:
+                prof.enable()
+            except ValueError:
+                # Python 3.12+ (sys.monitoring) 同一时刻只能启用一个剖析器: 该线程不单独剖析，
+                # 其调用由已启用的剖析器记录 (3.12+ 的剖析器覆盖所有线程)
+                return True
+            with self._lock:
+                self._threads[ident] = prof
+        return True
+
+    def leave(self, entered=True):
+        if not entered:
+            return
+        with self._lock:
+            prof = self._threads.pop(threading.get_ident(), None)
+        if prof is not None:
+            prof.disable()
+            with self._lock:
+                self._profiles.append(prof)
+
+    # ---------- 采样 ----------
+
+    def _label(self, code):
+        label = self._labels.get(code)
+        if label is None:
+            label = self._labels[code] = f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+        return label
+
+    def _sample_loop(self):
+        while not self._stop.wait(self.interval):
+            frames = sys._current_frames()
+            with self._lock:
+                idents = list(self._threads)
+            for ident in idents:
+                frame = frames.get(ident)
+                stack = []
+                while frame is not None:
+                    stack.append(self._label(frame.f_code))
+                    frame = frame.f_back
+                if stack:
+                    self.stacks[";".join(reversed(stack))] += 1
+            self.samples += 1
+            del frames
+
+    def start(self):
+        self._t0 = time.perf_counter()
+        entered = self.enter()
+        if self.mode == "cprofile" and self._threads.get(threading.get_ident()) is None:
+            # 剖析器已被其它工具 (调试器 / 覆盖率 / 另一剖析器) 占用: 本次退回采样模式
+            self.mode = "sample"
+        if self.mode == "sample":
+            self._sampler = threading.Thread(target=self._sample_loop, name="scout-profiler", daemon=True)
+            self._sampler.start()
+        return entered
+
+    def stop(self, entered=True):
+        self.leave(entered)
+        if self._sampler is not None:
+            self._stop.set()
+            self._sampler.join()
+        self.elapsed = time.perf_counter() - self._t0
+
+    # ---------- 产物 ----------
+
+    def save(self, label, config=None, extra=None, directory=None):
+        """写入剖析产物，返回文件名前缀 (位于 directory 下)"""
+        directory = directory or PROFILE_DIR
+        os.makedirs(directory, exist_ok=True)
+        stamp = time.strftime("%Y%m%d-%H%M%S", time.localtime(self.started_at))
+        stamp += f"{int(self.started_at * 1000) % 1000:03d}"
+        slug = re.sub(r"[^\w.-]+", "_", label or "custom")
+        name = f"{stamp}-{slug}-{self.mode}"
+        base = os.path.join(directory, name)
+
+        files = []
+        if self.mode == "sample":
+            with open(f"{base}.collapsed", "w", encoding="utf-8") as f:
+                for stack, n in self.stacks.most_common():
+                    f.write(f"{stack} {n}\n")
+            files.append(f"{name}.collapsed")
+        else:
+            import pstats
+            with self._lock:
+                profiles = list(self._profiles)
+            stats = pstats.Stats(*profiles, stream=io.StringIO()) if profiles else None
+            if stats is not None:
+                stats.dump_stats(f"{base}.prof")
+                stats.stream = io.StringIO()
+                stats.sort_stats("cumulative").print_stats(PROFILE_TOP)
+                with open(f"{base}.txt", "w", encoding="utf-8") as f:
+                    f.write(stats.stream.getvalue())
+                files += [f"{name}.prof", f"{name}.txt"]
+
+        meta = {
+            "name": name,
+            "label": label,
+            "mode": self.mode,
+            "started_at": self.started_at,
+            "elapsed": round(self.elapsed, 3),
+            "interval": self.interval if self.mode == "sample" else None,
+            "samples": self.samples if self.mode == "sample" else None,
+            "files": files,
+            "config": config or {},
+            **(extra or {}),
+        }
+        with open(f"{base}.json", "w", encoding="utf-8") as f:
+            json.dump(meta, f, ensure_ascii=False, indent=2)
+        return name
+
+
+@contextmanager
+def capture(mode):
+    """在 mode 开启时剖析 with 块 (yield ProfileCapture)，关闭时 yield None 且无额外开销"""
+    mode = parse_mode(mode)
+    if mode is None:
+        yield None
+        return
+    locked = mode == "cprofile" and _cprofile_lock.acquire(blocking=False)
+    if mode == "cprofile" and not locked:
+        mode = "sample"  # 已有 cprofile 采集进行中 (如 Web 服务中并发的剖析任务)
+    cap = ProfileCapture(mode)
+    token = _active.set(cap)
+    try:
+        entered = cap.start()
+        try:
+            yield cap
+        finally:
+            cap.stop(entered)
+    finally:
+        _active.reset(token)
+        if locked:
+            _cprofile_lock.release()
+
+
+def traced(fn):
+    """把 fn 纳入进行中的剖析 (在提交线程池任务前调用)；没有进行中的剖析时原样返回 fn"""
+    cap = _active.get()
+    if cap is None:
+        return fn
+
+    def wrapper(*args, **kwargs):
+        entered = cap.enter()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            cap.leave(entered)
+    return wrapper
+
+
+def list_profiles(directory=None):
+    """已保存的剖析产物 (新的在前)"""
+    directory = directory or PROFILE_DIR
+    items = []
+    try:
+        names = os.listdir(directory)
+    except OSError:
+        return items
+    for fname in names:
+        if not fname.endswith(".json"):
+            continue
+        try:
+            with open(os.path.join(directory, fname), "r", encoding="utf-8") as f:
+                items.append(json.load(f))
+        except (OSError, ValueError):
+            continue
+    items.sort(key=lambda m: m.get("started_at", 0), reverse=True)
+    return items
@@ -0,0 +1,196 @@
+"""Gamma API 自适应限速器 (令牌桶，状态存放在 .cache/governor.db，CLI 与 Web 服务进程共用同一份额度)
+
+- 令牌桶: 按当前速率 (次/秒) 补充令牌，容量为 burst，每个请求消耗一个令牌
+- AIMD: 收到 429/503 时速率减半并暂停 (优先遵循 Retry-After)，之后每个成功响应线性恢复，最高回到配置速率
+- 桶状态在 SQLite 中以 BEGIN IMMEDIATE 事务读改写，多个进程同时扫描时合计速率不超过同一上限
+- SQLite 不可用 (只读目录等) 时退回进程内令牌桶
+"""
+import os
+import math
+import time
+import sqlite3
+import threading
+from email.utils import parsedate_to_datetime
+
+CACHE_DIR = ".cache"
+DB_FILE = os.path.join(CACHE_DIR, "governor.db")
+
+RATE_LIMIT = float(os.getenv("SCOUT_RATE_LIMIT", 10) or 0)    # 最高速率 (次/秒)，0 表示不限速
+RATE_BURST = float(os.getenv("SCOUT_RATE_BURST", 10) or 1)     # 令牌桶容量 (允许的瞬时突发)
+RATE_MIN = float(os.getenv("SCOUT_RATE_MIN", 0.5) or 0.5)      # 退避后的最低速率
+RATE_STEP = float(os.getenv("SCOUT_RATE_STEP", 0.2) or 0.2)    # 每个成功响应恢复的速率
+THROTTLE_PAUSE = 2.0  # 429/503 未给出 Retry-After 时的暂停秒数
+RETRY_AFTER_MAX = float(os.getenv("SCOUT_RETRY_AFTER_MAX", 300) or 300)  # 单次遵循 Retry-After 的最长暂停 (秒)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS bucket (
+    name TEXT PRIMARY KEY,
+    tokens REAL NOT NULL,
+    rate REAL NOT NULL,
+    updated REAL NOT NULL,
+    paused_until REAL NOT NULL DEFAULT 0
+);
+"""
+
+
+def parse_retry_after(value, now=None):
+    """Retry-After 头 (秒数或 HTTP 日期) -> 需要等待的秒数 (不超过 RETRY_AFTER_MAX)，无法解析返回 None
+
+    inf / nan 等非有限值视为无法解析，避免一个异常响应让共享额度永久暂停。
+    """
+    if value is None or value == "":
+        return None
+    value = str(value).strip()
+    try:
+        seconds = float(value)
+    except ValueError:
+        try:
+            seconds = parsedate_to_datetime(value).timestamp() - (time.time() if now is None else now)
+        except (TypeError, ValueError, IndexError, OverflowError):
+            return None
+    if not math.isfinite(seconds):
+        return None
+    return min(RETRY_AFTER_MAX, max(0.0, seconds))
+
+
+class RateGovernor:
+    """跨进程共享的自适应令牌桶 (线程安全: 每次操作使用独立连接)
+
+    桶状态为 [tokens, rate, updated, paused_until]。
+    """
+
+    def __init__(self, path=DB_FILE, max_rate=RATE_LIMIT, burst=RATE_BURST, min_rate=RATE_MIN,
+                 step=RATE_STEP, name="gamma"):
+        self.path = path
+        self.max_rate = max_rate
+        self.burst = max(1.0, burst)
+        self.min_rate = min(min_rate, max_rate) if max_rate > 0 else min_rate
+        self.step = step
+        self.name = name
+        self._lock = threading.Lock()
+        self._initialized = False
+        self._shared = True
+        self._local = None
+        self._rate_hint = max_rate
+
+    @property
+    def enabled(self):
+        return self.max_rate > 0
+
+    # ---------- 状态存储 ----------
+
+    def _connect(self):
+        if not self._initialized:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=10)
+            try:
+                conn.executescript(SCHEMA)
+            finally:
+                conn.close()
+            self._initialized = True
+        return sqlite3.connect(self.path, timeout=10, isolation_level=None)
+
+    def _update(self, fn):
+        """原子地读改写桶状态: fn(state, now) 原地修改 state 并返回结果"""
+        if self._shared:
+            try:
+                conn = self._connect()
+                try:
+                    conn.execute("BEGIN IMMEDIATE")
+                    now = time.time()
+                    row = conn.execute(
+                        "SELECT tokens, rate, updated, paused_until FROM bucket WHERE name = ?", (self.name,)
+                    ).fetchone()
+                    state = list(row) if row else [self.burst, self.max_rate, now, 0.0]
+                    result = self._apply(fn, state, now)
+                    conn.execute("INSERT OR REPLACE INTO bucket VALUES (?, ?, ?, ?, ?)", (self.name, *state))
+                    conn.execute("COMMIT")
+                    return result
+                finally:
+                    conn.close()
+            except sqlite3.Error:
+                # 无法共享状态: 退回进程内令牌桶
+                self._shared = False
+        with self._lock:
+            now = time.time()
+            if self._local is None:
+                self._local = [self.burst, self.max_rate, now, 0.0]
+            return self._apply(fn, self._local, now)
+
+    def _apply(self, fn, state, now):
+        # 按经过的时间补充令牌 (速率不超过本进程配置的上限；暂停期间不补充，暂停结束后不会立刻突发)
+        state[1] = max(self.min_rate, min(state[1], self.max_rate))
+        state[0] = min(self.burst, state[0] + max(0.0, now - max(state[2], state[3])) * state[1])
+        state[2] = now
+        result = fn(state, now)
+        self._rate_hint = state[1]
+        return result
+
+    # ---------- 令牌 ----------
+
+    @staticmethod
+    def _take(state, now):
+        if state[3] > now:
+            return state[3] - now
+        if state[0] >= 1:
+            state[0] -= 1
+            return 0.0
+        return (1 - state[0]) / state[1]
+
+    def acquire(self, deadline=None):
+        """等待并取得一个令牌，返回等待的秒数；deadline 前取不到令牌时返回 None"""
+        if not self.enabled:
+            return 0.0
+        waited = 0.0
+        while True:
+            wait = self._update(self._take)
+            if wait <= 0:
+                return waited
+            if deadline is not None and time.time() + wait > deadline:
+                return None
+            time.sleep(wait)
+            waited += wait
+
+    # ---------- 反馈 ----------
+
+    def throttle(self, retry_after=None):
+        """上游限流 (429/503): 速率减半并暂停，同一暂停期内的多个限流响应只减速一次"""
+        if not self.enabled:
+            return
+
+        def backoff(state, now):
+            if state[3] <= now:
+                state[1] = max(self.min_rate, state[1] / 2)
+            state[0] = 0.0
+            pause = THROTTLE_PAUSE if retry_after is None else retry_after
+            state[3] = max(state[3], now + pause)
+
+        self._update(backoff)
+
+    def success(self):
+        """成功响应: 速率线性恢复 (已在上限时不写状态)"""
+        if not self.enabled or self._rate_hint >= self.max_rate:
+            return
+
+        def recover(state, now):
+            state[1] = min(self.max_rate, state[1] + self.step)
+
+        self._update(recover)
+
+    def status(self):
+        """当前速率、上限、可用令牌与剩余暂停时间"""
+        if not self.enabled:
+            return {'enabled': False, 'rate': 0.0, 'max_rate': 0.0, 'tokens': 0.0, 'paused_for': 0.0, 'shared': False}
+        rate, tokens, paused_for = self._update(lambda state, now: (state[1], state[0], max(0.0, state[3] - now)))
+        return {
+            'enabled': True,
+            'rate': round(rate, 3),
+            'max_rate': self.max_rate,
+            'tokens': round(tokens, 2),
+            'paused_for': round(paused_for, 2),
+            'shared': self._shared,
+        }
+
+
+# 进程内共享的限速器实例 (跨进程的额度通过 SQLite 共享)
+governor = RateGovernor()
@@ -1,61 +1,242 @@
-import sys
-import requests
-import pandas as pd
 import time
+_IMPORT_T0 = time.perf_counter()  # 冷启动计时起点 (见 startup_seconds)
+
+import sys
+import re
+import json
 import os
+import queue
+import threading
+import heapq
+import importlib
+import contextvars
+from collections import deque
+from dataclasses import dataclass, field, fields, asdict
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeout
+from contextlib import contextmanager
+from datetime import datetime, timezone
 from dotenv import load_dotenv
-from rich.console import Console
-from rich.table import Table
 
-# 加载配置
+# 加载配置 (须在导入本地模块之前: http_client / rate_governor 等在导入时读取 SCOUT_* 变量)
 load_dotenv()
 
+# [核心优化] 冷启动: numpy / rich / 快照库 / 价格历史在首次用到时才导入，pandas 不在常规路径上
+import tag_index
+import metrics
+import profiling
+import webhooks
+from http_client import client as http, GAMMA_API
+from market_fields import to_float, first_price, parse_iso8601
+
 # 处理 Windows 系统中的 UTF-8 编码问题
 # 移除手动重定向，交给 rich 处理
 
+def _trie_pattern(node):
+    """把前缀树递归展开为正则 (已到达词尾的分支无需再展开更长的词)"""
+    if "" in node:
+        return ""
+    branches = []
+    for ch in sorted(node):
+        branches.append(re.escape(ch) + _trie_pattern(node[ch]))
+    if len(branches) == 1:
+        return branches[0]
+    return "(?:" + "|".join(branches) + ")"
 
-console = Console()
-
-# 配置载入 (主要从 .env 加载，如果存在 SCOUT_AUTO_PRESET 则从预设 JSON 覆盖)
-MIN_VOLUME = float(os.getenv("SCOUT_MIN_VOLUME", 5000))
-MIN_PROB = float(os.getenv("SCOUT_MIN_PROB", 0.15))
-MAX_PROB = float(os.getenv("SCOUT_MAX_PROB", 0.85))
-FETCH_LIMIT = int(os.getenv("SCOUT_FETCH_LIMIT", 200))
-MAX_RUNTIME = int(os.getenv("SCOUT_RUNTIME_LIMIT", 30))
-SCOUT_TAG_NAME = os.getenv("SCOUT_TAG", "").strip()
-MIN_LIQUIDITY = float(os.getenv("SCOUT_MIN_LIQUIDITY", 0) or 0)
-MAX_DAYS_TO_END = int(os.getenv("SCOUT_MAX_DAYS_TO_END", -1) or -1)
-SEARCH_KEYWORD = os.getenv("SCOUT_SEARCH", "").strip()
-EXCLUDE_KEYWORDS_RAW = os.getenv("SCOUT_EXCLUDE_KEYWORDS", "")
-ORDER_BY = os.getenv("SCOUT_ORDER_BY", "volume").strip().lower()
-
-# [Automation] 默认任务预设覆盖逻辑
-AUTO_PRESET = os.getenv("SCOUT_AUTO_PRESET", "").strip().replace("'", "").replace('"', '')
-if AUTO_PRESET:
-    import json
-    preset_path = os.path.join("presets", f"{AUTO_PRESET}.json")
-    if os.path.exists(preset_path):
-        console.print(f"[bold cyan][Mikon AI][/bold cyan] 🤖 自动化模式启动: [yellow]{AUTO_PRESET}[/yellow]")
-        try:
-            with open(preset_path, 'r', encoding='utf-8') as f:
-                preset_data = json.load(f)
-                if "SCOUT_MIN_VOLUME" in preset_data: MIN_VOLUME = float(preset_data["SCOUT_MIN_VOLUME"] or 0)
-                if "SCOUT_MIN_PROB" in preset_data: MIN_PROB = float(preset_data["SCOUT_MIN_PROB"] or 0)
-                if "SCOUT_MAX_PROB" in preset_data: MAX_PROB = float(preset_data["SCOUT_MAX_PROB"] or 1)
-                if "SCOUT_TAG" in preset_data: SCOUT_TAG_NAME = str(preset_data["SCOUT_TAG"] or "").strip()
-                if "SCOUT_MIN_LIQUIDITY" in preset_data: MIN_LIQUIDITY = float(preset_data["SCOUT_MIN_LIQUIDITY"] or 0)
-                if "SCOUT_MAX_DAYS_TO_END" in preset_data: MAX_DAYS_TO_END = int(preset_data.get("SCOUT_MAX_DAYS_TO_END") or -1)
-                if "SCOUT_SEARCH" in preset_data: SEARCH_KEYWORD = str(preset_data["SCOUT_SEARCH"] or "").strip()
-                if "SCOUT_EXCLUDE_KEYWORDS" in preset_data: EXCLUDE_KEYWORDS_RAW = str(preset_data["SCOUT_EXCLUDE_KEYWORDS"] or "")
-                if "SCOUT_ORDER_BY" in preset_data: ORDER_BY = str(preset_data["SCOUT_ORDER_BY"] or "volume").strip().lower()
-                if "SCOUT_FETCH_LIMIT" in preset_data: FETCH_LIMIT = int(preset_data["SCOUT_FETCH_LIMIT"] or 200)
-                if "SCOUT_RUNTIME_LIMIT" in preset_data: MAX_RUNTIME = int(preset_data["SCOUT_RUNTIME_LIMIT"] or 30)
-                console.print(f"[green]✅ 已同步 [bold]{AUTO_PRESET}[/bold] 的所有作战指令。[/green]\n")
-        except Exception as e:
-            console.print(f"[red]❌ 预设加载失败: {e}[/red]")
+class KeywordMatcher:
+    """多关键词匹配器: 每次运行只编译一次，把整张关键词表合并成单个前缀树正则。
+
+    语义与逐词 `kw in text.lower()` 的 OR 匹配完全一致；公共前缀被合并，
+    单次扫描的开销基本不随关键词数量增长。
+    """
+
+    def __init__(self, keywords):
+        self.keywords = sorted({str(k).strip().lower() for k in keywords if str(k).strip()})
+        self._regex = None
+        if self.keywords:
+            trie = {}
+            for kw in self.keywords:
+                node = trie
+                for ch in kw:
+                    node = node.setdefault(ch, {})
+                node[""] = {}
+            self._regex = re.compile(_trie_pattern(trie))
+
+    @classmethod
+    def from_csv(cls, raw):
+        """由逗号分隔的配置字符串构建"""
+        return cls(str(raw or "").split(','))
+
+    def __bool__(self):
+        return self._regex is not None
+
+    def search(self, text_lower):
+        """text_lower 需已转为小写；命中任一关键词返回 True"""
+        return self._regex is not None and self._regex.search(text_lower) is not None
+
+# 不影响结果集的执行参数 (并发度 / 过滤实现 / 历史记录开关 / 预设名 / 性能剖析 / 推送地址) 不参与缓存键
+# (Web 服务对缓存命中与合并的请求仍按各自的推送地址推送，见 server.submit_job)；
+# 下推开关会改变无匹配时兜底展示的全局快照，因此参与
+_CACHE_KEY_EXCLUDE = ('fetch_concurrency', 'filter_mode', 'history', 'preset', 'profile', 'webhook_url')
+
+def _is_on(value):
+    return str(value).strip().lower() not in ("0", "false", "no", "off")
+
+# 无头模式 (SCOUT_HEADLESS=1 或 --headless): 不导入 rich、不渲染表格，日志输出为纯文本 (定时任务 / 只推送 Webhook)
+HEADLESS = _is_on(os.getenv("SCOUT_HEADLESS", "0"))
+
+_MARKUP_RE = re.compile(r'\[/?[a-z][a-z0-9 _.#,=-]*\]|\[/\]')
+
+class PlainConsole:
+    """无头模式的输出: 兼容 rich Console 的 print / rule / status 用法，去掉样式标记后按行输出"""
+
+    def __init__(self, file=None):
+        self.file = file
+
+    def print(self, *objects, **kwargs):
+        text = " ".join(str(o) for o in objects)
+        print(_MARKUP_RE.sub("", text), file=self.file or sys.stdout, flush=True)
+
+    def rule(self, title="", **kwargs):
+        self.print(f"──── {title} ────" if title else "─" * 40)
+
+    @contextmanager
+    def status(self, message, **kwargs):
+        self.print(message)
+        yield self
+
+_console = None
+
+def _resolve_console(c):
+    """未指定输出目标时使用模块级 console (CLI 终端，首次输出时才创建；无头模式为 PlainConsole)"""
+    global _console
+    if c is not None:
+        return c
+    if _console is None:
+        if HEADLESS:
+            _console = PlainConsole()
+        else:
+            from rich.console import Console
+            _console = Console()
+    return _console
+
+@dataclass
+class ScoutConfig:
+    """一次侦察的完整配置 (CLI 从环境变量构建，Web 服务按请求参数构建)"""
+    min_volume: float = 5000
+    min_prob: float = 0.15
+    max_prob: float = 0.85
+    fetch_limit: int = 200
+    runtime_limit: int = 30
+    tag: str = ""
+    min_liquidity: float = 0
+    max_days_to_end: int = -1
+    search: str = ""
+    exclude_keywords: str = ""
+    order_by: str = "volume"
+    fetch_concurrency: int = 10
+    filter_mode: str = "batch"
+    search_fields: str = "title"
+    pushdown: bool = True
+    store: bool = False
+    fetch_mode: str = "markets"
+    history: bool = False
+    momentum_windows: str = "1h,6h,24h"
+    webhook_url: str = ""
+    preset: str = ""
+    profile: str = ""          # 性能剖析模式 (sample / cprofile，空为关闭，见 profiling.py)
+
+    # 派生字段: 关键词表每次运行只编译一次 (SCOUT_SEARCH_FIELDS=title,description 时搜索词同时匹配描述)
+    search_matcher: "KeywordMatcher" = field(init=False, repr=False, compare=False)
+    exclude_matcher: "KeywordMatcher" = field(init=False, repr=False, compare=False)
+    search_in_description: bool = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        self.fetch_concurrency = max(1, self.fetch_concurrency)
+        self.search_matcher = KeywordMatcher.from_csv(self.search)
+        self.exclude_matcher = KeywordMatcher.from_csv(self.exclude_keywords)
+        self.search_in_description = "description" in [f.strip().lower() for f in self.search_fields.split(',')]
+
+    def cache_key(self):
+        """归一化配置键: 结果相同的配置得到相同的键 (关键词去重排序、品类不区分大小写)"""
+        data = {f.name: getattr(self, f.name) for f in fields(self) if f.init and f.name not in _CACHE_KEY_EXCLUDE}
+        data['tag'] = ",".join(t.strip().lower() for t in self.tag.split(',') if t.strip())
+        data['search'] = self.search_matcher.keywords
+        data['exclude_keywords'] = self.exclude_matcher.keywords
+        data['search_fields'] = self.search_in_description
+        return json.dumps(data, sort_keys=True, ensure_ascii=False)
+
+    @classmethod
+    def from_env(cls, env=None, console=None):
+        """配置载入 (主要从 .env 加载，如果存在 SCOUT_AUTO_PRESET 则从预设 JSON 覆盖)"""
+        env = os.environ if env is None else env
+        console = _resolve_console(console)
+        values = {
+            'min_volume': float(env.get("SCOUT_MIN_VOLUME") or 5000),
+            'min_prob': float(env.get("SCOUT_MIN_PROB") or 0.15),
+            'max_prob': float(env.get("SCOUT_MAX_PROB") or 0.85),
+            'fetch_limit': int(env.get("SCOUT_FETCH_LIMIT") or 200),
+            'runtime_limit': int(env.get("SCOUT_RUNTIME_LIMIT") or 30),
+            'tag': env.get("SCOUT_TAG", "").strip(),
+            'min_liquidity': float(env.get("SCOUT_MIN_LIQUIDITY", 0) or 0),
+            'max_days_to_end': int(env.get("SCOUT_MAX_DAYS_TO_END", -1) or -1),
+            'search': env.get("SCOUT_SEARCH", "").strip(),
+            'exclude_keywords': env.get("SCOUT_EXCLUDE_KEYWORDS", ""),
+            'order_by': env.get("SCOUT_ORDER_BY", "volume").strip().lower(),
+            'fetch_concurrency': int(env.get("SCOUT_FETCH_CONCURRENCY", 10) or 10),
+            'filter_mode': env.get("SCOUT_FILTER_MODE", "batch").strip().lower(),
+            'search_fields': env.get("SCOUT_SEARCH_FIELDS", "title"),
+            'pushdown': _is_on(env.get("SCOUT_PUSHDOWN", "1")),
+            'store': _is_on(env.get("SCOUT_STORE", "0")),
+            'fetch_mode': env.get("SCOUT_FETCH_MODE", "markets").strip().lower(),
+            'history': _is_on(env.get("SCOUT_HISTORY", "0")),
+            'momentum_windows': env.get("SCOUT_MOMENTUM_WINDOWS", "1h,6h,24h"),
+            'webhook_url': env.get("SCOUT_WEBHOOK_URL", "").strip(),
+            'profile': profiling.parse_mode(env.get("SCOUT_PROFILE", "")) or "",
+        }
+
+        # [Automation] 默认任务预设覆盖逻辑
+        auto_preset = env.get("SCOUT_AUTO_PRESET", "").strip().replace("'", "").replace('"', '')
+        if auto_preset:
+            values.update(load_preset_overrides(auto_preset, console))
+            values['preset'] = auto_preset
+        return cls(**values)
+
+def load_preset_overrides(name, console=None):
+    """读取 presets/<name>.json，返回需要覆盖的配置字段"""
+    console = _resolve_console(console)
+    overrides = {}
+    preset_path = os.path.join("presets", f"{name}.json")
+    if not os.path.exists(preset_path):
+        return overrides
+    console.print(f"[bold cyan][Mikon AI][/bold cyan] 🤖 自动化模式启动: [yellow]{name}[/yellow]")
+    try:
+        with open(preset_path, 'r', encoding='utf-8') as f:
+            preset_data = json.load(f)
+            if "SCOUT_MIN_VOLUME" in preset_data: overrides['min_volume'] = float(preset_data["SCOUT_MIN_VOLUME"] or 0)
+            if "SCOUT_MIN_PROB" in preset_data: overrides['min_prob'] = float(preset_data["SCOUT_MIN_PROB"] or 0)
+            if "SCOUT_MAX_PROB" in preset_data: overrides['max_prob'] = float(preset_data["SCOUT_MAX_PROB"] or 1)
+            if "SCOUT_TAG" in preset_data: overrides['tag'] = str(preset_data["SCOUT_TAG"] or "").strip()
+            if "SCOUT_MIN_LIQUIDITY" in preset_data: overrides['min_liquidity'] = float(preset_data["SCOUT_MIN_LIQUIDITY"] or 0)
+            if "SCOUT_MAX_DAYS_TO_END" in preset_data: overrides['max_days_to_end'] = int(preset_data.get("SCOUT_MAX_DAYS_TO_END") or -1)
+            if "SCOUT_SEARCH" in preset_data: overrides['search'] = str(preset_data["SCOUT_SEARCH"] or "").strip()
+            if "SCOUT_EXCLUDE_KEYWORDS" in preset_data: overrides['exclude_keywords'] = str(preset_data["SCOUT_EXCLUDE_KEYWORDS"] or "")
+            if "SCOUT_ORDER_BY" in preset_data: overrides['order_by'] = str(preset_data["SCOUT_ORDER_BY"] or "volume").strip().lower()
+            if "SCOUT_FETCH_LIMIT" in preset_data: overrides['fetch_limit'] = int(preset_data["SCOUT_FETCH_LIMIT"] or 200)
+            if "SCOUT_RUNTIME_LIMIT" in preset_data: overrides['runtime_limit'] = int(preset_data["SCOUT_RUNTIME_LIMIT"] or 30)
+            if "SCOUT_FETCH_CONCURRENCY" in preset_data: overrides['fetch_concurrency'] = int(preset_data["SCOUT_FETCH_CONCURRENCY"] or 10)
+            if "SCOUT_FILTER_MODE" in preset_data: overrides['filter_mode'] = str(preset_data["SCOUT_FILTER_MODE"] or "batch").strip().lower()
+            if "SCOUT_SEARCH_FIELDS" in preset_data: overrides['search_fields'] = str(preset_data["SCOUT_SEARCH_FIELDS"] or "title")
+            if "SCOUT_PUSHDOWN" in preset_data: overrides['pushdown'] = _is_on(preset_data["SCOUT_PUSHDOWN"])
+            if "SCOUT_STORE" in preset_data: overrides['store'] = _is_on(preset_data["SCOUT_STORE"])
+            if "SCOUT_FETCH_MODE" in preset_data: overrides['fetch_mode'] = str(preset_data["SCOUT_FETCH_MODE"] or "markets").strip().lower()
+            if "SCOUT_HISTORY" in preset_data: overrides['history'] = _is_on(preset_data["SCOUT_HISTORY"])
+            if "SCOUT_MOMENTUM_WINDOWS" in preset_data: overrides['momentum_windows'] = str(preset_data["SCOUT_MOMENTUM_WINDOWS"] or "1h,6h,24h")
+            console.print(f"[green]✅ 已同步 [bold]{name}[/bold] 的所有作战指令。[/green]\n")
+    except Exception as e:
+        console.print(f"[red]❌ 预设加载失败: {e}[/red]")
+    return overrides
 
-# 后处理
-EXCLUDE_KEYWORDS = [k.strip().lower() for k in EXCLUDE_KEYWORDS_RAW.split(',') if k.strip()]
+PAGE_SIZE = 500  # 单次最大 500 (Gamma API 限制)
 
 def get_tag_id(tag_name):
     """根据品类名称智能匹配 Tag ID"""
@@ -66,370 +247,1536 @@ def get_tag_id(tag_name):
     if str(tag_name).isdigit():
         return str(tag_name), f"Tag-{tag_name}"
 
+    # 从本地标签索引匹配 (优先精确匹配，其次模糊匹配)；索引过期时后台刷新，不阻塞本次侦察
+    index = tag_index.get_index()
+    if index is None:
+        return None, None
+    return index.lookup(tag_name)
+
+def resolve_tags(tag_text):
+    """解析品类配置 (逗号分隔的名称或 ID)，返回 ([(id, label), ...], [未匹配的名称])，重复的品类只保留一次"""
+    resolved, missing, seen = [], [], set()
+    for name in [t.strip() for t in str(tag_text or "").split(',') if t.strip()]:
+        tag_id, label = get_tag_id(name)
+        if not tag_id:
+            missing.append(name)
+            continue
+        if str(tag_id) in seen:
+            continue
+        seen.add(str(tag_id))
+        resolved.append((tag_id, label))
+    return resolved, missing
+
+# 过滤流水线 (含快照库、批量模式的本地筛选) 实际读取的市场字段，其余字段解析后立即丢弃
+MARKET_FIELDS = (
+    'id', 'question', 'title', 'slug', 'market_slug',
+    'volume', 'volumeNum', 'liquidity', 'liquidityNum',
+    'outcomePrices', 'tokens', 'endDate', 'updatedAt',
+    'closed', 'resolved', 'active', 'archived', 'description',
+)
+
+class MarketRecord:
+    """精简市场记录: 只保留 MARKET_FIELDS，以 __slots__ 存储 (无实例 __dict__)
+
+    读取接口与 dict 一致 (get / [] / items)，原始记录中不存在的字段同样视为缺失。
+    """
+    __slots__ = MARKET_FIELDS
+
+    def get(self, key, default=None):
+        return getattr(self, key, default)
+
+    def __getitem__(self, key):
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key) from None
+
+    def items(self):
+        return [(k, getattr(self, k)) for k in MARKET_FIELDS if hasattr(self, k)]
+
+def project_market(m, with_description=False):
+    """[核心优化] 原始市场 dict -> MarketRecord (description 体积最大，仅在需要时保留)"""
+    rec = MarketRecord()
+    for key in MARKET_FIELDS if with_description else MARKET_FIELDS[:-1]:
+        if key in m:
+            setattr(rec, key, m[key])
+    tokens = m.get('tokens')
+    if tokens:
+        # outcomePrices 缺失时的价格兜底只用到各 token 的 price
+        rec.tokens = [{'price': t['price']} for t in tokens if isinstance(t, dict) and t.get('price') is not None]
+    return rec
+
+_JSON_DECODER = json.JSONDecoder()
+_JSON_WS = re.compile(r'[ \t\n\r]*')
+
+def iter_json_array(text):
+    """逐个元素解析顶层 JSON 数组 (不先构造整页 list)，非数组或格式错误时抛出 ValueError"""
+    idx = _JSON_WS.match(text).end()
+    if text[idx:idx + 1] != '[':
+        raise ValueError("not a JSON array")
+    idx = _JSON_WS.match(text, idx + 1).end()
+    if text[idx:idx + 1] == ']':
+        return
+    while True:
+        item, idx = _JSON_DECODER.raw_decode(text, idx)
+        yield item
+        idx = _JSON_WS.match(text, idx).end()
+        sep = text[idx:idx + 1]
+        if sep == ']':
+            return
+        if sep != ',':
+            raise ValueError(f"unexpected {sep!r} at {idx}")
+        idx = _JSON_WS.match(text, idx + 1).end()
+
+def fetch_market_page(query, offset, limit, timeout=30, deadline=None, endpoint="markets", project=None):
+    """拉取单个 offset 窗口，返回市场列表 (endpoint="events" 时返回事件列表)
+
+    project(m) 如传入，会在解析时逐条转换市场记录 (例如 project_market)，原始 dict 随即释放。
+    """
+    url = f"{GAMMA_API}/{endpoint}?{query}&limit={limit}&offset={offset}"
+    with metrics.stage('fetch'):
+        resp = http.get(url, timeout=timeout, deadline=deadline)
+    metrics.add('pages_fetched')
+    metrics.add('bytes_fetched', len(resp.content))
+    # 限流 (重试后仍为 429) 或服务端错误: 明确报错，而不是把 HTML 错误页当 JSON 解析
+    if resp.status_code == 429 or resp.status_code >= 500:
+        resp.raise_for_status()
+    with metrics.stage('parse'):
+        if project is None:
+            batch_data = resp.json()
+        else:
+            try:
+                return [project(m) if isinstance(m, dict) else m for m in iter_json_array(resp.content.decode('utf-8'))]
+            except ValueError:
+                batch_data = resp.json()
+
+    # API 结构校验与容错
+    if not isinstance(batch_data, list):
+        if isinstance(batch_data, dict) and 'data' in batch_data:
+            batch_data = batch_data['data']
+        else:
+            batch_data = []
+    if project is not None:
+        batch_data = [project(m) if isinstance(m, dict) else m for m in batch_data]
+    return batch_data
+
+def iter_market_pages(query, fetch_limit, concurrency=None, deadline=None, stop_after=None, probe_first=False,
+                      page_size=PAGE_SIZE, endpoint="markets", project=None):
+    """并发拉取分页窗口，并按 offset 顺序逐页产出。
+
+    同时在途的请求数不超过 concurrency；遇到短页或空页即视为数据到底，
+    取消尚未发出的窗口并停止。到达 deadline (time.time() 时间戳) 时静默停止，
+    调用方保留已产出的部分结果。stop_after(page) 返回 True 时在产出该页后停止。
+    probe_first=True 时先单独拉取首页，首页已是短页 (或触发 stop_after) 就不再发出其余窗口。
+    project 原样传给 fetch_market_page，在工作线程中完成记录转换。
+    """
+    concurrency = max(1, concurrency or 1)
+    # 如果 fetch_limit 为 1000，需要拉取 offset=0, offset=500 两个窗口
+    windows = [(offset, min(page_size, fetch_limit - offset)) for offset in range(0, fetch_limit, page_size)]
+    if not windows:
+        return
+
+    pool = ThreadPoolExecutor(max_workers=min(concurrency, len(windows)))
+    pending = deque()
+    next_window = 0
     try:
-        # 尝试搜索匹配的标签 (扩大搜索范围并优先精确匹配)
-        url = f"https://gamma-api.polymarket.com/tags?limit=5000"
-        resp = requests.get(url, timeout=5)
-        tags = resp.json()
-        
-        # 第一轮：寻找精确匹配
-        for t in tags:
-            label = t.get('label', '')
-            if tag_name.lower() == label.lower():
-                return t.get('id'), t.get('label')
-        
-        # 第二轮：模糊匹配
-        for t in tags:
-            label = t.get('label', '').lower()
-            if tag_name.lower() in label:
-                return t.get('id'), t.get('label')
-    except:
-        pass
-    return None, None
-
-def scout():
+        while pending or next_window < len(windows):
+            # 补满在途窗口 (探测模式下首页返回前只发一个请求)
+            in_flight_limit = 1 if probe_first and next_window == 0 else concurrency
+            while next_window < len(windows) and len(pending) < in_flight_limit:
+                offset, limit = windows[next_window]
+                timeout = 30
+                if deadline is not None:
+                    timeout = min(timeout, max(1, deadline - time.time()))
+                # 复制上下文: 工作线程中的拉取指标 (及开启时的性能剖析) 记入当前侦察
+                pending.append((limit, pool.submit(contextvars.copy_context().run, profiling.traced(fetch_market_page),
+                                                   query, offset, limit, timeout, deadline, endpoint, project)))
+                next_window += 1
+            if next_window == 1:
+                _warm_imports()
+
+            # 按顺序取回最早的窗口 (等待时间不超过剩余时限)
+            limit, future = pending.popleft()
+            if deadline is not None:
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    return
+                try:
+                    batch_data = future.result(timeout=remaining)
+                except FuturesTimeout:
+                    return
+            else:
+                batch_data = future.result()
+            if batch_data:
+                yield batch_data
+            if len(batch_data) < limit:
+                break # 短页/空页: 没有更多数据了
+            if stop_after is not None and stop_after(batch_data):
+                break # 排序保证后续页不可能通过过滤
+    finally:
+        for _, future in pending:
+            future.cancel()
+        pool.shutdown(wait=False)
+
+def _warm_imports():
+    """[核心优化] 第一个请求已发出后在后台导入 numpy (过滤阶段才用到)，导入耗时与网络等待重叠"""
+    if 'numpy' not in sys.modules:
+        threading.Thread(target=importlib.import_module, args=('numpy',), daemon=True).start()
+
+_SHARD_DONE = object()
+
+def merge_shard_pages(shards, deadline=None):
+    """合并多个分片 (每个品类一个) 的页迭代器
+
+    各分片在独立线程中并行翻页，墙钟时间接近最慢的分片；产出时按分片顺序排列
+    (后面的分片在后台预取)，保证同分排序的结果稳定。到达 deadline 时静默停止。
+    """
+    if len(shards) == 1:
+        yield from shards[0]
+        return
+
+    queues = [queue.Queue() for _ in shards]
+
+    def drain(pages, q):
+        try:
+            for page in pages:
+                q.put(page)
+        except Exception as e:
+            q.put(e)
+        finally:
+            q.put(_SHARD_DONE)
+
+    for pages, q in zip(shards, queues):
+        threading.Thread(target=contextvars.copy_context().run, args=(profiling.traced(drain), pages, q), daemon=True).start()
+
+    for q in queues:
+        while True:
+            try:
+                item = q.get(timeout=None if deadline is None else max(0, deadline - time.time()))
+            except queue.Empty:
+                return
+            if item is _SHARD_DONE:
+                break
+            if isinstance(item, Exception):
+                raise item
+            yield item
+
+def filter_market(m, seen_urls, cfg):
+    """对单个市场执行解析与过滤，通过则返回结果行，否则返回 None"""
+    title = m.get('question', m.get('title', 'Unknown'))
+    slug = m.get('slug', '') # market slug
+
+    # 构造链接用于去重检查
+    # API 通常返回 market_slug，链接是 polymarket.com/market/{slug}
+    # 或者 event_slug?
+    # 为了稳妥，我们用生成的 full_url 去重
+    market_slug = m.get('slug', '')
+    event_slug = m.get('event_slug', '') # 有些有 event_slug
+
+    # 优先使用 event_slug 如果存在 (因为多个 market 可能属于同一个 event)
+    # 但用户说 "链接一样"，通常是 event page
+    # 我们先生成 url，再 check
+
+    # 构建 URL (Gamma API 返回 slug)
+    url = f"https://polymarket.com/market/{market_slug}"
+
+    # 如果这个 URL 已经出现过，直接跳过 (用户要求: generate one record)
+    if url in seen_urls:
+        return None
+
+    seen_urls.add(url)
+
+    desc = m.get('description', '')
+    vol = to_float(m.get('volume', 0))
+    slug = m.get('market_slug', m.get('slug', ''))
+
+    # ... (后续处理保持不变)
+    # 构造连接
+    link = f"https://polymarket.com/market/{slug}" if slug else "N/A"
+
+    if m.get('closed') is True or m.get('resolved') is True:
+        return None
+
+    # 价格信息探针 (无价格或价格无法解析 -> NaN -> 过滤)
+    prob = first_price(m)
+    if prob != prob:
+        return None
+
+    # 过滤极其接近结盘的市场 (胜率 > 99% 或 < 1% 视为无效)
+    if prob > 0.99 or prob < 0.01:
+        return None
+
+    # 提取流动性和结束日期
+    liquidity = to_float(m.get('liquidity', 0))
+    end_date_str = m.get('endDate', '')
+
+    # 高级过滤条件 (可选)
+    # 1. 流动性过滤
+    if cfg.min_liquidity > 0 and liquidity < cfg.min_liquidity:
+        return None
+
+    # 2. 结束日期倒计时过滤
+    days_to_end = None
+
+    # 如果开启了倒计时过滤 (>=0)，则必须有有效的结束日期
+    if cfg.max_days_to_end >= 0 and not end_date_str:
+        return None
+
+    if end_date_str:
+        try:
+            end_date = parse_iso8601(end_date_str)
+            if end_date is None:
+                raise ValueError(f"无法解析的日期: {end_date_str!r}")
+
+            now = datetime.now(timezone.utc)
+            delta = end_date - now
+            days_to_end = delta.days
+
+            # Only apply filter if enabled (>=0)
+            if cfg.max_days_to_end >= 0:
+                # 严格过滤: 必须在 [0, MAX] 范围内 (负数表示已过期但未结算，通常排除，或需用户指定)
+                # 这里保持 < 0 也排除，因为我们要找未来的. 
+                # 修正: days_to_end=0 means < 24h.
+                if days_to_end < 0 or days_to_end > cfg.max_days_to_end:
+                    return None
+        except Exception as e:
+            # 日期解析失败，如果开启了严格过滤，则排除
+            if cfg.max_days_to_end >= 0:
+                return None
+            pass
+
+    # 3. 关键词搜索过滤 (支持逗号分隔的 OR 逻辑，预编译为单个匹配器)
+    title_lower = str(title).lower()
+    if cfg.search_matcher:
+        text = title_lower
+        if cfg.search_in_description:
+            text += "\x00" + str(desc or '').lower()
+        if not cfg.search_matcher.search(text):
+            return None
+
+    # 4. 排除关键词黑名单
+    if cfg.exclude_matcher.search(title_lower):
+        return None
+
+    return {
+        "Title": str(title),
+        "Volume": vol,
+        "Prob": prob,
+        "Liquidity": liquidity,
+        "DaysToEnd": days_to_end if days_to_end is not None else 999,
+        "Link": link
+    }
+
+# outcomePrices 常见形态 '["0.55", "0.45"]' 的快速路径，其余形态回退到 json 解析
+_NUM = r'-?\d+(?:\.\d+)?(?:[eE][-+]?\d+)?'
+_PRICES_RE = re.compile(rf'^\[\s*(?:"({_NUM})"|({_NUM}))(?:\s*,\s*(?:"{_NUM}"|{_NUM}))*\s*\]$')
+
+def _float_column(values):
+    """逐个元素按 to_float 转换 (与逐行模式一致，脏数据只影响自身，不影响同页其它市场)"""
+    import numpy as np
+    return np.fromiter((to_float(v) for v in values), dtype=float, count=len(values))
+
+def _parse_end_dates(end_strs, now):
+    """整列解析结束日期，返回 (days_to_end 数组, 是否解析成功掩码)"""
+    import numpy as np
+    days = np.full(len(end_strs), np.nan)
+    for i, value in enumerate(end_strs):
+        if value:
+            end_date = parse_iso8601(value)
+            if end_date is not None:
+                days[i] = (end_date - now).days
+    return days, ~np.isnan(days)
+
+def filter_page_batch(batch_data, seen_urls, cfg, now=None):
+    """批量过滤模式: 将整页市场转为列式数组，以向量化掩码完成全部过滤。
+
+    结果与 filter_market 逐行过滤一致 (整页共用同一个 "now")。
+    """
+    if not batch_data:
+        return []
+    import numpy as np
+    now = now if now is not None else datetime.now(timezone.utc)
+    n = len(batch_data)
+    run = metrics.current()
+    funnel = (lambda stage: run.add(f'markets_out:{stage}', int(keep.sum()))) if run else (lambda stage: None)
+
+    # 1. URL 去重: 先出现者保留，且无论是否通过后续过滤都会占位
+    keep = np.ones(n, dtype=bool)
+    for i, m in enumerate(batch_data):
+        url = f"https://polymarket.com/market/{m.get('slug', '')}"
+        if url in seen_urls:
+            keep[i] = False
+        else:
+            seen_urls.add(url)
+    funnel('dedup')
+
+    # 2. 已结束/已结算的市场
+    keep &= np.array([not (m.get('closed') is True or m.get('resolved') is True) for m in batch_data], dtype=bool)
+    funnel('closed')
+
+    # 3. 价格信息探针 (无价格 -> NaN -> 过滤)
+    prob = np.full(n, np.nan)
+    search = _PRICES_RE.search
+    for i, m in enumerate(batch_data):
+        raw = m.get('outcomePrices', [])
+        if type(raw) is str:
+            found = search(raw)
+            if found:
+                prob[i] = float(found.group(1) or found.group(2))
+    for i in np.flatnonzero(np.isnan(prob) & keep):
+        prob[i] = first_price(batch_data[i])
+    keep &= ~np.isnan(prob)
+
+    # 过滤极其接近结盘的市场 (胜率 > 99% 或 < 1% 视为无效)
+    keep &= ~((prob > 0.99) | (prob < 0.01))
+    funnel('price')
+
+    # 4. 流动性过滤
+    vol = _float_column([m.get('volume', 0) for m in batch_data])
+    liquidity = _float_column([m.get('liquidity', 0) for m in batch_data])
+    if cfg.min_liquidity > 0:
+        keep &= ~(liquidity < cfg.min_liquidity)
+    funnel('liquidity')
+
+    # 5. 结束日期倒计时过滤 (整列一次解析)
+    end_strs = [m.get('endDate', '') for m in batch_data]
+    has_end = np.array([bool(e) for e in end_strs], dtype=bool)
+    with metrics.stage('date_parse'):
+        days, days_ok = _parse_end_dates([e if e else None for e in end_strs], now)
+    if cfg.max_days_to_end >= 0:
+        keep &= has_end & days_ok & (days >= 0) & (days <= cfg.max_days_to_end)
+    funnel('end_date')
+
+    # 6. 关键词搜索 / 排除关键词 (预编译匹配器，每个标题只扫描一次)
+    titles = [str(m.get('question', m.get('title', 'Unknown'))) for m in batch_data]
+    titles_lower = [t.lower() for t in titles]
+    if cfg.search_matcher:
+        texts = titles_lower
+        if cfg.search_in_description:
+            texts = [t + "\x00" + str(m.get('description', '') or '').lower() for t, m in zip(titles_lower, batch_data)]
+        keep &= np.fromiter((cfg.search_matcher.search(t) for t in texts), dtype=bool, count=n)
+    funnel('search')
+    if cfg.exclude_matcher:
+        keep &= ~np.fromiter((cfg.exclude_matcher.search(t) for t in titles_lower), dtype=bool, count=n)
+    funnel('exclude')
+
+    rows = []
+    for i in np.flatnonzero(keep):
+        m = batch_data[i]
+        slug = m.get('market_slug', m.get('slug', ''))
+        rows.append({
+            "Title": titles[i],
+            "Volume": float(vol[i]),
+            "Prob": float(prob[i]),
+            "Liquidity": float(liquidity[i]),
+            "DaysToEnd": int(days[i]) if days_ok[i] else 999,
+            "Link": f"https://polymarket.com/market/{slug}" if slug else "N/A"
+        })
+    return rows
+
+def iter_filtered_markets(pages, seen_urls, cfg, deadline=None, stats=None, on_page=None):
+    """流水线过滤阶段: 逐页消费市场，产出通过过滤的结果行
+
+    SCOUT_FILTER_MODE=batch (默认) 按页向量化过滤，row 为逐行参考实现。
+    stats 如传入 dict，会累计 pages (页数)、markets (过滤市场数)、matched (通过数) 与 filter_s (过滤耗时)。
+    on_page(stats) 在每页过滤完成后回调 (用于进度上报)。
+    """
+    stats = stats if stats is not None else {}
+    stats.setdefault('pages', 0)
+    stats.setdefault('markets', 0)
+    stats.setdefault('matched', 0)
+    stats.setdefault('filter_s', 0.0)
+    for batch_data in pages:
+        stats['pages'] += 1
+        if cfg.filter_mode != "row":
+            if deadline is not None and time.time() > deadline:
+                return
+            t0 = time.perf_counter()
+            rows = filter_page_batch(batch_data, seen_urls, cfg)
+            elapsed = time.perf_counter() - t0
+            stats['filter_s'] += elapsed
+            stats['markets'] += len(batch_data)
+            stats['matched'] += len(rows)
+            metrics.observe('filter', elapsed)
+            metrics.add('markets_in', len(batch_data))
+            metrics.add('markets_matched', len(rows))
+            if on_page:
+                on_page(stats)
+            yield from rows
+            continue
+
+        for m in batch_data:
+            # 运行时限保护
+            if deadline is not None and time.time() > deadline:
+                return
+            t0 = time.perf_counter()
+            row = filter_market(m, seen_urls, cfg)
+            stats['filter_s'] += time.perf_counter() - t0
+            stats['markets'] += 1
+            metrics.add('markets_in')
+            if row:
+                stats['matched'] += 1
+                metrics.add('markets_matched')
+                yield row
+        if on_page:
+            on_page(stats)
+
+def _format_number(value):
+    """URL 参数用的定点数表示 (避免 1e+06 这类科学计数法)"""
+    return f"{value:f}".rstrip('0').rstrip('.')
+
+def _end_date_max(cfg):
+    """结束日期上限 (ISO 格式 UTC)，未启用倒计时过滤时返回 None"""
+    if cfg.max_days_to_end < 0:
+        return None
+    # 计算截止日期 (当前时间 + MAX_DAYS)
+    # 使用 datetime to ISO format
+    import datetime
+    # 注意: API 需要 UTC 时间格式 ISO
+    future_date = datetime.datetime.now(datetime.timezone.utc) + datetime.timedelta(days=cfg.max_days_to_end + 1)
+    # 向上取整到整点: 一小时内查询 URL 不变，重复扫描可以走条件请求 (本地仍按天数精确过滤)
+    future_date = future_date.replace(minute=0, second=0, microsecond=0) + datetime.timedelta(hours=1)
+    return future_date.isoformat().replace("+00:00", "Z") # 兼容性调整
+
+def plan_market_query(cfg, tag_id, console=None):
+    """扫描计划: 生成 /markets 查询参数，并尽量把过滤条件下推到服务端
+
+    返回 (query, stop_after, selective)。stop_after(page) 为 True 表示排序已保证
+    后续页不可能再有市场通过过滤，可以提前停止翻页 (服务端未执行下推时的兜底)。
+    selective 为 True 时结果集可能远小于 fetch_limit，适合先探测首页再并发。
+    """
+    console = _resolve_console(console)
+    order_by = cfg.order_by
+
+    # 映射排序参数
+    sort_param = ""
+    if order_by == "liquidity":
+        sort_param = "&order=liquidity&ascending=false"
+    elif order_by == "enddate":
+        # 按由于结束日期排序 (即将过期的排前面)
+        sort_param = "&order=endDate&ascending=true" 
+    else:
+        # 默认按 Volume 降序
+        sort_param = "&order=volume&ascending=false"
+
+    # 构造基础 URL 参数
+    base_params = f"active=true&closed=false{sort_param}"
+    tag_param = f"&tag_id={tag_id}" if tag_id else ""
+    
+    # [核心优化] 使用 Server-Side 过滤结束日期 (如果你想要日结，就只拉取日结的数据!)
+    date_filter_param = ""
+    date_str = _end_date_max(cfg)
+    if date_str:
+        date_filter_param = f"&end_date_max={date_str}"
+        console.print(f"[dim cyan]🚀 启用服务端极速过滤: end_date_max={date_str}[/dim cyan]")
+
+    # [核心优化] 成交量/流动性门槛同样下推到服务端 (volume_num_min / liquidity_num_min)
+    # 注意: 成交量门槛下推后，"全局快照" 兜底列表也只包含达到门槛的市场
+    threshold_param = ""
+    stop_after = None
+    if cfg.pushdown:
+        if cfg.min_volume > 0:
+            threshold_param += f"&volume_num_min={_format_number(cfg.min_volume)}"
+        if cfg.min_liquidity > 0:
+            threshold_param += f"&liquidity_num_min={_format_number(cfg.min_liquidity)}"
+        if threshold_param:
+            console.print(f"[dim cyan]🚀 启用服务端门槛过滤: {threshold_param.lstrip('&').replace('&', ', ')}[/dim cyan]")
+
+        # 降序排序下，一旦某页末尾已跌破门槛，后续页只会更小，直接停止翻页
+        if order_by == "liquidity" and cfg.min_liquidity > 0:
+            stop_after = lambda page: to_float(page[-1].get('liquidity', 0)) < cfg.min_liquidity
+        elif order_by not in ("liquidity", "enddate") and cfg.min_volume > 0:
+            stop_after = lambda page: to_float(page[-1].get('volume', 0)) <= cfg.min_volume
+
+    selective = bool(threshold_param or date_filter_param or stop_after)
+    return f"{base_params}{tag_param}{date_filter_param}{threshold_param}", stop_after, selective
+
+# 本地快照库: 超过该秒数后重新全量同步 (兜底移除品类变更等增量无法感知的变化)
+STORE_FULL_SYNC = int(os.getenv("SCOUT_STORE_FULL_SYNC", 86400) or 86400)
+STORE_SYNC_TIMEOUT = int(os.getenv("SCOUT_STORE_SYNC_TIMEOUT", 120) or 120)  # 全量同步时限 (秒)
+STORE_DELTA_PAGE = int(os.getenv("SCOUT_STORE_DELTA_PAGE", 100) or 100)     # 增量同步每页条数
+STORE_MAX_MARKETS = 100000
+
+def _store_scope(tag_id):
+    return f"tag:{tag_id}" if tag_id else "global"
+
+def sync_market_store(cfg, tag_id, deadline=None, console=None):
+    """把本地快照同步到最新: 首次使用或过期时全量拉取，其余时间只拉取水位 (updatedAt) 之后的更新"""
+    from market_store import store as market_store
+    console = _resolve_console(console)
+    scope = _store_scope(tag_id)
+    watermark, full_synced_at, _ = market_store.sync_state(scope)
+    tag_param = f"&tag_id={tag_id}" if tag_id else ""
+    full = not watermark or time.time() - full_synced_at > STORE_FULL_SYNC
+    # 快照只保存流水线用到的字段 (description 单独存列，供搜索描述的方案使用)
+    project = lambda m: project_market(m, with_description=True)
+
+    # 两种模式都按 updatedAt 降序翻页: 翻页期间被更新的市场只会移到前面，不会被跳过
+    if full:
+        query = f"active=true&closed=false{tag_param}&order=updatedAt&ascending=false"
+        sync_deadline = time.time() + STORE_SYNC_TIMEOUT
+        pages = iter_market_pages(query, STORE_MAX_MARKETS, cfg.fetch_concurrency, sync_deadline, project=project)
+    else:
+        # 不限定 active/closed: 结盘、下架本身也是一次更新，需要同步到本地以移除
+        query = f"order=updatedAt&ascending=false{tag_param}"
+        sync_deadline = deadline
+        stop_after = lambda page: str(page[-1].get('updatedAt') or '') < watermark
+        pages = iter_market_pages(query, STORE_MAX_MARKETS, cfg.fetch_concurrency, sync_deadline,
+                                  stop_after=stop_after, probe_first=True, page_size=STORE_DELTA_PAGE,
+                                  project=project)
+
+    fetched = [m for page in pages for m in page if isinstance(m, MarketRecord)]
+    # 超时中断时数据不完整: 只合并已拉取的记录，不推进水位 (下次从原水位继续)
+    complete = sync_deadline is None or time.time() < sync_deadline
+    new_watermark = max((str(m.get('updatedAt') or '') for m in fetched), default='') if complete else None
+    upserted, removed = market_store.apply(scope, fetched, new_watermark, full=full and complete)
+    if scope == "global":
+        # 全局快照即检索范围: 本次拉取到的市场直接并入内存检索索引 (尚未建立索引时不做任何事)
+        import search_index
+        search_index.observe(fetched, full=full and complete)
+
+    mode = "全量" if full else "增量"
+    console.print(f"[dim cyan]🗄️ 本地快照{mode}同步: 拉取 {len(fetched)} 条 (更新 {upserted}, 移除 {removed})，"
+                  f"快照共 {market_store.count(scope)} 个市场[/dim cyan]")
+    if not complete:
+        console.print(f"[yellow]⚠️ 快照同步未在时限内完成，本次使用部分快照[/yellow]")
+
+def prepare_market_store(cfg, tag_id, deadline=None, console=None):
+    """同步快照；同步失败时退回已有快照，完全没有快照才视为失败"""
+    from market_store import store as market_store
+    console = _resolve_console(console)
+    try:
+        with metrics.stage('store_sync'):
+            sync_market_store(cfg, tag_id, deadline, console)
+    except Exception as e:
+        if not market_store.count(_store_scope(tag_id)):
+            raise
+        console.print(f"[yellow]⚠️ 快照同步失败，使用上次的快照: {e}[/yellow]")
+
+def iter_store_pages(cfg, tag_id, deadline=None, console=None, synced=False):
+    """快照模式的数据源: 同步后在本地按 API 语义筛选、排序、截断，按页产出
+
+    synced=True 表示调用方已先行同步 (见 prepare_market_store)，这里只读取本地快照。
+    """
+    from market_store import store as market_store
+    scope = _store_scope(tag_id)
+    if not synced:
+        prepare_market_store(cfg, tag_id, deadline, console)
+
+    with metrics.stage('store_query'):
+        markets = market_store.query(
+            scope,
+            order_by=cfg.order_by,
+            limit=cfg.fetch_limit,
+            min_volume=cfg.min_volume if cfg.pushdown else 0,
+            min_liquidity=cfg.min_liquidity if cfg.pushdown else 0,
+            end_date_max=_end_date_max(cfg),
+            with_description=cfg.search_in_description,
+        )
+    for offset in range(0, len(markets), PAGE_SIZE):
+        yield markets[offset:offset + PAGE_SIZE]
+
+# 全文检索: 索引建立在全局快照上，超过该秒数未同步时先增量同步快照
+SEARCH_INDEX_TTL = int(os.getenv("SCOUT_SEARCH_INDEX_TTL", 300) or 300)
+
+def refresh_search_index(cfg=None, console=None):
+    """把全局快照同步到最新并保证检索索引可用: 快照过期时增量同步 (变化经 observe 并入索引)，
+    首次使用或快照已被其它进程同步过时从快照重新载入"""
+    from market_store import store as market_store
+    import search_index
+    console = _resolve_console(console)
+    cfg = cfg or ScoutConfig.from_env(console=console)
+    index = search_index.current()
+    _, _, synced_at = market_store.sync_state("global")
+    if time.time() - synced_at >= SEARCH_INDEX_TTL or not market_store.count("global"):
+        prepare_market_store(cfg, None, console=console)
+    elif index is not None and synced_at > index.synced_at:
+        index = None
+    if index is None or search_index.current() is None:
+        t0 = time.time()
+        index = search_index.load(market_store)
+        console.print(f"[dim cyan]🔎 检索索引已载入: {len(index)} 个市场，用时 {time.time() - t0:.1f}s[/dim cyan]")
+    return search_index.current()
+
+def search_markets(query, limit=20, offset=0, sort="relevance", console=None):
+    """在本地全局快照上全文检索 (标题 + 描述)，返回 search_index 的结果 dict"""
+    import search_index
+    console = _resolve_console(console)
+    index = search_index.get_index(lambda: refresh_search_index(console=console), SEARCH_INDEX_TTL)
+    return index.search(query, limit=limit, offset=offset, sort=sort)
+
+def render_search(res, console=None):
+    """输出检索结果 (无头模式为纯文本列表)"""
+    console = _resolve_console(console)
+    header = f"🔎 {res['query']} | 命中 {res['total']} 个市场 | {res['took_ms']}ms"
+    if isinstance(console, PlainConsole):
+        console.print(header)
+        for i, r in enumerate(res['hits'], 1):
+            prob = f"{r['Prob']:.1%}" if r['Prob'] is not None else "-"
+            console.print(f"{i}. [{prob}] {r['Title']} | ${r['Volume']:,.0f} | {r['Link']}")
+        return
+    from rich.table import Table
+    table = Table(title=header, border_style="cyan", header_style="bold magenta")
+    table.add_column("侦察目标 (Market)", style="white")
+    table.add_column("⏳ 剩", justify="right", style="yellow")
+    table.add_column("胜率", justify="center", style="green")
+    table.add_column("成交量", justify="right", style="blue")
+    table.add_column("查看链接 (Link)", justify="left", style="underline cyan")
+    for r in res['hits']:
+        days_str = str(r['DaysToEnd']) if r['DaysToEnd'] < 900 else ">2y"
+        prob = f"{r['Prob']:.1%}" if r['Prob'] is not None else "-"
+        table.add_row(r['Title'][:60], days_str + "d", prob, f"${r['Volume']:,.0f}", r['Link'])
+    console.print(table)
+
+def plan_event_query(cfg, tag_id, console=None):
+    """事件模式的 /events 查询参数 (事件成交量/流动性不低于其下任一市场，门槛可安全下推)"""
+    console = _resolve_console(console)
+    query = f"active=true&closed=false&order=volume&ascending=false"
+    if tag_id:
+        query += f"&tag_id={tag_id}"
+    date_str = _end_date_max(cfg)
+    if date_str:
+        query += f"&end_date_max={date_str}"
+    selective = bool(date_str)
+    if cfg.pushdown:
+        if cfg.min_volume > 0:
+            query += f"&volume_min={_format_number(cfg.min_volume)}"
+            selective = True
+        if cfg.min_liquidity > 0:
+            query += f"&liquidity_min={_format_number(cfg.min_liquidity)}"
+            selective = True
+    return query, selective
+
+def iter_event_pages(cfg, tag_id, deadline=None, event_of=None, console=None):
+    """事件模式数据源: 按事件翻页，展开其下的市场后交给同一过滤流水线
+
+    event_of 如传入 dict，会记录 市场链接 -> 所属事件，供结果汇总为事件级别。
+    """
+    query, selective = plan_event_query(cfg, tag_id, console)
+    pages = iter_market_pages(query, cfg.fetch_limit, cfg.fetch_concurrency, deadline=deadline,
+                              probe_first=selective, endpoint="events")
+    for events in pages:
+        markets = []
+        for ev in events:
+            if not isinstance(ev, dict):
+                continue
+            for m in ev.get('markets') or []:
+                if not isinstance(m, dict):
+                    continue
+                m.setdefault('event_slug', ev.get('slug', ''))
+                if event_of is not None:
+                    event_of[f"https://polymarket.com/market/{m.get('market_slug', m.get('slug', ''))}"] = ev
+                markets.append(m)
+        if markets:
+            yield markets
+
+def rollup_events(rows, event_of):
+    """把通过过滤的市场按事件汇总: 总成交量、结果数、最可能的结果"""
+    groups = {}
+    for r in rows:
+        ev = event_of.get(r['Link'])
+        key = (ev.get('slug') or ev.get('id')) if ev else r['Link']
+        groups.setdefault(key, (ev, []))[1].append(r)
+
+    rollups = []
+    for key, (ev, members) in groups.items():
+        if ev is None:
+            rollups.extend(members)
+            continue
+        top = max(members, key=lambda r: r['Prob'])
+        raw_markets = [m for m in ev.get('markets') or [] if isinstance(m, dict)]
+        top_market = next((m for m in raw_markets
+                           if f"https://polymarket.com/market/{m.get('market_slug', m.get('slug', ''))}" == top['Link']), {})
+        volume = to_float(ev.get('volume')) or sum(r['Volume'] for r in members)
+        rollups.append({
+            "Title": ev.get('title') or top['Title'],
+            "Volume": volume,
+            "Prob": top['Prob'],
+            "Liquidity": to_float(ev.get('liquidity')) or sum(r.get('Liquidity', 0) for r in members),
+            "DaysToEnd": min(r['DaysToEnd'] for r in members),
+            "Link": f"https://polymarket.com/event/{ev['slug']}" if ev.get('slug') else top['Link'],
+            "Outcomes": len(raw_markets) or len(members),
+            "TopOutcome": top_market.get('groupItemTitle') or top['Title'],
+        })
+    return rollups
+
+def apply_momentum(rows, cfg, now=None):
+    """把本次结果写入价格历史；按动量排序时为每行附加 Momentum (各窗口中绝对值最大的胜率变化)"""
+    import numpy as np
+    from price_history import history as price_history, parse_window
+    now = time.time() if now is None else now
+    price_history.record(rows, now)
+    if cfg.order_by != "momentum":
+        return
+    windows = [parse_window(w) for w in cfg.momentum_windows.split(',') if w.strip()]
+    if not windows:
+        return
+    deltas = np.nan_to_num(price_history.prob_deltas([r['Link'] for r in rows], windows, now), nan=0.0)
+    best = np.abs(deltas).argmax(axis=1)
+    momentum = deltas[np.arange(len(rows)), best]
+    for r, m in zip(rows, momentum.tolist()):
+        r['Momentum'] = m
+
+# 按配置的排序策略排序 (均为降序，键越大越靠前)
+SORT_KEYS = {
+    'volume': lambda x: x['Volume'],
+    'liquidity': lambda x: x.get('Liquidity', 0),
+    'enddate': lambda x: -x.get('DaysToEnd', 999),  # 即将到期优先，无结束日期 (999) 排在最后
+    'prob': lambda x: abs(x['Prob'] - 0.5),  # 极端值优先
+    'momentum': lambda x: abs(x.get('Momentum', 0))  # 近期胜率变化最大的优先
+}
+
+class TopKRanker:
+    """流式 Top-K 排名: 每个展示列表一个有界小顶堆，O(n log K) 时间、O(K) 内存
+
+    - vibe: 符合胜率/成交量规则的前 vibe_k 条 (核心侦察结果)
+    - all:  全部结果的前 all_k 条 (无市场符合规则时的全局快照)
+    堆元素按 (排序键, -到达序号) 比较，输出顺序与 sorted(..., reverse=True) 完全一致
+    (同分时先到达者在前)。
+    """
+
+    def __init__(self, cfg, vibe_k=50, all_k=20):
+        self.cfg = cfg
+        self.key = SORT_KEYS.get(cfg.order_by, SORT_KEYS['volume'])
+        self.vibe_k = vibe_k
+        self.all_k = all_k
+        self._vibe = []
+        self._all = []
+        self._seq = 0
+        self.total = 0
+        self.vibe_count = 0
+        self.filtered_by_prob = 0
+        self.filtered_by_volume = 0
+
+    @staticmethod
+    def _offer(heap, k, item):
+        if len(heap) < k:
+            heapq.heappush(heap, item)
+        elif item[:2] > heap[0][:2]:
+            heapq.heapreplace(heap, item)
+
+    def push(self, row):
+        self._seq += 1
+        self.total += 1
+        item = (self.key(row), -self._seq, row)
+        self._offer(self._all, self.all_k, item)
+
+        volume_ok = row['Volume'] > self.cfg.min_volume
+        prob_ok = self.cfg.min_prob <= row['Prob'] <= self.cfg.max_prob
+        if not prob_ok:
+            self.filtered_by_prob += 1
+        if not volume_ok:
+            self.filtered_by_volume += 1
+        if volume_ok and prob_ok:
+            self.vibe_count += 1
+            self._offer(self._vibe, self.vibe_k, item)
+
+    @staticmethod
+    def _ordered(heap):
+        return [item[2] for item in sorted(heap, key=lambda item: item[:2], reverse=True)]
+
+    def vibe_rows(self):
+        return self._ordered(self._vibe)
+
+    def all_rows(self):
+        return self._ordered(self._all)
+
+@dataclass
+class ScoutResult:
+    """一次侦察的结构化结果"""
+    rows: list                 # 最终展示的市场 (已排序截断)
+    header: str
+    tag_info: str
+    started_at: float
+    elapsed: float = 0.0
+    vibe_count: int = 0        # 符合胜率/成交量规则的市场数
+    total_count: int = 0       # 通过基础过滤的市场数
+    filtered_count: int = 0    # 被胜率/成交量过滤掉的数量 (用于诊断)
+    filtered_by_prob: int = 0  # 其中胜率不在区间内的数量
+    filtered_by_volume: int = 0  # 其中成交量未达门槛的数量
+    fallback: bool = False     # 无市场符合规则时展示的是全局快照
+    timed_out: bool = False
+    error: str = None
+    pages_fetched: int = 0
+    markets_scanned: int = 0
+    filter_seconds: float = 0.0
+    filter_mode: str = "batch"
+    http: dict = field(default_factory=dict)
+    metrics: dict = field(default_factory=dict)  # 分阶段耗时与计数器摘要 (metrics.RunMetrics.summary)
+    profile: str = None        # 性能剖析产物名 (profiling.PROFILE_DIR 下，未开启时为 None)
+
+    def to_dict(self):
+        return asdict(self)
+
+def _http_delta(before, after):
+    return {k: after[k] - before.get(k, 0) for k in after}
+
+def run_scout(cfg, console=None, progress=None, source=None):
+    """侦察引擎: 按配置拉取、过滤、排序，返回 ScoutResult (不渲染、不落盘、不推送)
+
+    progress(info) 在每页过滤完成后回调，info 含 pages / markets / matched / elapsed。
+    source(cfg, tag_id, deadline, console) 可替换数据源 (返回页迭代器)，默认按配置在线拉取或读取本地快照。
+    各阶段耗时与计数器记入 result.metrics (见 metrics.py)；cfg.profile 开启时剖析本次侦察并保存产物。
+    """
+    run = metrics.RunMetrics()
+    with profiling.capture(cfg.profile) as prof, metrics.activate(run), run.stage('total'):
+        result = _run_scout(cfg, console, progress, source)
+    result.metrics = run.summary()
+    if prof is not None:
+        result.profile = _save_profile(prof, cfg, result, console)
+    return result
+
+def _save_profile(prof, cfg, result, console=None):
+    """保存剖析产物 (附带本次配置，不含 Webhook 地址)，失败时只提示"""
+    config = {f.name: getattr(cfg, f.name) for f in fields(cfg) if f.init and f.name != 'webhook_url'}
+    extra = {
+        'markets_scanned': result.markets_scanned,
+        'pages_fetched': result.pages_fetched,
+        'timed_out': result.timed_out,
+        'error': result.error,
+    }
+    try:
+        return prof.save(cfg.preset or "custom", config=config, extra=extra)
+    except OSError as e:
+        _resolve_console(console).print(f"[yellow]⚠️ 性能剖析保存失败: {e}[/yellow]")
+        return None
+
+_startup_recorded = False
+
+def _record_startup(result):
+    """CLI 进程的第一次侦察记录冷启动耗时 (记入 result.metrics 的阶段):
+    import = 导入 scout 模块，startup = 从开始导入 scout 到发出第一个 HTTP 请求"""
+    global _startup_recorded
+    if _startup_recorded or http.first_request_at is None:
+        return
+    _startup_recorded = True
+    stages = result.metrics.setdefault('stages', {})
+    metrics.observe_stage(stages, 'import', IMPORT_SECONDS)
+    metrics.observe_stage(stages, 'startup', http.first_request_at - _IMPORT_T0)
+
+def _run_scout(cfg, console, progress, source):
+    console = _resolve_console(console)
     start_t = time.time()
-    console.print(f"\n[bold cyan][Mikon AI Army][/bold cyan] 闪电侦察启动 ({MAX_RUNTIME}s 倒计时)...")
+    http_before = http.stats()
+    console.print(f"\n[bold cyan][Mikon AI Army][/bold cyan] 闪电侦察启动 ({cfg.runtime_limit}s 倒计时)...")
     
-    tag_id, actual_label = get_tag_id(SCOUT_TAG_NAME)
-    if SCOUT_TAG_NAME and not tag_id:
-        console.print(f"[yellow]⚠️ 未找到品类 '{SCOUT_TAG_NAME}'，将执行全局扫描。[/yellow]")
-        tag_info = " | 品类: 全局"
-    elif tag_id:
-        tag_info = f" | 品类: {actual_label} (ID: {tag_id})"
-    tag_info = f" | 品类: {actual_label} (ID: {tag_id})" if tag_id else " | 品类: 全局"
+    # 多品类 (逗号分隔) 时每个品类作为一个分片并行拉取
+    with metrics.stage('tag_resolve'):
+        tags, missing = resolve_tags(cfg.tag)
+    if cfg.tag and not tags:
+        console.print(f"[yellow]⚠️ 未找到品类 '{cfg.tag}'，将执行全局扫描。[/yellow]")
+    elif missing:
+        console.print(f"[yellow]⚠️ 未找到品类 {', '.join(repr(n) for n in missing)}，已跳过。[/yellow]")
+    tag_ids = [tag_id for tag_id, _ in tags] or [None]
+    tag_info = " | 品类: " + " + ".join(f"{label} (ID: {tag_id})" for tag_id, label in tags) if tags else " | 品类: 全局"
         
-    console.print(f"[dim]当前配置规则: 成交量 > ${MIN_VOLUME:,.0f} | 胜率 {MIN_PROB:.0%} - {MAX_PROB:.0%}{tag_info}[/dim]")
-    if MAX_DAYS_TO_END >= 0:
-        console.print(f"[dim yellow]⏳ 倒计时过滤: 仅显示 {MAX_DAYS_TO_END} 天内结盘的市场[/dim yellow]")
+    console.print(f"[dim]当前配置规则: 成交量 > ${cfg.min_volume:,.0f} | 胜率 {cfg.min_prob:.0%} - {cfg.max_prob:.0%}{tag_info}[/dim]")
+    if cfg.max_days_to_end >= 0:
+        console.print(f"[dim yellow]⏳ 倒计时过滤: 仅显示 {cfg.max_days_to_end} 天内结盘的市场[/dim yellow]")
     console.print("")
     
     # 初始化变量
     final_data = []
     error_msg = None
+    timed_out = False
+    filter_stats = {'pages': 0, 'markets': 0, 'matched': 0, 'filter_s': 0.0}
+    events_mode = cfg.fetch_mode == "events" and source is None
+    event_of = {}  # 事件模式: 市场链接 -> 所属事件
+    # [核心优化] 流式 Top-K: 边过滤边排名，内存只与展示条数有关；
+    # 事件汇总与动量计算需要完整结果集，此时先收集再排名
+    ranker = TopKRanker(cfg)
+    needs_all_rows = events_mode or cfg.history or cfg.order_by == "momentum"
+
+    def on_page(stats):
+        if progress:
+            progress({'pages': stats['pages'], 'markets': stats['markets'],
+                      'matched': stats['matched'], 'elapsed': round(time.time() - start_t, 2)})
 
     with console.status("[bold green]正在突袭 Polymarket 数据中心...", spinner="earth"):
         try:
             # 1. 分页获取活跃市场 (绕过单次 500 条限制)
-            all_markets = []
-            offset = 0
-            
-            # 读取排序配置
-            ORDER_BY = os.getenv("SCOUT_ORDER_BY", "volume")
-            
-            # 映射排序参数
-            sort_param = ""
-            if ORDER_BY == "liquidity":
-                sort_param = "&order=liquidity&ascending=false"
-            elif ORDER_BY == "endDate":
-                # 按由于结束日期排序 (即将过期的排前面)
-                sort_param = "&order=endDate&ascending=true" 
-            else:
-                # 默认按 Volume 降序
-                sort_param = "&order=volume&ascending=false"
-
-            # 构造基础 URL 参数
-            base_params = f"active=true&closed=false{sort_param}"
-            tag_param = f"&tag_id={tag_id}" if tag_id else ""
-            
-            # [核心优化] 使用 Server-Side 过滤结束日期 (如果你想要日结，就只拉取日结的数据!)
-            date_filter_param = ""
-            if MAX_DAYS_TO_END >= 0:
-                # 计算截止日期 (当前时间 + MAX_DAYS)
-                # 使用 datetime to ISO format
-                import datetime
-                # 注意: API 需要 UTC 时间格式 ISO
-                future_date = datetime.datetime.now(datetime.timezone.utc) + datetime.timedelta(days=MAX_DAYS_TO_END + 1)
-                date_str = future_date.isoformat().replace("+00:00", "Z") # 兼容性调整
-                date_filter_param = f"&end_date_max={date_str}"
-                console.print(f"[dim cyan]🚀 启用服务端极速过滤: end_date_max={date_str}[/dim cyan]")
-
-            
-            # 如果 FETCH_LIMIT 为 1000，需要循环 offset=0, offset=500
-            while len(all_markets) < FETCH_LIMIT:
-                # 剩余需要获取的数量
-                remaining = FETCH_LIMIT - len(all_markets)
-                # 单次最大 500 (Gamma API 限制)
-                batch_limit = min(500, remaining)
-                
-                url = f"https://gamma-api.polymarket.com/markets?{base_params}&limit={batch_limit}&offset={offset}{tag_param}{date_filter_param}"
-                
-                # 增加 User-Agent 伪装和超时时间
-                headers = {
-                    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
-                }
-                
-                # console.print(f"DEBUG: Fetching offset {offset}...") 
-                resp = requests.get(url, headers=headers, timeout=30)
-                batch_data = resp.json()
-                
-                # API 结构校验与容错
-                if not isinstance(batch_data, list):
-                    if isinstance(batch_data, dict) and 'data' in batch_data:
-                        batch_data = batch_data['data']
-                    else:
-                        batch_data = []
-                
-                if not batch_data:
-                    break # 没有更多数据了
-                    
-                all_markets.extend(batch_data)
-                offset += len(batch_data)
-                
-                # 避免过快请求
-                time.sleep(0.2)
-            
-            # 使用所有获取到的市场进行过滤
-            markets = all_markets
-            
+            # [核心优化] 流式流水线: 并发拉取各 offset 窗口 (受 fetch_concurrency 限制)，
+            # 每页到达即解析过滤，通过的市场立即进入结果集；时限同时覆盖拉取与过滤
+            deadline = start_t + cfg.runtime_limit
+            store_mode = cfg.store and source is None and not events_mode
+            if store_mode:
+                # 快照模式: 先完成同步 (全量同步有独立时限 STORE_SYNC_TIMEOUT)，扫描时限从同步完成后起算，
+                # 否则一次超过 runtime_limit 的全量同步会让随后的本地过滤直接判定超时、返回空结果
+                for tag_id in tag_ids:
+                    prepare_market_store(cfg, tag_id, deadline, console)
+                deadline = time.time() + cfg.runtime_limit
+
             # [URL 去重] 用于记录已处理的链接
             seen_urls = set()
 
-            for m in markets:
-                # 30秒硬限制保护 -> 放宽到 60s
-                if time.time() - start_t > MAX_RUNTIME:
-                     error_msg = f"已达到最大运行时间 ({MAX_RUNTIME}s)，提前返回部分结果"
-                     break
-                     
-                title = m.get('question', m.get('title', 'Unknown'))
-                slug = m.get('slug', '') # market slug
-                
-                # 构造链接用于去重检查
-                # API 通常返回 market_slug，链接是 polymarket.com/market/{slug}
-                # 或者 event_slug?
-                # 为了稳妥，我们用生成的 full_url 去重
-                market_slug = m.get('slug', '')
-                event_slug = m.get('event_slug', '') # 有些有 event_slug
-                
-                # 优先使用 event_slug 如果存在 (因为多个 market 可能属于同一个 event)
-                # 但用户说 "链接一样"，通常是 event page
-                # 我们先生成 url，再 check
-                
-                # 构建 URL (Gamma API 返回 slug)
-                url = f"https://polymarket.com/market/{market_slug}"
-                
-                # 如果这个 URL 已经出现过，直接跳过 (用户要求: generate one record)
-                if url in seen_urls:
-                    continue
-                
-                seen_urls.add(url)
-                
-                desc = m.get('description', '')
-                vol = float(m.get('volume', 0))
-                slug = m.get('market_slug', m.get('slug', ''))
-                
-                # ... (后续处理保持不变)
-                # 构造连接
-                link = f"https://polymarket.com/market/{slug}" if slug else "N/A"
-                
-                if m.get('closed') is True or m.get('resolved') is True:
-                    continue
+            # 网络数据源: 记录在工作线程中解析后立即精简，在途/缓冲的页面只占用精简后的内存
+            project = lambda m: project_market(m, cfg.search_in_description)
 
-                # 价格信息探针
-                prices = m.get('outcomePrices', [])
-                if isinstance(prices, str):
-                    try:
-                        import json
-                        prices = json.loads(prices)
-                    except:
-                        prices = []
-                
-                if not prices:
-                    prices = [t.get('price') for t in m.get('tokens', []) if t.get('price') is not None]
-                
-                if not prices:
-                    continue
-                
-                prob = float(prices[0]) if prices[0] is not None else 0.5
-                
-                # 过滤极其接近结盘的市场 (胜率 > 99% 或 < 1% 视为无效)
-                if prob > 0.99 or prob < 0.01:
-                    continue
-                
-                # 提取流动性和结束日期
-                liquidity = float(m.get('liquidity', 0))
-                end_date_str = m.get('endDate', '')
-                
-                # 高级过滤条件 (可选)
-                # 1. 流动性过滤
-                if MIN_LIQUIDITY > 0 and liquidity < MIN_LIQUIDITY:
-                    continue
-                
-                # 2. 结束日期倒计时过滤
-                days_to_end = None
-                
-                # 如果开启了倒计时过滤 (>=0)，则必须有有效的结束日期
-                if MAX_DAYS_TO_END >= 0 and not end_date_str:
-                    continue
+            def shard_pages(tag_id):
+                if source is not None:
+                    return source(cfg, tag_id, deadline, console)
+                if events_mode:
+                    # 事件模式: 按事件翻页，一个事件的全部结果只需一次拉取
+                    return iter_event_pages(cfg, tag_id, deadline, event_of, console)
+                if store_mode:
+                    # 快照模式: 本地快照已在上方同步，这里只从本地读取
+                    return iter_store_pages(cfg, tag_id, deadline, console, synced=True)
+                query, stop_after, selective = plan_market_query(cfg, tag_id, console)
+                return iter_market_pages(query, cfg.fetch_limit, cfg.fetch_concurrency, deadline=deadline,
+                                         stop_after=stop_after, probe_first=selective, project=project)
+
+            # 各分片共用同一个时限与 seen_urls，跨品类重复的市场只保留一次
+            pages = merge_shard_pages([shard_pages(tag_id) for tag_id in tag_ids], deadline)
+            for row in iter_filtered_markets(pages, seen_urls, cfg, deadline, filter_stats, on_page):
+                if needs_all_rows:
+                    final_data.append(row)
+                else:
+                    ranker.push(row)
 
-                if end_date_str:
-                    try:
-                        # 使用 pandas 进行更稳健的日期解析
-                        end_date = pd.to_datetime(end_date_str)
-                        if end_date.tzinfo is None:
-                            end_date = end_date.tz_localize('UTC')
-                        
-                        now = pd.Timestamp.now(tz='UTC')
-                        delta = end_date - now
-                        days_to_end = delta.days
-                        
-                        # Only apply filter if enabled (>=0)
-                        if MAX_DAYS_TO_END >= 0:
-                            # 严格过滤: 必须在 [0, MAX] 范围内 (负数表示已过期但未结算，通常排除，或需用户指定)
-                            # 这里保持 < 0 也排除，因为我们要找未来的. 
-                            # 修正: days_to_end=0 means < 24h. 
-                            if days_to_end < 0 or days_to_end > MAX_DAYS_TO_END:
-                                continue
-                    except Exception as e:
-                        # 日期解析失败，如果开启了严格过滤，则排除
-                        if MAX_DAYS_TO_END >= 0:
-                            continue
-                        pass
-                
-                # 3. 关键词搜索过滤 (支持逗号分隔的 OR 逻辑)
-                if SEARCH_KEYWORD:
-                    keywords = [k.strip().lower() for k in SEARCH_KEYWORD.split(',') if k.strip()]
-                    title_lower = str(title).lower()
-                    if keywords:
-                        match_found = False
-                        for kw in keywords:
-                            if kw in title_lower:
-                                match_found = True
-                                break
-                        if not match_found:
-                            continue
-                
-                # 4. 排除关键词黑名单
-                if EXCLUDE_KEYWORDS:
-                    is_excluded = False
-                    for kw in EXCLUDE_KEYWORDS:
-                        if kw in str(title).lower():
-                            is_excluded = True
-                            break
-                    if is_excluded:
-                        continue
-
-                final_data.append({
-                    "Title": str(title),
-                    "Volume": vol,
-                    "Prob": prob,
-                    "Liquidity": liquidity,
-                    "DaysToEnd": days_to_end if days_to_end is not None else 999,
-                    "Link": link
-                })
+            # 超时不视为错误: 保留已收集的部分结果
+            if time.time() > deadline:
+                timed_out = True
+                collected = len(final_data) if needs_all_rows else ranker.total
+                console.print(f"[yellow]⏱️ 已达到最大运行时间 ({cfg.runtime_limit}s)，提前返回部分结果 ({collected} 条)[/yellow]")
         except Exception as e:
             error_msg = str(e)
             console.print(f"[dim red]探测异常: {e}[/dim red]")
-            pass
+
+    # 事件模式: 结果按事件汇总后再排序、展示
+    if events_mode and final_data:
+        market_count = len(final_data)
+        with metrics.stage('rollup'):
+            final_data = rollup_events(final_data, event_of)
+        console.print(f"[dim cyan]🧩 事件汇总: {market_count} 个市场 → {len(final_data)} 个事件[/dim cyan]")
+
+    # 价格历史: 记录本次快照，并按需计算动量
+    if final_data and (cfg.history or cfg.order_by == "momentum"):
+        try:
+            with metrics.stage('history'):
+                apply_momentum(final_data, cfg)
+        except Exception as e:
+            console.print(f"[yellow]⚠️ 价格历史更新失败: {e}[/yellow]")
+
+    for row in final_data:
+        ranker.push(row)
 
     # 兜底：如果 API 异常导致无数据，显示错误信息
-    if not final_data:
-        if error_msg:
-             console.print(f"[yellow]警告: API 请求失败 ({error_msg})[/yellow]")
-             final_data = [{
-                "Title": f"⚠️ 错误: API 连接失败 - {error_msg}", 
-                "Volume": 0, "Prob": 0.5, "Liquidity": 0, "DaysToEnd": 0, "Link": "N/A"
-             }]
-        else:
-             # 如果没有报错但过滤完了，显示空提示
-             final_data = []
-
-    # 按配置的排序策略排序
-    sort_key_map = {
-        'volume': lambda x: x['Volume'],
-        'liquidity': lambda x: x.get('Liquidity', 0),
-        'enddate': lambda x: x.get('DaysToEnd', 999999),
-        'prob': lambda x: abs(x['Prob'] - 0.5)  # 极端值优先
-    }
-    
-    sort_key = sort_key_map.get(ORDER_BY, sort_key_map['volume'])
-    sorted_data = sorted(final_data, key=sort_key, reverse=True)
-    
-    # 应用 Vibe Filter (自定义或默认胜率区间)
-    vibe_list = [r for r in sorted_data if r['Volume'] > MIN_VOLUME and MIN_PROB <= r['Prob'] <= MAX_PROB]
-    
+    if not ranker.total and error_msg:
+        console.print(f"[yellow]警告: API 请求失败 ({error_msg})[/yellow]")
+        ranker.push({
+            "Title": f"⚠️ 错误: API 连接失败 - {error_msg}",
+            "Volume": 0, "Prob": 0.5, "Liquidity": 0, "DaysToEnd": 0, "Link": "N/A"
+        })
+
     # 统计被胜率/成交量过滤掉的数量 (用于诊断)
-    filtered_count = len(sorted_data) - len(vibe_list)
+    filtered_count = ranker.total - ranker.vibe_count
     
     display_list = []
     header = ""
-    if vibe_list:
+    if ranker.vibe_count:
         # 放宽展示数量到前 50 条
-        display_list = vibe_list[:50]
-        header = f"💎 核心侦察结果 (查获 {len(vibe_list)} 个优质市场)"
+        display_list = ranker.vibe_rows()
+        header = f"💎 核心侦察结果 (查获 {ranker.vibe_count} 个优质市场)"
     else:
-        display_list = sorted_data[:20]
+        display_list = ranker.all_rows()
         header = "📡 全局快照 (仅展示高成交量)"
-        console.print(f"[dim]提示：目前无市场符合 {MIN_PROB:.0%}-{MAX_PROB:.0%} 胜率规则，已输出当前成交量最高的数据。[/dim]")
+        console.print(f"[dim]提示：目前无市场符合 {cfg.min_prob:.0%}-{cfg.max_prob:.0%} 胜率规则，已输出当前成交量最高的数据。[/dim]")
 
-    if filtered_count > 0 and MAX_DAYS_TO_END >= 0:
+    if filtered_count > 0 and cfg.max_days_to_end >= 0:
          console.print(f"[dim yellow]⚠️ 注意: 有 {filtered_count} 个符合日期但被胜率/成交量过滤的市场。如结果过少，请放宽胜率区间。[/dim yellow]")
 
-    # 绘制 Rich 表格
-    table = Table(title=f"{header}", border_style="cyan", header_style="bold magenta")
+    return ScoutResult(
+        rows=display_list,
+        header=header,
+        tag_info=tag_info,
+        started_at=start_t,
+        elapsed=time.time() - start_t,
+        vibe_count=ranker.vibe_count,
+        total_count=ranker.total,
+        filtered_count=filtered_count,
+        filtered_by_prob=ranker.filtered_by_prob,
+        filtered_by_volume=ranker.filtered_by_volume,
+        fallback=not ranker.vibe_count,
+        timed_out=timed_out,
+        error=error_msg,
+        pages_fetched=filter_stats['pages'],
+        markets_scanned=filter_stats['markets'],
+        filter_seconds=filter_stats['filter_s'],
+        filter_mode=cfg.filter_mode,
+        http=_http_delta(http_before, http.stats()),
+    )
+
+def render_table(result, console=None):
+    """绘制 Rich 表格 (无头模式下跳过，完整名单见 markets_list.txt)"""
+    console = _resolve_console(console)
+    if isinstance(console, PlainConsole):
+        return
+    from rich.table import Table
+    table = Table(title=f"{result.header}", border_style="cyan", header_style="bold magenta")
     table.add_column("侦察目标 (Market)", style="white")
     table.add_column("⏳ 剩", justify="right", style="yellow")
     table.add_column("胜率", justify="center", style="green")
+    show_outcome = any('TopOutcome' in r for r in result.rows)
+    if show_outcome:
+        table.add_column("最可能结果", style="bold green")
+        table.add_column("结果数", justify="right", style="dim")
+    show_momentum = any('Momentum' in r for r in result.rows)
+    if show_momentum:
+        table.add_column("Δ胜率", justify="right", style="bold yellow")
     table.add_column("成交量", justify="right", style="blue")
     table.add_column("查看链接 (Link)", justify="left", style="underline cyan")
 
-    for r in display_list:
+    for r in result.rows:
         days_str = str(r['DaysToEnd']) if r['DaysToEnd'] < 900 else ">2y"
+        cells = [r['Title'][:50], days_str + "d", f"{r['Prob']:.1%}"]
+        if show_outcome:
+            cells += [str(r.get('TopOutcome', ''))[:30], str(r.get('Outcomes', ''))]
+        if show_momentum:
+            cells.append(f"{r.get('Momentum', 0) * 100:+.1f}pt")
+        cells += [f"${r['Volume']:,.0f}", r['Link']]
+        table.add_row(*cells)
+
+    with metrics.timed(result.metrics, 'render'):
+        console.print(table)
+
+def format_markets_list(result):
+    """生成完整名单文本 (markets_list.txt 与 Web 界面共用)"""
+    lines = [f"=== Mikon AI Scout 侦察完整名单 ({datetime.now()}) ===\n"]
+    lines.append(f"共计收录: {len(result.rows)} 条记录\n\n")
+    for i, r in enumerate(result.rows, 1):
+        lines.append(f"{i}. 【{r['Prob']:.1%}】{r['Title']}\n")
+        lines.append(f"   成交量: ${r['Volume']:,.0f}\n")
+        if 'Momentum' in r:
+            lines.append(f"   胜率变化: {r['Momentum'] * 100:+.1f}pt\n")
+        if 'TopOutcome' in r:
+            lines.append(f"   最可能结果: {r['TopOutcome']} ({r['Outcomes']} 个结果)\n")
+        lines.append(f"   查看链接: {r['Link']}\n")
+        lines.append("-" * 50 + "\n")
+    return "".join(lines)
+
+def save_markets_list(result, path="markets_list.txt", console=None):
+    """持久化存储"""
+    console = _resolve_console(console)
+    try:
+        with metrics.timed(result.metrics, 'save'), open(path, "w", encoding="utf-8") as f:
+            f.write(format_markets_list(result))
+        console.print(f"\n[bold green]💾 完整名单（含链接）已存至: {path}[/bold green]")
+    except Exception as e:
+        console.print(f"[red]保存失败: {e}[/red]")
+
+def print_run_stats(result, console=None):
+    """输出耗时、过滤吞吐与网络统计"""
+    console = _resolve_console(console)
+    console.print(f"\n[bold green]✅ 侦察任务完成。总耗时: {time.time()-result.started_at:.1f}s[/bold green]")
+    if result.markets_scanned and result.filter_seconds > 0:
+        throughput = result.markets_scanned / result.filter_seconds
+        console.print(f"[dim]过滤吞吐: {result.markets_scanned} 个市场 / {result.filter_seconds:.2f}s ({throughput:,.0f} 市场/s, {result.filter_mode} 模式)[/dim]")
+    http_stats = result.http
+    if http_stats:
+        saved_kb = (http_stats['bytes_saved_compression'] + http_stats['bytes_saved_304']) / 1024
+        console.print(f"[dim]网络: {http_stats['requests']} 次请求 (重试 {http_stats['retries']}, 304 {http_stats['not_modified']}) | "
+                      f"连接复用 {http_stats['reused_connections']} 次 | 接收 {http_stats['bytes_received'] / 1024:,.0f} KB, 节省 {saved_kb:,.0f} KB[/dim]")
+        if http_stats.get('throttled') or http_stats.get('rate_wait_s', 0) >= 1:
+            rate = http.governor.status() if http.governor else {}
+            console.print(f"[dim yellow]限速: 上游限流 {http_stats.get('throttled', 0)} 次，累计限速等待 {http_stats.get('rate_wait_s', 0):.1f}s，"
+                          f"当前速率 {rate.get('rate', 0):.1f}/{rate.get('max_rate', 0):.0f} 次/秒[/dim yellow]")
+    stages = result.metrics.get('stages', {})
+    if stages:
+        # 各阶段累计耗时 (拉取在多个线程中并发，累计值可能超过总耗时)
+        parts = [f"{name} {st['sum_s']:.2f}s×{st['count']}" for name, st in stages.items() if name != 'total']
+        console.print(f"[dim]阶段耗时: {' | '.join(parts)}[/dim]")
+    if result.profile:
+        console.print(f"[dim]🔬 性能剖析已保存: {os.path.join(profiling.PROFILE_DIR, result.profile)}.*[/dim]")
+
+METRICS_FILE = os.getenv("SCOUT_METRICS_FILE", "")  # 每次侦察追加一行 JSON 指标摘要 (留空关闭)
+
+def write_metrics(result, cfg, path=None, console=None):
+    """把本次侦察的指标摘要追加为一行 JSON (供外部采集/分析)"""
+    console = _resolve_console(console)
+    path = METRICS_FILE if path is None else path
+    if not path:
+        return
+    record = {
+        'ts': result.started_at,
+        'preset': cfg.preset,
+        'elapsed': round(result.elapsed, 3),
+        'total': result.total_count,
+        'shown': len(result.rows),
+        'timed_out': result.timed_out,
+        'error': result.error,
+        'http': result.http,
+        **result.metrics,
+    }
+    try:
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+    except OSError as e:
+        console.print(f"[yellow]⚠️ 指标写入失败: {e}[/yellow]")
+
+WEBHOOK_MAX_ITEMS = int(os.getenv("SCOUT_WEBHOOK_MAX_ITEMS", 10) or 10)  # 推送的情报条数 (超出单条消息长度时自动分段)
+
+def build_report_message(result, cfg, limit=None):
+    """侦察报告推送内容 (前 limit 条情报)"""
+    limit = WEBHOOK_MAX_ITEMS if limit is None else limit
+    display_list = result.rows
+    message = webhooks.Message(
+        title="🕵️ **Mikon Scout 侦察报告**",
+        header=[
+            f"🎯 目标: {result.tag_info}",
+            f"📊 规则: >${cfg.min_volume:,.0f} | Win {cfg.min_prob:.0%}-{cfg.max_prob:.0%}",
+            f"⏱️ 耗时: {time.time()-result.started_at:.1f}s | 查获: {len(display_list)} 条",
+            "",
+        ],
+        data={'type': 'report', 'target': result.tag_info, 'total': len(display_list), 'rows': display_list[:limit]},
+    )
+    for i, r in enumerate(display_list[:limit], 1):
+        message.items.append(f"{i}. [{r['Prob']:.1%}] **{r['Title']}**\n   💰 ${r['Volume']:,.0f} | 🔗 <{r['Link']}>")
+    if len(display_list) > limit:
+        message.footer = ["", f"...还有 {len(display_list)-limit} 条见完整名单。"]
+    return message
+
+def _dispatch(message, cfg, result, console):
+    """写入推送发件箱并在后台发送 (侦察不等待网络)"""
+    with metrics.timed(result.metrics, 'webhook'):
+        n_targets, n_messages = webhooks.dispatcher.submit(message, cfg.webhook_url)
+    console.print(f"[bold green]📨 已加入推送队列: {n_targets} 个目标 / {n_messages} 条消息 (后台发送)[/bold green]")
+
+def push_webhook(result, cfg, console=None):
+    """[Automation] Webhook 推送逻辑"""
+    console = _resolve_console(console)
+    display_list = result.rows
+    if not (cfg.webhook_url and display_list):
+        return
+    try:
+        console.print(f"\n[cyan]正在向 Webhook 推送 {len(display_list)} 条情报...[/cyan]")
+        _dispatch(build_report_message(result, cfg), cfg, result, console)
+    except Exception as e:
+        console.print(f"[red]❌ 推送失败: {e}[/red]")
+
+def flush_webhooks(console=None, timeout=None):
+    """CLI 退出前等待后台推送 (最多 SCOUT_WEBHOOK_FLUSH_TIMEOUT 秒)，未送达的留在发件箱由下次运行重试"""
+    console = _resolve_console(console)
+    timeout = webhooks.WEBHOOK_FLUSH_TIMEOUT if timeout is None else timeout
+    if not webhooks.dispatcher.flush(timeout):
+        console.print(f"[yellow]⏳ 推送未在 {timeout:.0f}s 内完成，剩余消息将由下次运行继续投递[/yellow]")
+    status = webhooks.dispatcher.status()
+    if status['sent']:
+        console.print(f"[bold green]✅ 推送成功: {status['sent']} 条消息[/bold green]")
+    if status['pending']:
+        console.print(f"[yellow]📮 发件箱中有 {status['pending']} 条消息等待重试 (.cache/webhooks.db)[/yellow]")
+
+def list_presets():
+    """presets/ 目录下的全部方案名"""
+    if not os.path.isdir("presets"):
+        return []
+    return sorted(f[:-5] for f in os.listdir("presets") if f.endswith(".json"))
+
+def _market_order_key(order_by):
+    """与 Gamma API order 参数一致的本地排序键 (升序使用)"""
+    if order_by == "liquidity":
+        return lambda m: -to_float(m.get('liquidityNum', m.get('liquidity')))
+    if order_by == "enddate":
+        # 结束日期为空的排在最后
+        return lambda m: (not m.get('endDate'), str(m.get('endDate') or ''))
+    return lambda m: -to_float(m.get('volumeNum', m.get('volume')))
+
+def select_markets(markets, cfg):
+    """在已拉取的市场全集中，按 API 查询语义 (门槛、截止日期、排序、fetch_limit) 选出该配置本会拉到的市场"""
+    rows = markets
+    if cfg.pushdown and cfg.min_volume > 0:
+        rows = [m for m in rows if to_float(m.get('volumeNum', m.get('volume'))) >= cfg.min_volume]
+    if cfg.pushdown and cfg.min_liquidity > 0:
+        rows = [m for m in rows if to_float(m.get('liquidityNum', m.get('liquidity'))) >= cfg.min_liquidity]
+    date_str = _end_date_max(cfg)
+    if date_str:
+        rows = [m for m in rows if m.get('endDate') and str(m['endDate']) <= date_str]
+    return sorted(rows, key=_market_order_key(cfg.order_by))[:cfg.fetch_limit]
+
+def plan_universe_query(cfgs, tag_id):
+    """同一品类下多个方案的并集查询: 取最宽松的门槛与截止日期，拉取一次即可覆盖所有方案"""
+    tag_param = f"&tag_id={tag_id}" if tag_id else ""
+    date_param = ""
+    if all(c.max_days_to_end >= 0 for c in cfgs):
+        widest = max(cfgs, key=lambda c: c.max_days_to_end)
+        date_param = f"&end_date_max={_end_date_max(widest)}"
+    threshold_param = ""
+    if all(c.pushdown for c in cfgs):
+        min_volume = min(c.min_volume for c in cfgs)
+        min_liquidity = min(c.min_liquidity for c in cfgs)
+        if min_volume > 0:
+            threshold_param += f"&volume_num_min={_format_number(min_volume)}"
+        if min_liquidity > 0:
+            threshold_param += f"&liquidity_num_min={_format_number(min_liquidity)}"
+    return f"active=true&closed=false&order=volume&ascending=false{tag_param}{date_param}{threshold_param}"
+
+def run_batch(names=None, console=None):
+    """批量模式: 一次拉取所有方案所需的市场并集，再逐个方案过滤、出表、存档和推送
+
+    总耗时随市场并集大小增长，而不是随方案数量增长。返回 {方案名: ScoutResult}。
+    """
+    console = _resolve_console(console)
+    start_t = time.time()
+    names = names or list_presets()
+    if not names:
+        console.print("[yellow]⚠️ presets/ 下没有可用的方案[/yellow]")
+        return {}
+    webhooks.dispatcher.drain()
+
+    # 1. 载入各方案配置，并按品类 (扫描范围) 分组
+    cfgs = {}
+    for name in names:
+        if not os.path.exists(os.path.join("presets", f"{name}.json")):
+            console.print(f"[yellow]⚠️ 方案不存在，已跳过: {name}[/yellow]")
+            continue
+        cfgs[name] = ScoutConfig.from_env({**os.environ, "SCOUT_AUTO_PRESET": name}, console)
+    scopes = {}
+    for name, cfg in cfgs.items():
+        tags, _ = resolve_tags(cfg.tag)
+        for tag_id in [tag_id for tag_id, _ in tags] or [None]:
+            scopes.setdefault(tag_id, []).append(name)
+
+    # 2. 每个范围只拉取一次并集 (时限取各方案中最长的)
+    universe = {}
+    http_before = http.stats()
+    for tag_id, members in scopes.items():
+        group = [cfgs[n] for n in members]
+        query = plan_universe_query(group, tag_id)
+        deadline = time.time() + max(c.runtime_limit for c in group)
+        concurrency = max(c.fetch_concurrency for c in group)
+        label = f"品类 {tag_id}" if tag_id else "全局"
+        with_description = any(c.search_in_description for c in group)
+        project = lambda m: project_market(m, with_description)
+        with console.status(f"[bold green]正在拉取 {label} 市场并集 ({', '.join(members)})...", spinner="earth"), \
+                profiling.capture(group[0].profile) as prof:
+            markets = [m for page in iter_market_pages(query, STORE_MAX_MARKETS, concurrency, deadline, project=project)
+                       for m in page]
+        if prof is not None:
+            # 并集拉取不属于任何单个方案的侦察，单独保存一份剖析
+            try:
+                name = prof.save(f"batch-{tag_id or 'all'}", config={'query': query, 'presets': members},
+                                 extra={'markets_scanned': len(markets)})
+                console.print(f"[dim]🔬 并集拉取剖析已保存: {os.path.join(profiling.PROFILE_DIR, name)}.*[/dim]")
+            except OSError as e:
+                console.print(f"[yellow]⚠️ 性能剖析保存失败: {e}[/yellow]")
+        universe[tag_id] = markets
+        console.print(f"[dim cyan]📦 {label}: 拉取 {len(markets)} 个市场，供 {len(members)} 个方案共用[/dim cyan]")
+        if time.time() > deadline:
+            console.print(f"[yellow]⏱️ {label} 并集拉取超时，相关方案使用部分数据[/yellow]")
+    fetch_stats = _http_delta(http_before, http.stats())
+    console.print(f"[dim]并集拉取: {fetch_stats['requests']} 次请求，接收 {fetch_stats['bytes_received'] / 1024:,.0f} KB，"
+                  f"耗时 {time.time() - start_t:.1f}s[/dim]")
+
+    # 3. 逐个方案在内存中过滤
+    def from_universe(cfg, tag_id, deadline, console):
+        selected = select_markets(universe.get(tag_id, []), cfg)
+        for offset in range(0, len(selected), PAGE_SIZE):
+            yield selected[offset:offset + PAGE_SIZE]
+
+    results = {}
+    for name, cfg in cfgs.items():
+        console.rule(f"[bold cyan]方案: {name}[/bold cyan]")
+        result = run_scout(cfg, console, source=from_universe)
+        _record_startup(result)
+        render_table(result, console)
+        save_markets_list(result, f"markets_list_{name}.txt", console)
+        print_run_stats(result, console)
+        push_webhook(result, cfg, console)
+        write_metrics(result, cfg, console=console)
+        results[name] = result
+
+    console.print(f"\n[bold green]✅ 批量侦察完成: {len(results)} 个方案，总耗时 {time.time() - start_t:.1f}s[/bold green]")
+    return results
+
+# 持续监控模式: 两轮之间变化超过阈值才视为变动
+WATCH_INTERVAL = int(os.getenv("SCOUT_WATCH_INTERVAL", 300) or 300)              # 扫描间隔 (秒)
+WATCH_PROB_DELTA = float(os.getenv("SCOUT_WATCH_PROB_DELTA", 0.05) or 0.05)      # 胜率绝对变化
+WATCH_VOLUME_DELTA = float(os.getenv("SCOUT_WATCH_VOLUME_DELTA", 0.2) or 0.2)    # 成交量相对变化
+WATCH_DAYS_DELTA = int(os.getenv("SCOUT_WATCH_DAYS_DELTA", 1) or 1)              # 剩余天数变化
+
+def diff_results(prev_rows, curr_rows, prob_delta=None, volume_delta=None, days_delta=None):
+    """对比两轮结果 (按链接识别市场)，返回 {'added', 'removed', 'changed'}
+
+    changed 中每项为 (旧行, 新行, 变化字段列表)，只收录变化超过阈值的市场。
+    """
+    prob_delta = WATCH_PROB_DELTA if prob_delta is None else prob_delta
+    volume_delta = WATCH_VOLUME_DELTA if volume_delta is None else volume_delta
+    days_delta = WATCH_DAYS_DELTA if days_delta is None else days_delta
+
+    prev = {r['Link']: r for r in prev_rows}
+    curr = {r['Link']: r for r in curr_rows}
+    added = [r for link, r in curr.items() if link not in prev]
+    removed = [r for link, r in prev.items() if link not in curr]
+    changed = []
+    for link, new in curr.items():
+        old = prev.get(link)
+        if old is None:
+            continue
+        fields_moved = []
+        if abs(new['Prob'] - old['Prob']) >= prob_delta:
+            fields_moved.append('Prob')
+        if old['Volume'] > 0 and abs(new['Volume'] - old['Volume']) / old['Volume'] >= volume_delta:
+            fields_moved.append('Volume')
+        if abs(new['DaysToEnd'] - old['DaysToEnd']) >= days_delta:
+            fields_moved.append('DaysToEnd')
+        if fields_moved:
+            changed.append((old, new, fields_moved))
+    return {'added': added, 'removed': removed, 'changed': changed}
+
+def render_delta(delta, console=None):
+    """在终端输出本轮变动"""
+    console = _resolve_console(console)
+    if not any(delta.values()):
+        console.print("[dim]🔁 本轮无显著变化[/dim]")
+        return
+    if isinstance(console, PlainConsole):
+        console.print(f"🔁 本轮变动: 新增 {len(delta['added'])} | 移除 {len(delta['removed'])} | 变化 {len(delta['changed'])}")
+        return
+    from rich.table import Table
+    table = Table(title="🔁 本轮变动", border_style="yellow", header_style="bold magenta")
+    table.add_column("变动", style="bold")
+    table.add_column("侦察目标 (Market)", style="white")
+    table.add_column("胜率", justify="center", style="green")
+    table.add_column("成交量", justify="right", style="blue")
+    table.add_column("⏳ 剩", justify="right", style="yellow")
+    for r in delta['added']:
+        table.add_row("[green]新增[/green]", r['Title'][:50], f"{r['Prob']:.1%}", f"${r['Volume']:,.0f}", f"{r['DaysToEnd']}d")
+    for r in delta['removed']:
+        table.add_row("[red]移除[/red]", r['Title'][:50], f"{r['Prob']:.1%}", f"${r['Volume']:,.0f}", f"{r['DaysToEnd']}d")
+    for old, new, moved in delta['changed']:
         table.add_row(
-            r['Title'][:50],
-            days_str + "d",
-            f"{r['Prob']:.1%}",
-            f"${r['Volume']:,.0f}",
-            r['Link']
+            "[yellow]变化[/yellow]",
+            new['Title'][:50],
+            f"{old['Prob']:.1%} → {new['Prob']:.1%}" if 'Prob' in moved else f"{new['Prob']:.1%}",
+            f"${old['Volume']:,.0f} → ${new['Volume']:,.0f}" if 'Volume' in moved else f"${new['Volume']:,.0f}",
+            f"{old['DaysToEnd']}d → {new['DaysToEnd']}d" if 'DaysToEnd' in moved else f"{new['DaysToEnd']}d",
         )
-
     console.print(table)
-    
-    # 持久化存储
+
+def build_delta_message(delta, result, limit=None):
+    """变动推送内容 (每类最多 limit 条，超出单条消息长度时自动分段)"""
+    limit = WEBHOOK_MAX_ITEMS if limit is None else limit
+    message = webhooks.Message(
+        title="🔁 **Mikon Scout 变动快报**",
+        header=[
+            f"🎯 目标: {result.tag_info}",
+            f"📊 新增 {len(delta['added'])} | 移除 {len(delta['removed'])} | 变化 {len(delta['changed'])}",
+            "",
+        ],
+        data={'type': 'delta', 'target': result.tag_info,
+              'added': delta['added'][:limit], 'removed': delta['removed'][:limit],
+              'changed': [{'old': old, 'new': new, 'fields': moved} for old, new, moved in delta['changed'][:limit]]},
+    )
+    for r in delta['added'][:limit]:
+        message.items.append(f"🆕 [{r['Prob']:.1%}] **{r['Title']}**\n   💰 ${r['Volume']:,.0f} | 🔗 <{r['Link']}>")
+    for r in delta['removed'][:limit]:
+        message.items.append(f"➖ ~~{r['Title']}~~")
+    for old, new, moved in delta['changed'][:limit]:
+        parts = []
+        if 'Prob' in moved:
+            parts.append(f"胜率 {old['Prob']:.1%} → {new['Prob']:.1%}")
+        if 'Volume' in moved:
+            parts.append(f"成交量 ${old['Volume']:,.0f} → ${new['Volume']:,.0f}")
+        if 'DaysToEnd' in moved:
+            parts.append(f"剩余 {old['DaysToEnd']}d → {new['DaysToEnd']}d")
+        message.items.append(f"📈 **{new['Title']}**\n   {' | '.join(parts)} | 🔗 <{new['Link']}>")
+    return message
+
+def push_delta_webhook(delta, result, cfg, console=None):
+    """只推送变动部分；无变动时不发送"""
+    console = _resolve_console(console)
+    if not (cfg.webhook_url and any(delta.values())):
+        return
     try:
-        with open("markets_list.txt", "w", encoding="utf-8") as f:
-            f.write(f"=== Mikon AI Scout 侦察完整名单 ({pd.Timestamp.now()}) ===\n")
-            f.write(f"共计收录: {len(display_list)} 条记录\n\n")
-            for i, r in enumerate(display_list, 1):
-                f.write(f"{i}. 【{r['Prob']:.1%}】{r['Title']}\n")
-                f.write(f"   成交量: ${r['Volume']:,.0f}\n")
-                f.write(f"   查看链接: {r['Link']}\n")
-                f.write("-" * 50 + "\n")
-        console.print(f"\n[bold green]💾 完整名单（含链接）已存至: markets_list.txt[/bold green]")
+        _dispatch(build_delta_message(delta, result), cfg, result, console)
     except Exception as e:
-        console.print(f"[red]保存失败: {e}[/red]")
+        console.print(f"[red]❌ 推送失败: {e}[/red]")
 
-    console.print(f"\n[bold green]✅ 侦察任务完成。总耗时: {time.time()-start_t:.1f}s[/bold green]")
+def run_watch(cfg=None, interval=None, console=None):
+    """持续监控模式: 按间隔重复侦察，与上一轮对比，只推送变动 (Ctrl+C 退出)
 
-    # [Automation] Webhook 推送逻辑
-    WEBHOOK_URL = os.getenv("SCOUT_WEBHOOK_URL", "").strip()
-    if WEBHOOK_URL and display_list:
-        try:
-            console.print(f"\n[cyan]正在向 Webhook 推送 {len(display_list)} 条情报...[/cyan]")
-            
-            # 构造消息内容
-            msg_content = f"🕵️ **Mikon Scout 侦察报告**\n"
-            msg_content += f"🎯 目标: {tag_info}\n"
-            msg_content += f"📊 规则: >${MIN_VOLUME:,.0f} | Win {MIN_PROB:.0%}-{MAX_PROB:.0%}\n"
-            msg_content += f"⏱️ 耗时: {time.time()-start_t:.1f}s | 查获: {len(display_list)} 条\n\n"
-            
-            for i, r in enumerate(display_list[:10], 1): # 限制推送前10条以免刷屏
-                msg_content += f"{i}. [{r['Prob']:.1%}] **{r['Title']}**\n"
-                msg_content += f"   💰 ${r['Volume']:,.0f} | 🔗 <{r['Link']}>\n"
-            
-            if len(display_list) > 10:
-                msg_content += f"\n...还有 {len(display_list)-10} 条见完整名单。"
-
-            payload = {
-                "content": msg_content,
-                "username": "Mikon Scout Army"
-            }
-            
-            # 发送
-            requests.post(WEBHOOK_URL, json=payload, timeout=10)
-            console.print("[bold green]✅ 推送成功！[/bold green]")
-        except Exception as e:
-            console.print(f"[red]❌ 推送失败: {e}[/red]")
+    首轮输出完整报告作为基线；之后各轮复用同一进程内的连接池、标签索引与条件请求缓存。
+    """
+    console = _resolve_console(console)
+    cfg = cfg or ScoutConfig.from_env(console=console)
+    interval = max(1, interval or WATCH_INTERVAL)
+    webhooks.dispatcher.drain()
+    webhooks.dispatcher.start_background()
+    previous = None
+    cycle = 0
+    try:
+        while True:
+            cycle += 1
+            cycle_start = time.time()
+            console.rule(f"[bold cyan]第 {cycle} 轮侦察[/bold cyan]")
+            result = run_scout(cfg, console)
+            _record_startup(result)
+            if result.error:
+                # 本轮失败: 保留上一轮基线，避免把失败误判为全部移除
+                console.print("[yellow]⚠️ 本轮侦察失败，跳过对比[/yellow]")
+            elif previous is None:
+                render_table(result, console)
+                save_markets_list(result, console=console)
+                push_webhook(result, cfg, console)
+                previous = result
+            else:
+                delta = diff_results(previous.rows, result.rows)
+                render_delta(delta, console)
+                save_markets_list(result, console=console)
+                push_delta_webhook(delta, result, cfg, console)
+                previous = result
+            print_run_stats(result, console)
+            write_metrics(result, cfg, console=console)
+
+            wait = interval - (time.time() - cycle_start)
+            console.print(f"[dim]💤 下一轮将在 {max(0, wait):.0f}s 后开始 (Ctrl+C 退出)[/dim]")
+            if wait > 0:
+                time.sleep(wait)
+    except KeyboardInterrupt:
+        console.print("\n[bold]👋 监控已停止[/bold]")
+
+def scout(cfg=None):
+    """CLI 入口: 侦察 -> 表格 -> markets_list.txt -> Webhook"""
+    cfg = cfg or ScoutConfig.from_env()
+    webhooks.dispatcher.drain()  # 先投递之前运行遗留的失败推送
+    result = run_scout(cfg)
+    _record_startup(result)
+    render_table(result)
+    save_markets_list(result)
+    print_run_stats(result)
+    push_webhook(result, cfg)
+    write_metrics(result, cfg)
+    return result
+
+IMPORT_SECONDS = time.perf_counter() - _IMPORT_T0  # 导入本模块 (含依赖) 的耗时
 
 if __name__ == "__main__":
-    scout()
+    import argparse
+    parser = argparse.ArgumentParser(description="Mikon AI Scout - Polymarket 闪电侦察")
+    parser.add_argument("--batch", nargs="?", const="", default=None, metavar="方案1,方案2",
+                        help="批量模式: 一次拉取、按 presets/ 下的全部 (或指定) 方案分别过滤")
+    parser.add_argument("--watch", nargs="?", type=int, const=0, default=None, metavar="秒",
+                        help="持续监控模式: 按间隔重复侦察，只推送变动 (默认间隔 SCOUT_WATCH_INTERVAL)")
+    parser.add_argument("--search", default=None, metavar="查询",
+                        help='全文检索本地快照 (标题 + 描述)，支持 "短语"、-排除、OR、前缀*，不重新扫描 API')
+    parser.add_argument("--search-limit", type=int, default=20, metavar="N", help="--search 输出的条数")
+    parser.add_argument("--search-sort", default="relevance", choices=("relevance", "volume", "liquidity"),
+                        help="--search 排序方式")
+    parser.add_argument("--headless", action="store_true",
+                        help="无头模式: 不渲染表格，日志输出为纯文本 (同 SCOUT_HEADLESS=1)")
+    args = parser.parse_args()
+    if args.headless:
+        HEADLESS = True
+    if args.search is not None:
+        try:
+            render_search(search_markets(args.search, limit=args.search_limit, sort=args.search_sort))
+        except ValueError as e:
+            _resolve_console(None).print(f"[red]❌ {e}[/red]")
+        except Exception as e:
+            _resolve_console(None).print(f"[red]❌ 检索失败 (本地快照不可用且无法同步): {e}[/red]")
+    elif args.watch is not None:
+        run_watch(interval=args.watch)
+    elif args.batch is not None:
+        run_batch([n.strip() for n in args.batch.split(",") if n.strip()])
+    else:
+        scout()
+    flush_webhooks()
@@ -0,0 +1,449 @@
+"""市场全文检索: 标题 (question) + 描述 (description) 的内存倒排索引 (scout.py 与 server.py 共用)
+
+- 分词: NFKC 规范化并转小写；拉丁字母 / 数字按连续字符切词，中日韩文字按相邻二字切分 (单字保留原字)
+- 索引: 词 -> 递增的文档号数组 (全部字段 / 仅标题两份)，每篇文档另存词号序列用于短语校验；
+  更新 = 作废旧文档号 + 追加新文档号，作废过多时整体压缩，倒排数组始终有序
+- 数据来自本地快照库的全局范围 (market_store, scope=global): 首次从快照载入，之后每次快照同步
+  (全量 / 增量) 拉取到的市场直接并入索引，不重复解析快照
+- 查询语法:
+    bitcoin etf            同时包含 (AND，也可写 AND)
+    "rate cut"             短语 (相邻出现)
+    -sports / NOT sports   排除
+    trump OR biden         任一 (OR 与前一个条件合并)
+    elect*                 前缀
+    比特币 / 美联储 降息    中文按相邻二字匹配 (连续的中文视为短语)，单字匹配所有包含该字的词
+- 排序: relevance (默认，命中条件的 idf 之和，标题命中加权，同分按成交量) / volume / liquidity
+"""
+import re
+import math
+import time
+import bisect
+import threading
+import unicodedata
+from array import array
+from datetime import datetime, timezone
+
+from market_store import market_key, is_live
+from market_fields import to_float, first_price, parse_iso8601
+
+TITLE_BOOST = 2.0        # 标题命中的额外权重
+MAX_EXPANSIONS = 500     # 前缀 / 单字最多展开的词数
+COMPACT_RATIO = 0.3      # 作废文档占比超过该值时压缩
+SEP = 0                  # 标题与描述之间的分隔词号 (短语不跨字段)
+
+_CJK = "\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af\uf900-\ufaff"  # 假名 / 汉字 / 谚文
+_TOKEN_RE = re.compile(rf"([{_CJK}]+)|([^\W_{_CJK}]+)")
+_WORD_RE = re.compile(r"[^\W_]+")
+_CJK_CHAR = re.compile(rf"[{_CJK}]")
+_QUERY_RE = re.compile(r'(-?)"([^"]*)"?|(\S+)')
+SORTS = ('relevance', 'volume', 'liquidity')
+
+
+def tokenize(text):
+    """文本 -> 词列表 (文档与查询使用同一套规则)"""
+    if not text:
+        return []
+    text = unicodedata.normalize("NFKC", str(text)).casefold()
+    if not _CJK_CHAR.search(text):
+        return _WORD_RE.findall(text)
+    tokens = []
+    for m in _TOKEN_RE.finditer(text):
+        run = m.group(1)
+        if run is None:
+            tokens.append(m.group(2))
+        elif len(run) == 1:
+            tokens.append(run)
+        else:
+            tokens.extend(run[i:i + 2] for i in range(len(run) - 1))
+    return tokens
+
+
+# ---------- 查询解析 ----------
+
+class Clause:
+    """一个查询条件: 若干备选 (OR)，每个备选为 (词列表, 是否前缀)；多个词表示短语"""
+    __slots__ = ('negated', 'alts')
+
+    def __init__(self, negated, alts):
+        self.negated = negated
+        self.alts = alts
+
+    def __repr__(self):
+        return f"Clause({'-' if self.negated else '+'}{self.alts})"
+
+
+def parse_query(query):
+    """查询字符串 -> [Clause]；无法分出任何词的部分被忽略"""
+    clauses = []
+    negate_next = or_next = False
+    for m in _QUERY_RE.finditer(str(query or "")):
+        minus, phrase, word = m.groups()
+        if word is not None:
+            if word == "OR":
+                or_next = bool(clauses)
+                continue
+            if word == "AND":
+                continue
+            if word == "NOT":
+                negate_next = True
+                continue
+            negated = word.startswith("-") and len(word) > 1
+            word = word[1:] if negated else word
+            prefix = word.endswith("*")
+            alt = (tokenize(word.rstrip("*")), prefix)
+        else:
+            negated = bool(minus)
+            alt = (tokenize(phrase), False)
+        if not alt[0]:
+            negate_next = or_next = False
+            continue
+        negated = negated or negate_next
+        if or_next and not negated and not clauses[-1].negated:
+            clauses[-1].alts.append(alt)
+        else:
+            clauses.append(Clause(negated, [alt]))
+        negate_next = or_next = False
+    return clauses
+
+
+# ---------- 索引 ----------
+
+class SearchIndex:
+    """增量维护的倒排索引 (线程安全)"""
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._vocab = {"": SEP}
+        self._terms = [""]
+        self._postings = [array('I')]  # 词号 -> 文档号 (任一字段)
+        self._title = [array('I')]     # 词号 -> 文档号 (标题)
+        self._sorted_terms = None      # 前缀展开用的有序词表 (新增词后重建)
+        self._cjk_terms = {}           # 中日韩单字 -> 包含该字的词号 (递增，单字查询展开用)
+        self._docs = {}                # 市场主键 -> 文档号
+        self._keys = []                # 文档号 -> 市场主键 (作废为 None)
+        self._meta = []                # 文档号 -> (标题, slug, 结束日期, 胜率)
+        self._seqs = []                # 文档号 -> 词号序列 (uint32 字节串，标题 + SEP + 描述)
+        self._volume = array('d')
+        self._liquidity = array('d')
+        self._alive = bytearray()
+        self._dead = 0
+        self.synced_at = 0.0
+
+    def __len__(self):
+        return len(self._docs)
+
+    # ---------- 写入 ----------
+
+    def _term_id(self, term):
+        tid = self._vocab.get(term)
+        if tid is None:
+            tid = self._vocab[term] = len(self._terms)
+            self._terms.append(term)
+            self._postings.append(array('I'))
+            self._title.append(array('I'))
+            self._sorted_terms = None
+            if _CJK_CHAR.match(term):
+                # 中日韩词只有单字与相邻二字两种，逐字登记
+                for ch in set(term):
+                    self._cjk_terms.setdefault(ch, []).append(tid)
+        return tid
+
+    def _append(self, key, meta, volume, liquidity, title_ids, seq):
+        doc = len(self._keys)
+        self._docs[key] = doc
+        self._keys.append(key)
+        self._meta.append(meta)
+        self._seqs.append(seq.tobytes())
+        self._volume.append(volume)
+        self._liquidity.append(liquidity)
+        self._alive.append(1)
+        for tid in set(seq):
+            if tid != SEP:
+                self._postings[tid].append(doc)
+        for tid in set(title_ids):
+            self._title[tid].append(doc)
+
+    def _term_ids(self, tokens):
+        ids = list(map(self._vocab.get, tokens))
+        if None in ids:
+            ids = [self._term_id(t) if tid is None else tid for t, tid in zip(tokens, ids)]
+        return ids
+
+    def _add(self, m):
+        key = market_key(m)
+        if not key:
+            return
+        self._remove(key)
+        title = str(m.get('question') or m.get('title') or '')
+        title_ids = self._term_ids(tokenize(title))
+        seq = array('I', title_ids)
+        seq.append(SEP)
+        seq.extend(self._term_ids(tokenize(m.get('description'))))
+        prob = first_price(m)
+        meta = (title, m.get('market_slug') or m.get('slug') or '', str(m.get('endDate') or ''),
+                prob if prob == prob else None)
+        self._append(key, meta, to_float(m.get('volumeNum', m.get('volume'))),
+                     to_float(m.get('liquidityNum', m.get('liquidity'))), title_ids, seq)
+
+    def _remove(self, key):
+        doc = self._docs.pop(key, None)
+        if doc is None:
+            return
+        self._keys[doc] = None
+        self._meta[doc] = None
+        self._seqs[doc] = b""
+        self._alive[doc] = 0
+        self._dead += 1
+
+    def apply(self, markets):
+        """并入一批市场 (按 updatedAt 降序，同一市场只取最先出现的记录): 活跃的新增 / 更新，已结盘或下架的移除"""
+        latest = {}
+        for m in markets:
+            key = market_key(m)
+            if key:
+                latest.setdefault(key, m)
+        with self._lock:
+            for key, m in latest.items():
+                if is_live(m):
+                    self._add(m)
+                else:
+                    self._remove(key)
+            if self._dead > 1000 and self._dead > COMPACT_RATIO * len(self._keys):
+                self._compact()
+            self.synced_at = time.time()
+        return len(latest)
+
+    def _compact(self):
+        """丢弃作废文档并重新编号 (用已存的词号序列重建，不重新分词)"""
+        live = [(self._keys[d], self._meta[d], self._volume[d], self._liquidity[d], self._seqs[d])
+                for d in range(len(self._keys)) if self._alive[d]]
+        self._postings = [array('I') for _ in self._terms]
+        self._title = [array('I') for _ in self._terms]
+        self._docs, self._keys, self._meta, self._seqs = {}, [], [], []
+        self._volume, self._liquidity, self._alive = array('d'), array('d'), bytearray()
+        self._dead = 0
+        for key, meta, volume, liquidity, raw in live:
+            seq = array('I')
+            seq.frombytes(raw)
+            title_ids = seq[:seq.index(SEP)]
+            self._append(key, meta, volume, liquidity, title_ids, seq)
+
+    # ---------- 查询 ----------
+
+    def _expand(self, term):
+        """前缀 / 单个中日韩字 -> 匹配的词号 (最多 MAX_EXPANSIONS 个)"""
+        if len(term) == 1 and _CJK_CHAR.match(term):
+            return self._cjk_terms.get(term, [])[:MAX_EXPANSIONS]
+        if self._sorted_terms is None:
+            self._sorted_terms = sorted((t, tid) for tid, t in enumerate(self._terms) if t)
+        i = bisect.bisect_left(self._sorted_terms, (term, -1))
+        ids = []
+        while i < len(self._sorted_terms) and self._sorted_terms[i][0].startswith(term) and len(ids) < MAX_EXPANSIONS:
+            ids.append(self._sorted_terms[i][1])
+            i += 1
+        return ids
+
+    def _union(self, np, lists):
+        arrays = [np.frombuffer(a, dtype=np.uint32) for a in lists if len(a)]
+        if not arrays:
+            return np.empty(0, dtype=np.uint32)
+        return arrays[0] if len(arrays) == 1 else np.unique(np.concatenate(arrays))
+
+    def _phrase_docs(self, candidates, ids):
+        """在候选文档中保留词号序列依次相邻出现的"""
+        pattern = array('I', ids).tobytes()
+        keep = []
+        for doc in candidates.tolist():
+            seq = self._seqs[doc]
+            pos = seq.find(pattern)
+            while pos != -1 and pos % 4:
+                pos = seq.find(pattern, pos + 1)
+            if pos != -1:
+                keep.append(doc)
+        return keep
+
+    def _match_alt(self, np, tokens, prefix):
+        """一个备选 -> (命中文档号, 标题命中文档号)，均为有序去重的 uint32 数组"""
+        empty = np.empty(0, dtype=np.uint32)
+        exact, expand = list(tokens), None
+        if prefix or (len(tokens) == 1 and len(tokens[0]) == 1 and _CJK_CHAR.match(tokens[0])):
+            expand = self._expand(exact.pop())
+            if not expand:
+                return empty, empty
+        ids = [self._vocab.get(t) for t in exact]
+        if None in ids:
+            return empty, empty
+
+        parts = [np.frombuffer(self._postings[tid], dtype=np.uint32) for tid in ids]
+        title_parts = [np.frombuffer(self._title[tid], dtype=np.uint32) for tid in ids]
+        if expand is not None:
+            parts.append(self._union(np, [self._postings[tid] for tid in expand]))
+            title_parts.append(self._union(np, [self._title[tid] for tid in expand]))
+        parts.sort(key=len)
+        docs = parts[0]
+        for p in parts[1:]:
+            docs = np.intersect1d(docs, p, assume_unique=True)
+        if expand is None and len(ids) > 1 and len(docs):
+            docs = np.array(self._phrase_docs(docs, ids), dtype=np.uint32)
+        title = title_parts[0]
+        for p in title_parts[1:]:
+            title = np.intersect1d(title, p, assume_unique=True)
+        return docs, np.intersect1d(docs, title, assume_unique=True)
+
+    def search(self, query, limit=20, offset=0, sort="relevance"):
+        """执行查询，返回 {'total', 'hits', 'took_ms', 'query'}；没有任何非排除条件时抛出 ValueError"""
+        import numpy as np
+        t0 = time.perf_counter()
+        clauses = parse_query(query)
+        positive = [c for c in clauses if not c.negated]
+        if not positive:
+            raise ValueError("查询至少需要一个非排除的词")
+        sort = sort if sort in SORTS else 'relevance'
+
+        with self._lock:
+            matched = []
+            for clause in positive:
+                hits = [self._match_alt(np, tokens, prefix) for tokens, prefix in clause.alts]
+                matched.append((self._union(np, [h[0] for h in hits]), self._union(np, [h[1] for h in hits])))
+            matched.sort(key=lambda c: len(c[0]))
+            docs = matched[0][0]
+            for clause_docs, _ in matched[1:]:
+                docs = np.intersect1d(docs, clause_docs, assume_unique=True)
+            for clause in clauses:
+                if clause.negated and len(docs):
+                    hits = [self._match_alt(np, tokens, prefix)[0] for tokens, prefix in clause.alts]
+                    docs = np.setdiff1d(docs, self._union(np, hits), assume_unique=True)
+            if len(docs):
+                docs = docs[np.frombuffer(self._alive, dtype=np.uint8)[docs] == 1]
+
+            volume = np.frombuffer(self._volume, dtype=np.float64)[docs]
+            if sort == 'relevance':
+                n = max(1, len(self._docs))
+                score = np.zeros(len(docs))
+                for clause_docs, title_docs in matched:
+                    idf = math.log(1 + n / (len(clause_docs) + 1))
+                    score += idf * (1 + TITLE_BOOST * np.isin(docs, title_docs, assume_unique=True))
+                order = np.lexsort((-volume, -score))
+            else:
+                score = None
+                key = volume if sort == 'volume' else np.frombuffer(self._liquidity, dtype=np.float64)[docs]
+                order = np.argsort(-key, kind='stable')
+            page = order[offset:offset + limit]
+            hits = [self._hit(int(docs[i]), None if score is None else float(score[i])) for i in page]
+
+        return {
+            'query': query,
+            'total': int(len(docs)),
+            'hits': hits,
+            'took_ms': round((time.perf_counter() - t0) * 1000, 2),
+        }
+
+    def _hit(self, doc, score):
+        title, slug, end_date, prob = self._meta[doc]
+        end = parse_iso8601(end_date) if end_date else None
+        days = (end - datetime.now(timezone.utc)).days if end is not None else 999
+        hit = {
+            "id": self._keys[doc],
+            "Title": title,
+            "Volume": self._volume[doc],
+            "Prob": prob,
+            "Liquidity": self._liquidity[doc],
+            "DaysToEnd": days,
+            "EndDate": end_date,
+            "Link": f"https://polymarket.com/market/{slug}" if slug else "N/A",
+        }
+        if score is not None:
+            hit["Score"] = round(score, 3)
+        return hit
+
+    def stats(self):
+        with self._lock:
+            return {
+                'markets': len(self._docs),
+                'terms': len(self._terms) - 1,
+                'postings': sum(len(p) for p in self._postings),
+                'dead': self._dead,
+                'synced_at': self.synced_at,
+            }
+
+
+def build(markets):
+    """从一批市场记录构建新索引"""
+    index = SearchIndex()
+    index.apply(markets)
+    return index
+
+
+# ---------- 进程内共享索引 ----------
+
+_lock = threading.Lock()
+_current = None
+_building = False
+
+
+def current():
+    with _lock:
+        return _current
+
+
+def observe(markets, full=False):
+    """快照库全局范围同步后调用: 全量同步直接替换索引，增量同步并入已有索引 (尚未建立索引时不做任何事)"""
+    global _current
+    with _lock:
+        index = _current
+    if index is None:
+        return
+    if full:
+        index = build(markets)
+        with _lock:
+            _current = index
+    else:
+        index.apply(markets)
+
+
+def load(store, scope="global"):
+    """从本地快照库载入全部活跃市场 (含描述) 并建立索引，返回新索引"""
+    global _current
+    index = build(store.query(scope, with_description=True))
+    index.synced_at = store.sync_state(scope)[2] or time.time()
+    with _lock:
+        _current = index
+    return index
+
+
+def get_index(refresh, ttl, block=True):
+    """获取共享索引，超过 ttl 秒未同步时调用 refresh() 更新快照 (增量部分经 observe 并入)
+
+    - block=True (CLI): 没有索引时同步建立，过期时同步刷新
+    - block=False (Web 服务): 没有索引或已过期时在后台刷新，立即返回现有索引 (可能为 None)
+    refresh() 负责同步快照并在需要时调用 load()。
+    """
+    global _building
+    index = current()
+    stale = index is None or time.time() - index.synced_at >= ttl
+    if not stale:
+        return index
+    if block:
+        refresh()
+        return current()
+
+    with _lock:
+        start = not _building
+        _building = True
+    if start:
+        def run():
+            global _building
+            try:
+                refresh()
+            except Exception as e:
+                print(f"⚠️ 后台刷新检索索引失败: {e}")
+            finally:
+                with _lock:
+                    _building = False
+        threading.Thread(target=run, name="search-index", daemon=True).start()
+    return index
+
+
+def building():
+    with _lock:
+        return _building
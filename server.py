@@ -1,12 +1,51 @@
-from flask import Flask, render_template, request, jsonify, send_from_directory
+from flask import Flask, render_template, request, jsonify, send_from_directory, Response, stream_with_context
+import io
 import os
-import subprocess
+import json
+import time
+import uuid
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv, set_key, dotenv_values
+from rich.console import Console
+
+import scout
+import tag_index
+import metrics
+import profiling
+import webhooks
+import search_index
+from http_client import client as http
 
 app = Flask(__name__, static_folder='static')
 
 ENV_FILE = '.env'
 
+# [核心优化] 常驻侦察工作池: 进程内直接调用侦察引擎，复用已加载的模块、HTTP 连接池与标签索引
+SCOUT_WORKERS = int(os.getenv('SCOUT_SERVER_WORKERS', 4) or 4)
+scout_pool = ThreadPoolExecutor(max_workers=SCOUT_WORKERS, thread_name_prefix='scout')
+
+_dispatcher_started = False
+_dispatcher_lock = threading.Lock()
+
+@app.before_request
+def start_webhook_dispatcher():
+    """推送在后台发送，失败的消息留在发件箱中由后台巡检按退避间隔重试。
+
+    在收到第一个请求时启动 (每个进程一次): 只有实际提供服务的进程会启动，与部署方式无关
+    (app.run、debug 重载器的父进程不会收到请求、gunicorn / waitress 的每个工作进程)。
+    """
+    global _dispatcher_started
+    if _dispatcher_started:
+        return
+    with _dispatcher_lock:
+        if _dispatcher_started:
+            return
+        _dispatcher_started = True
+    webhooks.dispatcher.drain()
+    webhooks.dispatcher.start_background()
+
 @app.route('/')
 def index():
     """主页面"""
@@ -50,146 +89,436 @@ def save_config():
     except Exception as e:
         return jsonify({'success': False, 'message': f'保存失败: {str(e)}'}), 500
 
+# 异步侦察任务: 按任务 ID 隔离进度与结果，完成后保留 SCOUT_JOB_TTL 秒供前端取回
+JOB_TTL = int(os.getenv('SCOUT_JOB_TTL', 600) or 600)
+JOBS = {}
+JOBS_LOCK = threading.Lock()
+
+# [核心优化] 单飞结果缓存: 相同的归一化配置在 TTL 内直接复用结果，进行中的相同请求合并为一次上游侦察
+RESULT_CACHE_TTL = float(os.getenv('SCOUT_CACHE_TTL', 60) or 0)
+RESULT_CACHE_SIZE = int(os.getenv('SCOUT_CACHE_SIZE', 64) or 0)
+RESULT_CACHE = OrderedDict()  # cache_key -> 已完成的 ScanJob (LRU)
+INFLIGHT = {}                 # cache_key -> 进行中的 ScanJob
+CACHE_LOCK = threading.Lock()
+
+class ScanJob:
+    """一次侦察任务的状态容器 (工作线程写入，请求线程读取/等待)"""
+
+    def __init__(self, params, cache_key):
+        self.id = uuid.uuid4().hex[:12]
+        self.params = params
+        self.cache_key = cache_key
+        self.status = 'queued'  # queued -> running -> done / error
+        self.progress = {'pages': 0, 'markets': 0, 'matched': 0, 'elapsed': 0}
+        self.payload = None     # 完成后的响应体 (与同步 /api/scout 相同)
+        self.error = None
+        self.created_at = time.time()
+        self.finished_at = None
+        self.version = 0
+        self.result = None      # 完成后的 ScoutResult (缓存命中 / 合并的请求据此推送各自的 Webhook)
+        self._webhook_cfgs = [] # 合并到本任务、等待完成后推送的请求配置
+        self._cond = threading.Condition()
+
+    @property
+    def finished(self):
+        return self.status in ('done', 'error')
+
+    def update(self, **changes):
+        with self._cond:
+            for key, value in changes.items():
+                setattr(self, key, value)
+            self.version += 1
+            self._cond.notify_all()
+
+    def wait_change(self, version, timeout):
+        """阻塞到版本号变化或超时，返回最新版本号"""
+        with self._cond:
+            self._cond.wait_for(lambda: self.version != version, timeout)
+            return self.version
+
+    def wait_finished(self, timeout):
+        with self._cond:
+            return self._cond.wait_for(lambda: self.finished, timeout)
+
+    def push_webhook_for(self, cfg):
+        """缓存命中 / 合并的请求: 任务完成后把报告推送到该请求自己的 Webhook (只写入发件箱，不等待网络)"""
+        with self._cond:
+            if not self.finished:
+                self._webhook_cfgs.append(cfg)
+                return
+        self._push_webhooks([cfg])
+
+    def flush_webhooks(self):
+        """任务结束后推送合并期间登记的请求 (本任务自身的推送在 _scout_job 中完成)"""
+        with self._cond:
+            cfgs, self._webhook_cfgs = self._webhook_cfgs, []
+        self._push_webhooks(cfgs)
+
+    def _push_webhooks(self, cfgs):
+        if self.result is None:
+            return
+        for cfg in cfgs:
+            scout.push_webhook(self.result, cfg, Console(file=io.StringIO()))
+
+    def snapshot(self):
+        with self._cond:
+            data = {
+                'job_id': self.id,
+                'status': self.status,
+                'progress': dict(self.progress),
+                'version': self.version,
+                'created_at': self.created_at,
+                'finished_at': self.finished_at,
+                'data_age': round(time.time() - self.finished_at, 1) if self.finished_at else None,
+            }
+            if self.status == 'done':
+                data['result'] = self.payload
+            elif self.status == 'error':
+                data['message'] = self.error
+            return data
+
+def _scout_job(params, progress=None):
+    """在工作线程中执行一次侦察，终端输出写入独立的缓冲区 (各请求互不干扰)"""
+    buf = io.StringIO()
+    job_console = Console(file=buf, width=120, force_terminal=False)
+    env = {**os.environ, **params}
+    cfg = scout.ScoutConfig.from_env(env, job_console)
+    result = scout.run_scout(cfg, job_console, progress=progress)
+    scout.render_table(result, job_console)
+    scout.print_run_stats(result, job_console)
+    scout.push_webhook(result, cfg, job_console)
+    return result, buf.getvalue()
+
+def _build_payload(result, output):
+    markets_data = scout.format_markets_list(result)
+    # [Debug Fix] 如果显示 0 条记录，强制追加终端调试日志
+    if not result.rows:
+        markets_data += f"\n\n=== 🕵️‍♂️ 调试日志 (DEBUG LOGS) ===\n{output}"
+    return {
+        'success': True,
+        'output': output,
+        'markets': markets_data,
+        'results': result.rows,
+        'metrics': result.metrics,
+        'profile': result.profile,
+    }
+
+def _run_job(job):
+    job.update(status='running')
+    cacheable = False
+    try:
+        result, output = _scout_job(job.params, progress=lambda info: job.update(progress=info))
+        # 超时返回的部分结果与出错的结果不进入缓存
+        cacheable = result.error is None and not result.timed_out
+        outcome = 'error' if result.error else 'timeout' if result.timed_out else 'ok'
+        metrics.registry.record_run(result.metrics, outcome)
+        job.update(status='done', result=result, payload=_build_payload(result, output), finished_at=time.time())
+    except Exception as e:
+        metrics.registry.record_run({}, 'failed')
+        job.update(status='error', error=f'执行失败: {str(e)}', finished_at=time.time())
+    finally:
+        _release_inflight(job, cacheable)
+        job.flush_webhooks()
+
+def _job_config(params):
+    """按与侦察任务相同的方式解析配置 (cache_key() 即归一化缓存键)"""
+    return scout.ScoutConfig.from_env({**os.environ, **params}, Console(file=io.StringIO()))
+
+def _lookup_cached(key):
+    """返回 (job, 'hit' | 'coalesced')，都未命中时返回 (None, 'miss')；需持有 CACHE_LOCK"""
+    job = RESULT_CACHE.get(key)
+    if job is not None:
+        if time.time() - job.finished_at <= RESULT_CACHE_TTL:
+            RESULT_CACHE.move_to_end(key)
+            return job, 'hit'
+        del RESULT_CACHE[key]
+    job = INFLIGHT.get(key)
+    if job is not None:
+        return job, 'coalesced'
+    return None, 'miss'
+
+def _release_inflight(job, cacheable):
+    with CACHE_LOCK:
+        if INFLIGHT.get(job.cache_key) is job:
+            del INFLIGHT[job.cache_key]
+        if cacheable and RESULT_CACHE_TTL > 0 and RESULT_CACHE_SIZE > 0:
+            RESULT_CACHE[job.cache_key] = job
+            RESULT_CACHE.move_to_end(job.cache_key)
+            while len(RESULT_CACHE) > RESULT_CACHE_SIZE:
+                RESULT_CACHE.popitem(last=False)
+
+def _prune_jobs():
+    now = time.time()
+    with JOBS_LOCK:
+        for job_id in [j.id for j in JOBS.values() if j.finished and now - j.finished_at > JOB_TTL]:
+            del JOBS[job_id]
+
+def submit_job(params, fresh=False):
+    """登记并提交侦察任务，立即返回 (不占用请求线程)
+
+    返回 (job, cache_status)，cache_status 为 hit (缓存命中) / coalesced (合并到进行中的相同任务) / miss。
+    fresh=True 时跳过缓存强制重新侦察；请求开启性能剖析 (SCOUT_PROFILE) 时同样强制重新侦察。
+    """
+    # 从请求中获取临时配置 (Stateless)
+    # 如果前端传了 config，只作用于本次侦察，不修改服务进程的环境变量
+    params = {k: str(v) for k, v in (params or {}).items()}
+    if params:
+        print("🔧 [Server] 接收到临时作战指令，正在覆盖环境变量...")
+        for key, value in params.items():
+            # 打印一下看看收到了什么 (Debug)
+            if key in ['SCOUT_TAG', 'SCOUT_SEARCH', 'SCOUT_MIN_VOLUME']:
+                print(f"  -> {key}: {value}")
+
+    if profiling.parse_mode(params.get('SCOUT_PROFILE')):
+        fresh = True
+    _prune_jobs()
+    cfg = _job_config(params)
+    key = cfg.cache_key()
+    with CACHE_LOCK:
+        job, cache_status = (None, 'miss') if fresh else _lookup_cached(key)
+        if job is None:
+            job = ScanJob(params, key)
+            INFLIGHT[key] = job
+    # 缓存命中的任务可能已被清理出任务表，重新登记以便按 ID 查询
+    with JOBS_LOCK:
+        JOBS[job.id] = job
+    metrics.registry.inc(f'result_cache_requests:result={cache_status}')
+    if cache_status == 'miss':
+        scout_pool.submit(_run_job, job)
+    elif cfg.webhook_url:
+        # 推送地址不参与缓存键: 复用的结果照常推送到本次请求的 Webhook
+        job.push_webhook_for(cfg)
+    return job, cache_status
+
+def _get_job(job_id):
+    with JOBS_LOCK:
+        return JOBS.get(job_id)
+
+def _job_timeout(params):
+    # 侦察引擎自身的时限已覆盖拉取+过滤，这里只在其之上留出渲染与排队的余量
+    try:
+        runtime_limit = int(params.get('SCOUT_RUNTIME_LIMIT') or os.getenv('SCOUT_RUNTIME_LIMIT') or 30)
+    except ValueError:
+        runtime_limit = 30
+    return max(60, runtime_limit + 30)
+
+def _wants_fresh():
+    # ?fresh=1 跳过结果缓存
+    return request.args.get('fresh', '').lower() in ('1', 'true', 'yes')
+
+def _request_params():
+    """请求体中的临时配置；?profile=1 (采样) 或 ?profile=cprofile 时对本次侦察做性能剖析"""
+    params = dict(request.json or {})
+    if request.args.get('profile'):
+        params['SCOUT_PROFILE'] = request.args['profile']
+    return params
+
+def _cache_info(job, cache_status):
+    """响应中的缓存信息: 是否命中 / 合并，以及数据年龄 (秒)"""
+    return {
+        'cache': cache_status,
+        'cache_hit': cache_status != 'miss',
+        'data_age': round(time.time() - job.finished_at, 1) if job.finished_at else None,
+    }
+
 @app.route('/api/scout', methods=['POST'])
 def run_scout():
-    """运行侦察脚本"""
+    """运行侦察并等待结果 (兼容旧的同步调用方式)"""
     try:
-        # [核心修复] 运行前先删除旧的结果文件
-        if os.path.exists('markets_list.txt'):
-            try:
-                os.remove('markets_list.txt')
-            except Exception as e:
-                print(f"⚠️ 无法删除旧文件: {e}")
-
-        # 1. 准备基础环境
-        env = os.environ.copy()
-        env['PYTHONIOENCODING'] = 'utf-8'
-
-        # 2. 从请求中获取临时配置 (Stateless)
-        # 如果前端传了 config，直接用来覆盖环境变量，不再依赖 global state
-        params = request.json or {}
-        if params:
-            print("🔧 [Server] 接收到临时作战指令，正在覆盖环境变量...")
-            for key, value in params.items():
-                env[key] = str(value)
-                # 打印一下看看收到了什么 (Debug)
-                if key in ['SCOUT_TAG', 'SCOUT_SEARCH', 'SCOUT_MIN_VOLUME']:
-                    print(f"  -> {key}: {value}")
-
-        # 运行 scout.py 并捕获输出
-        result = subprocess.run(
-            ['python', 'scout.py'],
-            capture_output=True,
-            text=True,
-            encoding='utf-8',
-            timeout=60,
-            env=env
-        )
-        
-        # 读取生成的 markets_list.txt
-        markets_data = ""
-        if os.path.exists('markets_list.txt'):
-            with open('markets_list.txt', 'r', encoding='utf-8') as f:
-                markets_data = f.read()
-                
-            # [Debug Fix] 如果文件中显示 0 条记录，强制追加 stdout 中的调试日志
-            if "共计收录: 0 条记录" in markets_data:
-                 safe_output = (result.stdout or "") + "\n" + (result.stderr or "")
-                 markets_data += f"\n\n=== 🕵️‍♂️ 调试日志 (DEBUG LOGS) ===\n{safe_output}"
-        else:
-            # 如果文件不存在，说明脚本运行失败或没拿到数据
-            if result.returncode != 0:
-                # 安全获取 output
-                err_msg = result.stderr or "未知错误"
-                markets_data = f"❌ 脚本执行出错:\n{err_msg}"
-            else:
-                 # [Debug Fix] 如果没有结果，直接返回终端输出(stdout)，方便看到调试信息
-                 markets_data = f"⚠️ 未找到符合条件的市场 (Volume > {os.getenv('SCOUT_MIN_VOLUME', '?')})\n\n[终端调试日志]\n{safe_output}"
-        
-        # 安全拼接 output
-        safe_output = (result.stdout or "") + "\n" + (result.stderr or "")
-        
+        job, cache_status = submit_job(_request_params(), fresh=_wants_fresh())
+        if not job.wait_finished(timeout=_job_timeout(job.params)):
+            return jsonify({'success': False, 'message': '侦察超时', 'job_id': job.id}), 500
+        if job.status == 'error':
+            return jsonify({'success': False, 'message': job.error}), 500
+        return jsonify({**job.payload, **_cache_info(job, cache_status)})
+    except Exception as e:
+        return jsonify({'success': False, 'message': f'执行失败: {str(e)}'}), 500
+
+@app.route('/api/scout/jobs', methods=['POST'])
+def create_scout_job():
+    """提交异步侦察任务，返回任务 ID"""
+    try:
+        job, cache_status = submit_job(_request_params(), fresh=_wants_fresh())
         return jsonify({
             'success': True,
-            'output': safe_output,
-            'markets': markets_data
-        })
-    except subprocess.TimeoutExpired:
-        return jsonify({'success': False, 'message': '侦察超时'}), 500
+            'job_id': job.id,
+            **_cache_info(job, cache_status),
+            'status_url': f'/api/scout/jobs/{job.id}',
+            'events_url': f'/api/scout/jobs/{job.id}/events',
+        }), 202
     except Exception as e:
-        return jsonify({'success': False, 'message': f'执行失败: {str(e)}'}), 500
+        return jsonify({'success': False, 'message': f'提交失败: {str(e)}'}), 500
+
+@app.route('/api/scout/jobs/<job_id>', methods=['GET'])
+def get_scout_job(job_id):
+    """查询任务状态 (长轮询: ?since=<version>&wait=<秒> 时阻塞到状态变化)"""
+    job = _get_job(job_id)
+    if job is None:
+        return jsonify({'success': False, 'message': '任务不存在或已过期'}), 404
+    since = request.args.get('since', type=int)
+    if since is not None and not job.finished:
+        wait = min(max(request.args.get('wait', 25, type=float), 0), 60)
+        job.wait_change(since, wait)
+    return jsonify(job.snapshot())
+
+@app.route('/api/scout/jobs/<job_id>/events', methods=['GET'])
+def stream_scout_job(job_id):
+    """以 Server-Sent Events 推送任务进度: progress (页数/市场数/耗时)，结束时 done 或 error"""
+    job = _get_job(job_id)
+    if job is None:
+        return jsonify({'success': False, 'message': '任务不存在或已过期'}), 404
+
+    def events():
+        version = -1
+        while True:
+            snap = job.snapshot()
+            if snap['status'] == 'done':
+                yield f"event: done\ndata: {json.dumps(snap, ensure_ascii=False)}\n\n"
+                return
+            if snap['status'] == 'error':
+                yield f"event: error\ndata: {json.dumps(snap, ensure_ascii=False)}\n\n"
+                return
+            if snap['version'] != version:
+                version = snap['version']
+                yield f"event: progress\ndata: {json.dumps(snap, ensure_ascii=False)}\n\n"
+            if job.wait_change(version, 15) == version:
+                yield ": keep-alive\n\n"
+
+    return Response(stream_with_context(events()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
 
 
-# 简单的内存缓存
-TAGS_CACHE = {
-    'data': [],
-    'timestamp': 0
+# 定义优先展示的热门标签
+PRIORITY_TAGS = ['Politics', 'Crypto', 'Sports', 'Business', 'Science', 'Pop Culture', 'News', 'Middle East', 'USA']
+
+# 按索引版本缓存排好序的展示列表 (索引本身由 tag_index 负责落盘和过期刷新)
+SORTED_TAGS_CACHE = {
+    'fetched_at': None,
+    'data': []
 }
-CACHE_DURATION = 3600  # 缓存 1 小时
 
-@app.route('/api/tags', methods=['GET'])
-def get_tags():
-    """获取所有可用的品类标签 (带缓存)"""
-    global TAGS_CACHE
-    import time
-    
-    current_time = time.time()
-    
-    # 检查缓存是否有效
-    if TAGS_CACHE['data'] and (current_time - TAGS_CACHE['timestamp'] < CACHE_DURATION):
-        return jsonify(TAGS_CACHE['data'])
+@app.route('/api/metrics', methods=['GET'])
+def get_metrics():
+    """Prometheus 文本格式的运行指标: 各阶段耗时直方图、流水线计数器、HTTP 统计、限速器与任务状态"""
+    stats = http.stats()
+    gauges = {
+        'jobs_inflight': len(INFLIGHT),
+        'result_cache_entries': len(RESULT_CACHE),
+        'http_reused_connections': stats['reused_connections'],
+    }
+    if http.governor and http.governor.enabled:
+        rate = http.governor.status()
+        gauges.update({'rate_limit_rate': rate['rate'], 'rate_limit_max_rate': rate['max_rate'],
+                       'rate_limit_paused_seconds': rate['paused_for']})
+    counters = {f'http_{k}': v for k, v in stats.items() if k != 'reused_connections'}
+    hooks = webhooks.dispatcher.status()
+    gauges['webhook_pending'] = hooks['pending']
+    counters.update({f'webhook_messages:outcome={k}': hooks[k] for k in ('queued', 'sent', 'failed', 'dropped')})
+    body = metrics.registry.render(gauges=gauges, counters=counters)
+    return Response(body, mimetype='text/plain; version=0.0.4')
+
+@app.route('/api/profiles', methods=['GET'])
+def get_profiles():
+    """已保存的性能剖析 (新的在前)，每项附带产物文件的下载地址"""
+    items = profiling.list_profiles()
+    for item in items:
+        item['urls'] = {os.path.splitext(f)[1].lstrip('.'): f'/api/profiles/{f}' for f in item.get('files', [])}
+    return jsonify(items)
+
+@app.route('/api/profiles/<path:filename>', methods=['GET'])
+def get_profile_file(filename):
+    """剖析产物: .collapsed (flamegraph.pl / speedscope)、.txt (cProfile 摘要)、.prof (pstats)、.json (元数据)"""
+    mimetype = 'text/plain' if filename.endswith(('.collapsed', '.txt')) else None
+    return send_from_directory(os.path.abspath(profiling.PROFILE_DIR), filename, mimetype=mimetype,
+                               as_attachment=filename.endswith('.prof'))
 
+def _refresh_search_index():
+    # 后台线程中同步快照 / 载入索引，日志不输出到服务端终端
+    scout.refresh_search_index(console=Console(file=io.StringIO()))
+
+@app.route('/api/search', methods=['GET'])
+def search_markets():
+    """全文检索全局快照中的活跃市场 (标题 + 描述): ?q=查询&limit=20&offset=0&sort=relevance|volume|liquidity
+
+    索引常驻内存，超过 SCOUT_SEARCH_INDEX_TTL 未同步时在后台增量刷新，查询不等待网络。
+    """
+    query = (request.args.get('q') or '').strip()
+    if not query:
+        return jsonify({'success': False, 'message': '查询不能为空'}), 400
     try:
-        import requests
-        # 增加超时时间，避免网络波动
-        response = requests.get('https://gamma-api.polymarket.com/tags?limit=5000', timeout=15)
-        response.raise_for_status() # 检查 HTTP 错误
-        tags = response.json()
-        
-        # 过滤和排序标签
-        filtered_tags = [
-            {'id': t.get('id'), 'label': t.get('label')}
-            for t in tags
-            if t.get('label') and len(t.get('label', '')) < 30
-        ]
-        
-        # 定义优先展示的热门标签
-        PRIORITY_TAGS = ['Politics', 'Crypto', 'Sports', 'Business', 'Science', 'Pop Culture', 'News', 'Middle East', 'USA']
-        
-        # 1. 分离出热门标签
-        priority_list = []
-        others_list = []
-        
-        for t in filtered_tags:
-            if t['label'] in PRIORITY_TAGS:
-                priority_list.append(t)
-            else:
-                others_list.append(t)
-                
-        # 2. 热门标签按预定义顺序排序
-        priority_list.sort(key=lambda x: PRIORITY_TAGS.index(x['label']) if x['label'] in PRIORITY_TAGS else 999)
-        
-        # 3. 其他标签按字母排序
-        others_list.sort(key=lambda x: str(x['label']).lower())
-        
-        # 合并
-        final_tags = priority_list + others_list
-        
-        # 更新缓存
-        TAGS_CACHE['data'] = final_tags
-        TAGS_CACHE['timestamp'] = current_time
-        
-        return jsonify(final_tags)
-    except Exception as e:
-        print(f"❌ 获取标签失败: {e}")
-        # 如果有旧缓存，即使过期也返回，比报错好
-        if TAGS_CACHE['data']:
-            print("⚠️ 使用过期缓存")
-            return jsonify(TAGS_CACHE['data'])
-            
+        limit = max(1, min(200, int(request.args.get('limit', 20))))
+        offset = max(0, int(request.args.get('offset', 0)))
+    except ValueError:
+        return jsonify({'success': False, 'message': 'limit / offset 必须是整数'}), 400
+
+    index = search_index.get_index(_refresh_search_index, scout.SEARCH_INDEX_TTL, block=False)
+    if index is None:
+        return jsonify({'success': False, 'building': True, 'message': '检索索引构建中，请稍后重试'}), 503
+    try:
+        res = index.search(query, limit=limit, offset=offset, sort=request.args.get('sort', 'relevance'))
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    return jsonify({
+        'success': True,
+        **res,
+        'index': {**index.stats(), 'age_s': round(time.time() - index.synced_at, 1),
+                  'refreshing': search_index.building()},
+    })
+
+@app.route('/api/webhooks', methods=['GET'])
+def get_webhooks():
+    """推送发件箱状态: 各目标积压条数、最早积压时长、最近错误，以及本进程的投递统计"""
+    return jsonify(webhooks.dispatcher.status())
+
+@app.route('/api/rate_limit', methods=['GET'])
+def get_rate_limit():
+    """Gamma API 限速器状态: 当前速率 / 上限 / 可用令牌 / 剩余暂停时间 (与 CLI 共享额度)"""
+    stats = http.stats()
+    status = http.governor.status() if http.governor else {'enabled': False}
+    status.update({'throttled': stats['throttled'], 'rate_wait_s': round(stats['rate_wait_s'], 2)})
+    return jsonify(status)
+
+@app.route('/api/tags', methods=['GET'])
+def get_tags():
+    """获取所有可用的品类标签 (共享本地标签索引)"""
+    index = tag_index.get_index()
+    if index is None:
         # 最后的手段：返回空列表，避免前端崩坏
         return jsonify([])
 
+    if SORTED_TAGS_CACHE['fetched_at'] == index.fetched_at:
+        return jsonify(SORTED_TAGS_CACHE['data'])
+
+    # 过滤和排序标签
+    filtered_tags = [
+        {'id': t.get('id'), 'label': t.get('label')}
+        for t in index.tags
+        if t.get('label') and len(t.get('label', '')) < 30
+    ]
+
+    # 1. 分离出热门标签
+    priority_list = []
+    others_list = []
+
+    for t in filtered_tags:
+        if t['label'] in PRIORITY_TAGS:
+            priority_list.append(t)
+        else:
+            others_list.append(t)
+
+    # 2. 热门标签按预定义顺序排序
+    priority_list.sort(key=lambda x: PRIORITY_TAGS.index(x['label']) if x['label'] in PRIORITY_TAGS else 999)
+
+    # 3. 其他标签按字母排序
+    others_list.sort(key=lambda x: str(x['label']).lower())
+
+    # 合并
+    final_tags = priority_list + others_list
+
+    SORTED_TAGS_CACHE['fetched_at'] = index.fetched_at
+    SORTED_TAGS_CACHE['data'] = final_tags
+    return jsonify(final_tags)
+
 @app.route('/api/presets', methods=['GET'])
 def get_presets():
     """获取所有预设方案"""
@@ -250,16 +579,21 @@ def test_webhook():
         return jsonify({"success": False, "message": "URL不能为空"})
     
     try:
-        # 发送测试消息
-        payload = {
-            "content": "🔔 **Mikon AI Scout 通信测试**\n\n收到这条消息意味着 Webhook 配置成功！\nReady to dispatch intel.",
-            "username": "Mikon Scout Bot"
-        }
-        resp = requests.post(url, json=payload, timeout=5)
-        if resp.status_code in [200, 201, 204]:
-            return jsonify({"success": True})
-        else:
-            return jsonify({"success": False, "message": f"HTTP {resp.status_code}: {resp.text}"})
+        # 逐个目标同步发送测试消息 (按各自平台格式)，任一失败即报告
+        message = webhooks.Message(
+            title="🔔 **Mikon AI Scout 通信测试**",
+            header=["", "收到这条消息意味着 Webhook 配置成功！", "Ready to dispatch intel."],
+            data={'type': 'test'},
+        )
+        targets = webhooks.parse_targets(url)
+        errors = []
+        for target in targets:
+            error = webhooks.dispatcher.send_now(message, target)
+            if error:
+                errors.append(f"{target.label} {error}")
+        if errors:
+            return jsonify({"success": False, "message": "; ".join(errors)})
+        return jsonify({"success": True, "targets": len(targets)})
     except Exception as e:
         return jsonify({"success": False, "message": str(e)})
 
@@ -457,20 +457,35 @@ elements.scoutBtn.addEventListener("click", async () => {
             body: JSON.stringify(config),
         });
 
-        // 2. 执行侦察 (直接把当前配置传给后端，避免后端环境更新延迟)
+        // 2. 提交侦察任务 (直接把当前配置传给后端，避免后端环境更新延迟)
         loadingText.textContent = "侦察兵出击中...";
-        const response = await fetch(`${API_BASE}/api/scout`, {
+        const response = await fetch(`${API_BASE}/api/scout/jobs`, {
             method: "POST",
             headers: { "Content-Type": "application/json" },
             body: JSON.stringify(config), // payload-driven execution
         });
 
-        const result = await response.json();
+        const job = await response.json();
+        if (!job.success) {
+            showNotification("❌ " + job.message, "error");
+            return;
+        }
+
+        // 3. 订阅任务进度流，完成时取回本任务自己的结果
+        const result = await waitForScoutJob(job, (progress) => {
+            loadingText.textContent =
+                `侦察中... 已拉取 ${progress.pages} 页 | 已过滤 ${progress.markets} 个市场 | ` +
+                `命中 ${progress.matched} | ${Number(progress.elapsed).toFixed(1)}s`;
+        });
 
         if (result.success) {
             // 显示结果
             displayResults(result.markets);
-            showNotification("🎯 侦察完成", "success");
+            if (job.cache === "hit") {
+                showNotification(`🎯 侦察完成 (缓存结果，${job.data_age}s 前)`, "success");
+            } else {
+                showNotification("🎯 侦察完成", "success");
+            }
         } else {
             showNotification("❌ " + result.message, "error");
         }
@@ -484,6 +499,49 @@ elements.scoutBtn.addEventListener("click", async () => {
     }
 });
 
+// 通过 SSE 等待侦察任务完成，返回与 /api/scout 相同结构的结果
+function waitForScoutJob(job, onProgress) {
+    return new Promise((resolve) => {
+        const source = new EventSource(`${API_BASE}${job.events_url}`);
+        source.addEventListener("progress", (e) => {
+            onProgress(JSON.parse(e.data).progress);
+        });
+        source.addEventListener("done", (e) => {
+            source.close();
+            resolve(JSON.parse(e.data).result);
+        });
+        source.addEventListener("error", (e) => {
+            source.close();
+            if (e.data) {
+                resolve({ success: false, message: JSON.parse(e.data).message });
+            } else {
+                // 连接中断: 退回长轮询
+                pollScoutJob(job, onProgress).then(resolve);
+            }
+        });
+    });
+}
+
+// 长轮询兜底 (SSE 不可用或被代理中断时)
+async function pollScoutJob(job, onProgress) {
+    let version = -1;
+    while (true) {
+        const response = await fetch(`${API_BASE}${job.status_url}?since=${version}&wait=25`);
+        const snap = await response.json();
+        if (!response.ok) {
+            return { success: false, message: snap.message };
+        }
+        if (snap.status === "done") {
+            return snap.result;
+        }
+        if (snap.status === "error") {
+            return { success: false, message: snap.message };
+        }
+        version = snap.version;
+        onProgress(snap.progress);
+    }
+}
+
 // 重置默认配置
 elements.resetBtn.addEventListener("click", () => {
   if (confirm("确定要重置为默认配置吗？")) {
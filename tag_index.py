@@ -0,0 +1,158 @@
+"""品类标签本地索引 (scout.py 与 server.py 共用)
+
+标签列表落盘到 .cache/tags.json 并带 TTL:
+- 索引未过期: 直接使用，零网络请求
+- 索引已过期: 立即返回旧索引，同时在后台线程刷新
+- 索引不存在: 同步拉取一次
+"""
+import os
+import json
+import time
+import threading
+from collections import defaultdict
+
+from http_client import client as http, GAMMA_API
+
+TAGS_URL = f"{GAMMA_API}/tags?limit=5000"
+CACHE_DIR = ".cache"
+INDEX_FILE = os.path.join(CACHE_DIR, "tags.json")
+TAG_INDEX_TTL = int(os.getenv("SCOUT_TAG_INDEX_TTL", 3600) or 3600)  # 默认 1 小时
+
+
+class TagIndex:
+    """标签索引: 小写标签 O(1) 精确查找 + 三元组倒排的子串模糊查找。
+
+    匹配优先级与旧的两轮线性扫描一致: 先精确，再按 API 原始顺序取第一个子串命中。
+    """
+
+    def __init__(self, tags, fetched_at=0.0):
+        self.tags = [t for t in tags if isinstance(t, dict)]
+        self.fetched_at = fetched_at
+        self._labels = [str(t.get('label') or '').lower() for t in self.tags]
+
+        self._exact = {}
+        self._grams = defaultdict(list)  # trigram -> 按原始顺序递增的下标
+        for i, label in enumerate(self._labels):
+            self._exact.setdefault(label, i)
+            for g in {label[j:j + 3] for j in range(len(label) - 2)}:
+                self._grams[g].append(i)
+
+    def age(self):
+        return time.time() - self.fetched_at
+
+    def _find_substring(self, q):
+        """返回第一个包含 q 的标签下标"""
+        if len(q) < 3:
+            # 过短的查询无三元组可用，直接扫描
+            candidates = range(len(self._labels))
+        else:
+            postings = [self._grams.get(q[j:j + 3]) for j in range(len(q) - 2)]
+            if not all(postings):
+                return None
+            candidates = min(postings, key=len)
+        for i in candidates:
+            if q in self._labels[i]:
+                return i
+        return None
+
+    def lookup(self, name):
+        """按名称匹配标签，返回 (id, label)，未找到返回 (None, None)"""
+        q = str(name or '').strip().lower()
+        if not q:
+            return None, None
+        i = self._exact.get(q)
+        if i is None:
+            i = self._find_substring(q)
+        if i is None:
+            return None, None
+        return self.tags[i].get('id'), self.tags[i].get('label')
+
+    def to_json(self):
+        return {'fetched_at': self.fetched_at, 'tags': self.tags}
+
+
+def fetch_tags(timeout=15):
+    """从 Gamma API 拉取完整标签列表"""
+    resp = http.get(TAGS_URL, timeout=timeout)
+    resp.raise_for_status()  # 检查 HTTP 错误
+    tags = resp.json()
+    if not isinstance(tags, list):
+        raise ValueError("标签接口返回格式异常")
+    return tags
+
+
+def _load_from_disk():
+    try:
+        with open(INDEX_FILE, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        return TagIndex(data.get('tags') or [], float(data.get('fetched_at') or 0))
+    except (OSError, ValueError):
+        return None
+
+
+def _save_to_disk(index):
+    # 先写临时文件再原子替换，避免 CLI 与服务端并发刷新时读到半个文件
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    tmp_path = f"{INDEX_FILE}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(index.to_json(), f, ensure_ascii=False)
+    os.replace(tmp_path, INDEX_FILE)
+
+
+_lock = threading.Lock()
+_current = None
+_refreshing = False
+
+
+def refresh():
+    """同步刷新索引并落盘，返回新索引"""
+    global _current
+    index = TagIndex(fetch_tags(), time.time())
+    try:
+        _save_to_disk(index)
+    except OSError as e:
+        print(f"⚠️ 标签索引写入失败: {e}")
+    with _lock:
+        _current = index
+    return index
+
+
+def _refresh_in_background():
+    global _refreshing
+    try:
+        refresh()
+    except Exception as e:
+        print(f"⚠️ 后台刷新标签索引失败: {e}")
+    finally:
+        with _lock:
+            _refreshing = False
+
+
+def get_index(ttl=None):
+    """获取标签索引 (内存 -> 磁盘 -> 网络)，过期时后台刷新。
+
+    完全没有可用索引且网络失败时返回 None。
+    """
+    global _current, _refreshing
+    ttl = TAG_INDEX_TTL if ttl is None else ttl
+
+    with _lock:
+        index = _current
+    if index is None:
+        index = _load_from_disk()
+        if index is None:
+            try:
+                return refresh()
+            except Exception as e:
+                print(f"⚠️ 获取标签失败: {e}")
+                return None
+        with _lock:
+            _current = index
+
+    if index.age() >= ttl:
+        with _lock:
+            start = not _refreshing
+            _refreshing = True
+        if start:
+            threading.Thread(target=_refresh_in_background, daemon=True).start()
+    return index
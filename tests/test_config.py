@@ -0,0 +1,20 @@
+"""ScoutConfig 归一化缓存键"""
+from scout import ScoutConfig
+
+
+def test_cache_key_normalizes_keywords_and_tags():
+    a = ScoutConfig(search="Trump, btc ,trump", tag="Crypto,Politics")
+    b = ScoutConfig(search="btc,trump", tag="crypto, politics")
+    assert a.cache_key() == b.cache_key()
+
+
+def test_cache_key_ignores_execution_only_fields():
+    base = ScoutConfig()
+    for overrides in ({"fetch_concurrency": 3}, {"filter_mode": "row"}, {"history": True},
+                      {"preset": "daily"}, {"profile": "sample"}):
+        assert ScoutConfig(**overrides).cache_key() == base.cache_key(), overrides
+
+
+def test_cache_key_includes_pushdown():
+    # 下推开关影响无匹配时兜底展示的全局快照
+    assert ScoutConfig(pushdown=False).cache_key() != ScoutConfig(pushdown=True).cache_key()
@@ -0,0 +1,104 @@
+"""批量过滤 (filter_page_batch) 与逐行参考实现 (filter_market) 的一致性"""
+import math
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from scout import ScoutConfig, filter_market, filter_page_batch, _float_column
+from market_fields import to_float
+
+NOW = datetime.now(timezone.utc)
+
+
+def _end(days):
+    return (NOW + timedelta(days=days, hours=1)).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def _page():
+    """一页混有缺失值、空串、非数值与 NaN 字段的市场"""
+    base = [
+        {"slug": "ok", "question": "Will BTC hit 100k?", "outcomePrices": '["0.55", "0.45"]',
+         "volume": "12000", "liquidity": "3000", "endDate": _end(5)},
+        {"slug": "null-liq", "question": "Null liquidity", "outcomePrices": '["0.4", "0.6"]',
+         "volume": 9000, "liquidity": None, "endDate": _end(2)},
+        {"slug": "bad-vol", "question": "Bad volume", "outcomePrices": '["0.3", "0.7"]',
+         "volume": "abc", "liquidity": "500", "endDate": _end(3)},
+        {"slug": "empty", "question": "Empty strings", "outcomePrices": '["0.5", "0.5"]',
+         "volume": "", "liquidity": "", "endDate": ""},
+        {"slug": "nan", "question": "NaN numbers", "outcomePrices": '["0.6", "0.4"]',
+         "volume": float("nan"), "liquidity": "NaN", "endDate": _end(1)},
+        {"slug": "missing", "question": "Missing fields", "outcomePrices": '["0.2", "0.8"]'},
+        {"slug": "tokens", "question": "Token prices", "tokens": [{"price": "0.35"}],
+         "volume": 7000, "liquidity": 800, "endDate": "2030-01-01"},
+        {"slug": "bad-price", "question": "Bad price", "outcomePrices": '["abc", "0.5"]',
+         "volume": 100, "liquidity": 100},
+        {"slug": "null-price", "question": "Null price", "outcomePrices": [None, "0.5"],
+         "volume": 100, "liquidity": 100},
+        {"slug": "no-price", "question": "No price", "volume": 100, "liquidity": 100},
+        {"slug": "extreme", "question": "Extreme", "outcomePrices": '["0.995", "0.005"]',
+         "volume": 100, "liquidity": 100},
+        {"slug": "closed", "question": "Closed", "outcomePrices": '["0.5", "0.5"]', "closed": True},
+        {"slug": "bad-date", "question": "Bad date", "outcomePrices": '["0.5", "0.5"]',
+         "volume": 1, "liquidity": 1, "endDate": "not a date"},
+        {"slug": "ok", "question": "Duplicate slug", "outcomePrices": '["0.5", "0.5"]'},
+    ]
+    return base
+
+
+def _row_mode(page, cfg):
+    seen = set()
+    return [r for r in (filter_market(m, seen, cfg) for m in page) if r]
+
+
+CONFIGS = [
+    {},
+    {"min_liquidity": 400},
+    {"max_days_to_end": 4},
+    {"search": "btc,null", "exclude_keywords": "empty"},
+    {"min_liquidity": 1, "max_days_to_end": 30},
+]
+
+
+@pytest.mark.parametrize("overrides", CONFIGS)
+def test_batch_matches_row_mode(overrides):
+    cfg = ScoutConfig(**overrides)
+    page = _page()
+    rows = filter_page_batch(page, set(), cfg)
+    expected = _row_mode(page, cfg)
+    assert [r["Link"] for r in rows] == [r["Link"] for r in expected]
+    for got, want in zip(rows, expected):
+        for key in ("Title", "Volume", "Prob", "Liquidity", "Link"):
+            assert got[key] == want[key], key
+        # 两种模式各自取 "now"，跨越整点时天数可能差 1
+        assert abs(got["DaysToEnd"] - want["DaysToEnd"]) <= 1 or got["DaysToEnd"] == want["DaysToEnd"] == 999
+
+
+def test_null_liquidity_does_not_pass_liquidity_filter():
+    cfg = ScoutConfig(min_liquidity=1)
+    rows = filter_page_batch(_page(), set(), cfg)
+    links = {r["Link"].rsplit("/", 1)[-1] for r in rows}
+    assert not links & {"null-liq", "empty", "nan", "missing"}
+    assert all(not math.isnan(r["Liquidity"]) and not math.isnan(r["Volume"]) for r in rows)
+
+
+def test_dirty_value_does_not_zero_whole_column():
+    # 同页一个非数值不应把其它市场的数值一并清零 (结果与分页方式无关)
+    page = _page()
+    full = {r["Link"]: r for r in filter_page_batch(page, set(), ScoutConfig())}
+    solo = {r["Link"]: r for r in filter_page_batch(page[:1], set(), ScoutConfig())}
+    link = "https://polymarket.com/market/ok"
+    assert full[link]["Volume"] == solo[link]["Volume"] == 12000.0
+    assert full[link]["Liquidity"] == solo[link]["Liquidity"] == 3000.0
+
+
+@pytest.mark.parametrize("value, expected", [
+    (None, 0.0), ("", 0.0), ("abc", 0.0), (float("nan"), 0.0), ("NaN", 0.0),
+    ("12.5", 12.5), (7, 7.0), ([1], 0.0),
+])
+def test_to_float(value, expected):
+    assert to_float(value) == expected
+
+
+def test_float_column_is_per_element():
+    col = _float_column(["1", None, "x", float("nan"), 2.5])
+    assert col.tolist() == [1.0, 0.0, 0.0, 0.0, 2.5]
@@ -0,0 +1,22 @@
+"""http_client 配置: .env 中留空的设置项使用默认值"""
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _settings(**env):
+    code = "import http_client as h; print(h.HTTP_RETRIES, h.HTTP_BACKOFF)"
+    out = subprocess.run([sys.executable, "-c", code], cwd=ROOT, env={**os.environ, **env},
+                         capture_output=True, text=True, check=True).stdout
+    retries, backoff = out.split()
+    return int(retries), float(backoff)
+
+
+def test_blank_settings_use_defaults():
+    assert _settings(SCOUT_HTTP_RETRIES="", SCOUT_HTTP_BACKOFF="") == (3, 0.5)
+
+
+def test_explicit_zero_disables_retries():
+    assert _settings(SCOUT_HTTP_RETRIES="0", SCOUT_HTTP_BACKOFF="0") == (0, 0.0)
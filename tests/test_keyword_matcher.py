@@ -0,0 +1,43 @@
+"""KeywordMatcher 与逐词 `kw in text.lower()` 的 OR 匹配一致"""
+import random
+
+import pytest
+
+from scout import KeywordMatcher
+
+
+def _reference(keywords, text):
+    return any(k.strip().lower() in text for k in keywords if k.strip())
+
+
+@pytest.mark.parametrize("raw, text, expected", [
+    ("btc,eth", "will btc reach 100k?", True),
+    ("btc,eth", "will solana flip?", False),
+    (" Trump , TRUMP ,", "trump wins", True),
+    ("elect,election", "the election is near", True),
+    ("a.b,(x)", "axb", False),
+    ("a.b,(x)", "see (x)", True),
+    ("美联储", "美联储降息", True),
+])
+def test_search(raw, text, expected):
+    assert KeywordMatcher.from_csv(raw).search(text) is expected
+
+
+def test_empty_matcher():
+    matcher = KeywordMatcher.from_csv(" , ,")
+    assert not matcher
+    assert matcher.keywords == []
+    assert matcher.search("anything") is False
+
+
+def test_keywords_are_normalized():
+    assert KeywordMatcher.from_csv("ETH, btc ,eth").keywords == ["btc", "eth"]
+
+
+def test_matches_reference_on_random_keywords():
+    rng = random.Random(7)
+    alphabet = "abc.*"
+    for _ in range(300):
+        keywords = ["".join(rng.choices(alphabet, k=rng.randint(1, 4))) for _ in range(rng.randint(1, 6))]
+        text = "".join(rng.choices(alphabet + " ", k=rng.randint(0, 20)))
+        assert KeywordMatcher(keywords).search(text) is _reference(keywords, text), (keywords, text)
@@ -0,0 +1,33 @@
+"""parse_iso8601 与原先的 pd.to_datetime 解析结果一致"""
+from datetime import datetime, timezone
+
+import pytest
+
+from market_fields import parse_iso8601
+
+
+@pytest.mark.parametrize("value, expected", [
+    ("2026-03-01T12:30:00Z", datetime(2026, 3, 1, 12, 30, tzinfo=timezone.utc)),
+    ("2026-03-01T12:30:00.123456z", datetime(2026, 3, 1, 12, 30, 0, 123456, tzinfo=timezone.utc)),
+    ("2026-03-01T12:30:00+08:00", datetime(2026, 3, 1, 4, 30, tzinfo=timezone.utc)),
+    ("2026-03-01", datetime(2026, 3, 1, tzinfo=timezone.utc)),
+    ("2026-03-01 12:30", datetime(2026, 3, 1, 12, 30, tzinfo=timezone.utc)),
+])
+def test_iso_formats(value, expected):
+    assert parse_iso8601(value) == expected
+
+
+@pytest.mark.parametrize("value", [None, 0, 1.5, "", "not a date", "2026-13-45", "2026-W09-1"])
+def test_unparsable(value):
+    assert parse_iso8601(value) is None
+
+
+@pytest.mark.parametrize("value", [
+    "2026-03-01T12:30:00Z", "2026-03-01T12:30:00.5+02:00", "2026-03-01", "20260301",
+    "March 1, 2026", "2026/03/01 08:00",
+])
+def test_matches_pandas(value):
+    pd = pytest.importorskip("pandas")
+    ts = pd.to_datetime(value)
+    ts = ts.tz_localize("UTC") if ts.tzinfo is None else ts.tz_convert("UTC")
+    assert parse_iso8601(value) == ts.to_pydatetime()
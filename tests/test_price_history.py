@@ -0,0 +1,66 @@
+"""价格历史: 多个进程同时写入时槽位不丢失、不重复"""
+import json
+import multiprocessing
+import os
+
+import numpy as np
+
+from price_history import PriceHistory
+
+
+def _writer(path, prefix, rounds):
+    history = PriceHistory(path=path, capacity=1000, samples=8, step=300)
+    for i in range(rounds):
+        rows = [{'Link': f"{prefix}-{i}-{j}", 'Prob': 0.5, 'Volume': 100, 'Liquidity': 10} for j in range(5)]
+        history.record(rows, now=1000.0 + i)
+
+
+def test_concurrent_writers_keep_all_slots(tmp_path):
+    path = str(tmp_path)
+    ctx = multiprocessing.get_context("fork" if hasattr(os, "fork") else "spawn")
+    procs = [ctx.Process(target=_writer, args=(path, name, 20)) for name in ("cli", "server")]
+    for p in procs:
+        p.start()
+    for p in procs:
+        p.join(60)
+        assert p.exitcode == 0
+
+    with open(os.path.join(path, "meta.json"), encoding="utf-8") as f:
+        slots = json.load(f)["slots"]
+    assert len(slots) == 2 * 20 * 5
+    assert len(set(slots.values())) == len(slots)
+
+    history = PriceHistory(path=path, capacity=1000, samples=8, step=300)
+    deltas = history.prob_deltas(list(slots), [60], now=1100.0)
+    assert deltas.shape == (len(slots), 1)
+    prob = np.load(os.path.join(path, "prob.npy"), mmap_mode="r")
+    assert (prob[0, list(slots.values())] != 65535).all()
+
+
+def test_full_buffer_does_not_evict_markets_in_current_scan(tmp_path):
+    history = PriceHistory(path=str(tmp_path), capacity=2, samples=4, step=60)
+    row = lambda link, prob: {'Link': link, 'Prob': prob, 'Volume': 100, 'Liquidity': 10}
+    history.record([row("a", 0.2), row("b", 0.4)], now=100.0)
+    history.record([row("a", 0.3)], now=500.0)
+    # b 已有槽位但最久未出现；同批新市场 c 需要回收槽位时应回收 a 而不是 b
+    history.record([row("b", 0.5), row("c", 0.6)], now=900.0)
+
+    assert sorted(history.slots) == ["b", "c"]
+    deltas = history.prob_deltas(["b", "c"], [800], now=900.0)
+    assert abs(deltas[0, 0] - 0.1) < 1e-3  # b 的历史保留: 0.4 -> 0.5
+    assert np.isnan(deltas[1, 0])          # c 为新市场
+
+
+def test_meta_reloaded_only_when_changed(tmp_path):
+    path = str(tmp_path)
+    history = PriceHistory(path=path, capacity=10, samples=4, step=60)
+    rows = [{'Link': "a", 'Prob': 0.5, 'Volume': 1, 'Liquidity': 1}]
+    history.record(rows, now=100.0)
+    slots = history.slots
+    history.prob_deltas(["a"], [60], now=100.0)
+    assert history.slots is slots  # 自身写入后不重新解析
+
+    other = PriceHistory(path=path, capacity=10, samples=4, step=60)
+    other.record([{'Link': "b", 'Prob': 0.5, 'Volume': 1, 'Liquidity': 1}], now=200.0)
+    history.prob_deltas(["a"], [60], now=200.0)
+    assert set(history.slots) == {"a", "b"}
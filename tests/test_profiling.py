@@ -0,0 +1,45 @@
+"""性能剖析: cprofile 不可用时退回采样模式"""
+import cProfile
+import threading
+
+import profiling
+
+
+def _work():
+    return sum(i * i for i in range(20000))
+
+
+def test_cprofile_captures_threads(tmp_path):
+    with profiling.capture("cprofile") as cap:
+        t = threading.Thread(target=profiling.traced(_work))
+        t.start()
+        t.join()
+        _work()
+    assert cap.mode == "cprofile"
+    name = cap.save("test", directory=str(tmp_path))
+    assert (tmp_path / f"{name}.prof").exists()
+
+
+def test_only_one_cprofile_capture_per_process():
+    with profiling.capture("cprofile") as outer:
+        with profiling.capture("cprofile") as inner:
+            _work()
+    assert outer.mode == "cprofile"
+    assert inner.mode == "sample"
+    with profiling.capture("cprofile") as again:  # 前一次结束后恢复可用
+        pass
+    assert again.mode == "cprofile"
+
+
+def test_falls_back_to_sampler_when_profiler_is_busy(monkeypatch):
+    class BusyProfile:
+        def enable(self):
+            raise ValueError("Another profiling tool is already active")
+
+    monkeypatch.setattr(cProfile, "Profile", BusyProfile)
+    with profiling.capture("cprofile") as cap:
+        t = threading.Thread(target=profiling.traced(_work))
+        t.start()
+        t.join()
+    assert cap.mode == "sample"
+    assert cap._sampler is not None
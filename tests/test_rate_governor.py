@@ -0,0 +1,25 @@
+"""Retry-After 解析"""
+from email.utils import format_datetime
+from datetime import datetime, timezone
+
+import pytest
+
+from rate_governor import RETRY_AFTER_MAX, parse_retry_after
+
+
+@pytest.mark.parametrize("value, expected", [
+    ("5", 5.0), (" 1.5 ", 1.5), (0, 0.0), ("0", 0.0), ("-3", 0.0), (2.5, 2.5),
+    (None, None), ("", None), ("soon", None),
+    ("inf", None), ("-inf", None), ("nan", None), ("1e400", None),
+    ("1e12", RETRY_AFTER_MAX),
+])
+def test_parse_retry_after_seconds(value, expected):
+    assert parse_retry_after(value) == expected
+
+
+def test_parse_retry_after_http_date():
+    now = datetime(2026, 1, 1, tzinfo=timezone.utc).timestamp()
+    assert parse_retry_after("Thu, 01 Jan 2026 00:00:30 GMT", now=now) == 30.0
+    assert parse_retry_after("Wed, 31 Dec 2025 23:59:00 GMT", now=now) == 0.0
+    far = format_datetime(datetime(2030, 1, 1, tzinfo=timezone.utc), usegmt=True)
+    assert parse_retry_after(far, now=now) == RETRY_AFTER_MAX
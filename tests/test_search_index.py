@@ -0,0 +1,111 @@
+"""全文检索: 查询解析与倒排索引"""
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+import search_index
+from search_index import SearchIndex, parse_query, tokenize
+
+
+def _market(i, title, description="", volume=1000, **extra):
+    return {"id": str(i), "slug": f"m{i}", "question": title, "description": description,
+            "volume": volume, "liquidity": (volume or 0) / 10, "outcomePrices": '["0.4", "0.6"]', **extra}
+
+
+MARKETS = [
+    _market(1, "Will Bitcoin ETF be approved?", "SEC decision on spot bitcoin ETF", volume=5000),
+    _market(2, "Fed rate cut in March?", "Federal Reserve interest rate cut", volume=9000),
+    _market(3, "Will the rate stay flat?", "No cut expected", volume=100),
+    _market(4, "Ethereum ETF approval", "Spot ether fund", volume=3000),
+    _market(5, "美联储三月降息吗", "比特币 与 利率", volume=2000),
+    _market(6, "Election winner: Trump or Biden", "US presidential election", volume=7000),
+    _market(7, "Sports: NBA finals", "basketball election of MVP", volume=50),
+]
+
+
+@pytest.fixture
+def index():
+    return search_index.build(MARKETS)
+
+
+def _ids(res):
+    return [h["id"] for h in res["hits"]]
+
+
+def test_tokenize_latin_and_cjk():
+    assert tokenize("Bitcoin ETF-2025!") == ["bitcoin", "etf", "2025"]
+    assert tokenize("美联储降息") == ["美联", "联储", "储降", "降息"]
+    assert tokenize("比 BTC") == ["比", "btc"]
+
+
+def test_parse_query_operators():
+    clauses = parse_query('bitcoin "rate cut" -sports NOT nba trump OR biden elect*')
+    assert [(c.negated, c.alts) for c in clauses] == [
+        (False, [(["bitcoin"], False)]),
+        (False, [(["rate", "cut"], False)]),
+        (True, [(["sports"], False)]),
+        (True, [(["nba"], False)]),
+        (False, [(["trump"], False), (["biden"], False)]),
+        (False, [(["elect"], True)]),
+    ]
+    assert parse_query("AND OR !!!") == []
+
+
+def test_and_phrase_and_negation(index):
+    assert sorted(_ids(index.search("bitcoin etf"))) == ["1"]
+    assert sorted(_ids(index.search('"rate cut"'))) == ["2"]
+    assert sorted(_ids(index.search("rate -cut"))) == []
+    assert sorted(_ids(index.search("rate -march"))) == ["3"]
+    assert sorted(_ids(index.search("election -sports"))) == ["6"]
+
+
+def test_or_and_prefix(index):
+    assert sorted(_ids(index.search("bitcoin OR ethereum"))) == ["1", "4"]
+    assert sorted(_ids(index.search("appro*"))) == ["1", "4"]
+
+
+def test_cjk_bigram_and_single_char(index):
+    assert _ids(index.search("降息")) == ["5"]
+    assert _ids(index.search("美联储")) == ["5"]
+    assert _ids(index.search("储")) == ["5"]
+    assert _ids(index.search("币")) == ["5"]
+    assert _ids(index.search("鲸")) == []
+
+
+def test_sorting_and_title_boost(index):
+    res = index.search("election")
+    assert _ids(res) == ["6", "7"]  # 标题命中优先
+    assert _ids(index.search("etf", sort="volume")) == ["1", "4"]
+    assert index.search("etf", limit=1, offset=1)["total"] == 2
+
+
+def test_incremental_update_and_removal(index):
+    index.apply([_market(4, "Solana ETF approval", "Spot sol fund"), {**MARKETS[0], "closed": True}])
+    assert _ids(index.search("etf")) == ["4"]
+    assert _ids(index.search("ethereum")) == []
+    assert len(index) == len(MARKETS) - 1
+
+
+def test_compaction_keeps_results():
+    index = SearchIndex()
+    index.apply([_market(i, f"Market number {i}", "filler") for i in range(3000)])
+    index.apply([_market(i, f"Market number {i}", "filler", closed=True) for i in range(2000)])
+    assert index.stats()["dead"] == 0
+    assert index.search("market")["total"] == 1000
+    assert _ids(index.search("2500")) == ["2500"]
+
+
+def test_requires_positive_clause(index):
+    with pytest.raises(ValueError):
+        index.search("-bitcoin")
+
+
+def test_hit_fields_use_scan_parsers():
+    end = (datetime.now(timezone.utc) + timedelta(days=3, hours=1)).strftime("%Y-%m-%dT%H:%M:%SZ")
+    index = search_index.build([
+        _market(1, "Dated market", endDate=end),
+        _market(2, "Undated market", outcomePrices='["x"]', volume=None),
+    ])
+    hits = {h["id"]: h for h in index.search("market")["hits"]}
+    assert hits["1"]["DaysToEnd"] == 3 and hits["1"]["Prob"] == 0.4
+    assert hits["2"]["DaysToEnd"] == 999 and hits["2"]["Prob"] is None and hits["2"]["Volume"] == 0.0
@@ -0,0 +1,67 @@
+"""Web 服务结果缓存: 缓存命中与合并的请求仍推送到各自的 Webhook"""
+import threading
+import time
+
+import pytest
+
+pytest.importorskip("flask")
+
+import scout
+import server
+
+
+@pytest.fixture
+def fake_scan(monkeypatch):
+    release = threading.Event()
+    pushed = []
+    calls = []
+
+    def scout_job(params, progress=None):
+        calls.append(params)
+        release.wait(10)
+        cfg = server._job_config(params)
+        result = scout.ScoutResult(rows=[{"Title": "m", "Volume": 1.0, "Prob": 0.5, "Liquidity": 0.0,
+                                          "DaysToEnd": 1, "Link": "N/A"}], header="", tag_info="", started_at=0.0)
+        scout.push_webhook(result, cfg)
+        return result, ""
+
+    monkeypatch.setattr(server, "_scout_job", scout_job)
+    monkeypatch.setattr(scout, "push_webhook", lambda result, cfg, console=None: pushed.append(cfg.webhook_url))
+    monkeypatch.setattr(server, "RESULT_CACHE", server.OrderedDict())
+    monkeypatch.setattr(server, "INFLIGHT", {})
+    return release, pushed, calls
+
+
+def test_hit_and_coalesced_requests_push_to_their_own_webhook(fake_scan):
+    release, pushed, calls = fake_scan
+    base = {"SCOUT_TAG": "", "SCOUT_SEARCH": "test-webhook-cache"}
+    first, status = server.submit_job({**base, "SCOUT_WEBHOOK_URL": "https://a.example/hook"})
+    assert status == "miss"
+    joined, status = server.submit_job({**base, "SCOUT_WEBHOOK_URL": "https://b.example/hook"})
+    assert status == "coalesced" and joined is first
+    release.set()
+    assert first.wait_finished(10)
+
+    cached, status = server.submit_job({**base, "SCOUT_WEBHOOK_URL": "https://c.example/hook"})
+    assert status == "hit" and cached is first
+    silent, status = server.submit_job(base)
+    assert status == "hit"
+
+    # 合并的请求在任务线程收尾时推送
+    deadline = time.time() + 5
+    while len(pushed) < 3 and time.time() < deadline:
+        time.sleep(0.01)
+    assert len(calls) == 1
+    assert sorted(pushed) == ["https://a.example/hook", "https://b.example/hook", "https://c.example/hook"]
+
+
+def test_webhook_dispatcher_starts_once_on_first_request(monkeypatch):
+    import webhooks
+    started = []
+    monkeypatch.setattr(server, "_dispatcher_started", False)
+    monkeypatch.setattr(webhooks.dispatcher, "drain", lambda: started.append("drain"))
+    monkeypatch.setattr(webhooks.dispatcher, "start_background", lambda interval=60.0: started.append("loop"))
+    client = server.app.test_client()
+    client.get("/api/webhooks")
+    client.get("/api/webhooks")
+    assert started == ["drain", "loop"]
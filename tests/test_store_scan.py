@@ -0,0 +1,30 @@
+"""快照模式: 扫描时限从快照同步完成后起算"""
+import io
+import time
+
+import market_store
+import scout
+from scout import PlainConsole, ScoutConfig
+
+
+def _market(i):
+    return {"id": str(i), "slug": f"m{i}", "question": f"Market {i}", "outcomePrices": '["0.5", "0.5"]',
+            "volume": 10000 + i, "liquidity": 1000, "updatedAt": f"2026-01-01T00:00:{i:02d}Z"}
+
+
+def test_slow_full_sync_does_not_time_out_scan(tmp_path, monkeypatch):
+    store = market_store.MarketStore(str(tmp_path / "markets.db"))
+    monkeypatch.setattr(market_store, "store", store)
+
+    def slow_sync(cfg, tag_id, deadline=None, console=None):
+        # 全量同步使用独立时限，可以超过 runtime_limit
+        time.sleep(1.2)
+        store.apply("global", [_market(i) for i in range(5)], "2026-01-01T00:00:04Z", full=True)
+
+    monkeypatch.setattr(scout, "sync_market_store", slow_sync)
+    cfg = ScoutConfig(store=True, runtime_limit=1, min_volume=0)
+    result = scout.run_scout(cfg, console=PlainConsole(io.StringIO()))
+
+    assert not result.timed_out
+    assert result.total_count == 5
+    assert result.markets_scanned == 5
@@ -0,0 +1,73 @@
+"""TopKRanker 与整表排序 (sorted(..., reverse=True)) 的结果一致"""
+import random
+
+import pytest
+
+from scout import SORT_KEYS, ScoutConfig, TopKRanker
+
+
+def _rows(n, seed=3):
+    rng = random.Random(seed)
+    # 取值范围较小，制造大量同分，检验同分时先到达者在前
+    return [{"Title": f"m{i}", "Volume": float(rng.randint(0, 20) * 1000), "Prob": rng.choice([0.05, 0.3, 0.5, 0.9]),
+             "Liquidity": float(rng.randint(0, 5)), "DaysToEnd": rng.randint(0, 10)} for i in range(n)]
+
+
+@pytest.mark.parametrize("order_by", ["volume", "liquidity", "enddate", "prob"])
+def test_matches_full_sort(order_by):
+    cfg = ScoutConfig(order_by=order_by, min_volume=5000, min_prob=0.15, max_prob=0.85)
+    rows = _rows(500)
+    ranker = TopKRanker(cfg, vibe_k=50, all_k=20)
+    for row in rows:
+        ranker.push(row)
+
+    key = SORT_KEYS[order_by]
+    vibe = [r for r in rows if r["Volume"] > cfg.min_volume and cfg.min_prob <= r["Prob"] <= cfg.max_prob]
+    assert ranker.vibe_rows() == sorted(vibe, key=key, reverse=True)[:50]
+    assert ranker.all_rows() == sorted(rows, key=key, reverse=True)[:20]
+    assert ranker.total == len(rows)
+    assert ranker.vibe_count == len(vibe)
+    assert ranker.filtered_by_prob == sum(not (cfg.min_prob <= r["Prob"] <= cfg.max_prob) for r in rows)
+    assert ranker.filtered_by_volume == sum(r["Volume"] <= cfg.min_volume for r in rows)
+
+
+def test_fewer_rows_than_k():
+    ranker = TopKRanker(ScoutConfig(min_volume=0, min_prob=0, max_prob=1), vibe_k=50, all_k=20)
+    rows = _rows(5)
+    for row in rows:
+        ranker.push(row)
+    assert ranker.all_rows() == sorted(rows, key=SORT_KEYS["volume"], reverse=True)
+    assert len(ranker.vibe_rows()) == 5
+
+
+def test_unknown_order_falls_back_to_volume():
+    ranker = TopKRanker(ScoutConfig(order_by="nope"))
+    assert ranker.key is SORT_KEYS["volume"]
+
+
+def test_enddate_ranks_soonest_first():
+    cfg = ScoutConfig(order_by="enddate", min_volume=0, min_prob=0, max_prob=1)
+    rows = [{"Title": t, "Volume": 1.0, "Prob": 0.5, "DaysToEnd": d}
+            for t, d in (("undated", 999), ("far", 200), ("soon", 2), ("today", 0), ("mid", 30))]
+    ranker = TopKRanker(cfg, vibe_k=3, all_k=5)
+    for row in rows:
+        ranker.push(row)
+    assert [r["Title"] for r in ranker.all_rows()] == ["today", "soon", "mid", "far", "undated"]
+    assert [r["Title"] for r in ranker.vibe_rows()] == ["today", "soon", "mid"]
+
+
+def test_run_scout_enddate_order():
+    import io
+    from datetime import datetime, timedelta, timezone
+    from scout import PlainConsole, run_scout
+
+    now = datetime.now(timezone.utc)
+    end = lambda days: (now + timedelta(days=days, hours=1)).strftime("%Y-%m-%dT%H:%M:%SZ")
+    page = [{"slug": f"m{i}", "question": f"Market {i}", "outcomePrices": '["0.5", "0.5"]',
+             "volume": 10000 + i, "liquidity": 100, "endDate": end(d) if d is not None else ""}
+            for i, d in enumerate([40, None, 3, 120, 1, 9])]
+    cfg = ScoutConfig(order_by="enddate", min_volume=0)
+    result = run_scout(cfg, console=PlainConsole(io.StringIO()), source=lambda *args: iter([page]))
+    days = [r["DaysToEnd"] for r in result.rows]
+    assert days[0] == min(days) == 1
+    assert days == sorted(days) and days[-1] == 999
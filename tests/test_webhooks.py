@@ -0,0 +1,77 @@
+"""Webhook 发件箱: 限速等待期间租约保持有效，空闲时不消耗额度"""
+import sqlite3
+import time
+
+import webhooks
+from webhooks import Message, WebhookDispatcher, parse_targets
+
+
+class _Resp:
+    status_code = 200
+    headers = {}
+
+    def raise_for_status(self):
+        pass
+
+
+class _Governor:
+    """前若干次取额度失败 (模拟限流暂停)，并记录每次取额度时被租用消息的租约是否仍有效"""
+
+    def __init__(self, path, busy=0):
+        self.path = path
+        self.busy = busy
+        self.calls = 0
+        self.lease_ok = []
+
+    def acquire(self, deadline):
+        self.calls += 1
+        conn = sqlite3.connect(self.path)
+        try:
+            leases = [r[0] for r in conn.execute("SELECT lease_until FROM outbox WHERE lease_until > 0")]
+        finally:
+            conn.close()
+        self.lease_ok.append(len(leases) == 1 and leases[0] > time.time())
+        if self.busy:
+            self.busy -= 1
+            return None
+        return 0.0
+
+    def success(self):
+        pass
+
+    def throttle(self, retry_after=None):
+        pass
+
+
+def _dispatcher(tmp_path, monkeypatch, busy=0):
+    path = str(tmp_path / "webhooks.db")
+    dispatcher = WebhookDispatcher(path=path)
+    governor = _Governor(path, busy)
+    monkeypatch.setattr(dispatcher, "_governor", lambda key: governor)
+    sent = []
+    monkeypatch.setattr(webhooks.http, "post", lambda url, data=None, **kw: sent.append(data) or _Resp())
+    return dispatcher, governor, sent
+
+
+def test_budget_is_taken_while_holding_a_valid_lease(tmp_path, monkeypatch):
+    monkeypatch.setattr(webhooks, "LEASE_WAIT_STEP", 0.05)
+    monkeypatch.setattr(webhooks, "LEASE_SECONDS", 0.2)
+    dispatcher, governor, sent = _dispatcher(tmp_path, monkeypatch, busy=6)
+
+    message = Message(title="Report", items=[f"item {i} " + "x" * 500 for i in range(10)])
+    targets, rows = dispatcher.submit(message, parse_targets("https://discord.com/api/webhooks/1/abc"))
+    assert dispatcher.flush(timeout=10)
+
+    assert rows > 1 and len(sent) == rows
+    assert governor.lease_ok and all(governor.lease_ok)  # 限流等待跨越多个租约时长，期间持续续租
+    assert dispatcher.status()['pending'] == 0
+
+
+def test_idle_drain_does_not_take_budget(tmp_path, monkeypatch):
+    dispatcher, governor, sent = _dispatcher(tmp_path, monkeypatch)
+    dispatcher.submit(Message(title="Report", items=["one"]), parse_targets("https://example.com/hook"))
+    assert dispatcher.flush(timeout=10)
+    calls = governor.calls
+    dispatcher.drain()
+    dispatcher._drain_target(parse_targets("https://example.com/hook")[0].key)
+    assert governor.calls == calls == len(sent) == 1
@@ -0,0 +1,481 @@
+"""Webhook 推送分发器 (scout.py / server.py 共用)
+
+- 多目标: SCOUT_WEBHOOK_URL 可填多个地址 (逗号或换行分隔)，按地址识别 Discord / Slack，
+  其余按通用 JSON 发送；也可用 discord: / slack: / json: 前缀显式指定
+- 分段: 报告按条目拆成多条消息，每条不超过目标平台的单条长度上限 (Discord 2000 字符 / Slack 4000 字符)，
+  通用 JSON 整份发送并附带结构化数据
+- 限速: 每个目标一个令牌桶 (复用 rate_governor，状态存于 .cache/webhooks.db，CLI 与 Web 服务共用)，
+  429 按 Retry-After 暂停
+- 持久化: 消息先写入 .cache/webhooks.db 的发件箱再由后台线程发送，成功后删除；失败按指数退避重试，
+  由之后的侦察 (或 Web 服务的后台巡检) 继续投递，4xx (除 408/429) 与超过最大重试次数 / 最长保留时间的消息丢弃
+- 同一目标的消息按入队顺序逐条发送 (分段不会乱序)，不同目标并发；侦察本身从不等待推送
+"""
+import os
+import re
+import json
+import time
+import random
+import sqlite3
+import hashlib
+import threading
+from dataclasses import dataclass, field
+from typing import Any, Dict, List
+
+from http_client import client as http
+from rate_governor import RateGovernor, parse_retry_after
+
+CACHE_DIR = ".cache"
+DB_FILE = os.path.join(CACHE_DIR, "webhooks.db")
+
+WEBHOOK_TIMEOUT = float(os.getenv("SCOUT_WEBHOOK_TIMEOUT", 10) or 10)                # 单次推送超时 (秒)
+WEBHOOK_MAX_ATTEMPTS = int(os.getenv("SCOUT_WEBHOOK_MAX_ATTEMPTS", 8) or 8)          # 最多投递次数
+WEBHOOK_MAX_AGE = float(os.getenv("SCOUT_WEBHOOK_MAX_AGE", 86400) or 86400)          # 消息最长保留 (秒)
+WEBHOOK_RETRY_BASE = float(os.getenv("SCOUT_WEBHOOK_RETRY_BASE", 30) or 30)          # 首次重试间隔 (秒)，之后翻倍
+WEBHOOK_RETRY_MAX = 3600.0                                                            # 重试间隔上限 (秒)
+WEBHOOK_FLUSH_TIMEOUT = float(os.getenv("SCOUT_WEBHOOK_FLUSH_TIMEOUT", 15) or 0)     # CLI 退出前最多等待推送的秒数
+LEASE_SECONDS = WEBHOOK_TIMEOUT + 20  # 发送中的消息被其它进程视为占用的时长
+LEASE_WAIT_STEP = 10.0                # 持有租约等待限速额度时每段的最长等待 (秒)，每段之间续租
+
+# 各平台单条消息长度上限与限速 (次/秒, 突发)；Discord webhook 为每 2 秒 5 次
+PLATFORMS = {
+    'discord': {'limit': 2000, 'rate': 2.5, 'burst': 5},
+    'slack': {'limit': 4000, 'rate': 1.0, 'burst': 1},
+    'json': {'limit': None, 'rate': 5.0, 'burst': 5},
+}
+USERNAME = "Mikon Scout Army"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS outbox (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    target TEXT NOT NULL,
+    url TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    next_at REAL NOT NULL,
+    lease_until REAL NOT NULL DEFAULT 0,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    last_error TEXT NOT NULL DEFAULT ''
+);
+CREATE INDEX IF NOT EXISTS outbox_target ON outbox (target, id);
+"""
+
+
+# ---------- 目标与消息 ----------
+
+@dataclass(frozen=True)
+class Target:
+    kind: str
+    url: str
+
+    @property
+    def key(self):
+        """目标标识 (不暴露地址中的令牌)"""
+        return f"{self.kind}-{hashlib.sha1(self.url.encode('utf-8')).hexdigest()[:10]}"
+
+    @property
+    def label(self):
+        """日志中显示的目标: 平台 + 主机名"""
+        host = re.sub(r"^\w+://", "", self.url).split("/", 1)[0]
+        return f"{self.kind}:{host}"
+
+
+def detect_kind(url):
+    host = re.sub(r"^\w+://", "", url).split("/", 1)[0].lower()
+    if host.endswith(("discord.com", "discordapp.com")):
+        return 'discord'
+    if host.endswith("slack.com"):
+        return 'slack'
+    return 'json'
+
+
+def parse_targets(value):
+    """SCOUT_WEBHOOK_URL -> [Target]，去重并保持顺序"""
+    targets = []
+    for item in re.split(r"[,\s]+", str(value or "")):
+        if not item:
+            continue
+        kind, sep, rest = item.partition(":")
+        if sep and kind.lower() in PLATFORMS and not rest.startswith("//"):
+            target = Target(kind.lower(), rest)
+        else:
+            target = Target(detect_kind(item), item)
+        if target.url and target not in targets:
+            targets.append(target)
+    return targets
+
+
+@dataclass
+class Message:
+    """一份待推送的报告: 标题行 + 若干条目 (每个条目为不可拆分的文本块) + 结尾，data 为通用 JSON 目标附带的结构化数据"""
+    title: str
+    header: List[str] = field(default_factory=list)
+    items: List[str] = field(default_factory=list)
+    footer: List[str] = field(default_factory=list)
+    data: Dict[str, Any] = field(default_factory=dict)
+
+    def text(self):
+        return "\n".join([self.title, *self.header, *self.items, *self.footer])
+
+
+def _slack_markup(text):
+    """Discord markdown -> Slack mrkdwn (粗体 / 删除线；<链接> 两者通用)"""
+    text = re.sub(r"\*\*(.+?)\*\*", r"*\1*", text)
+    return re.sub(r"~~(.+?)~~", r"~\1~", text)
+
+
+def _split_block(block, limit):
+    """超长的单个文本块按行、再按字符硬切"""
+    parts, current = [], ""
+    for line in block.split("\n"):
+        while len(line) > limit:
+            if current:
+                parts.append(current)
+                current = ""
+            parts.append(line[:limit])
+            line = line[limit:]
+        candidate = f"{current}\n{line}" if current else line
+        if len(candidate) > limit:
+            parts.append(current)
+            candidate = line
+        current = candidate
+    if current:
+        parts.append(current)
+    return parts
+
+
+def chunk_message(message, limit):
+    """把报告拆成每段不超过 limit 字符的文本；条目不会被拆到两段，续段标题带 (续 i/n)"""
+    head = "\n".join([message.title, *message.header])
+    if limit is None:
+        return [message.text()]
+    marker_room = len(" (续 99/99)")
+    cont_limit = limit - len(message.title) - marker_room - 1
+    blocks = list(message.items) + (["\n".join(message.footer)] if message.footer else [])
+
+    chunks, current = [], head[:limit]
+    for block in blocks:
+        room = cont_limit if chunks else limit
+        for piece in _split_block(block, max(1, cont_limit)):
+            candidate = f"{current}\n{piece}" if current else piece
+            if len(candidate) <= room:
+                current = candidate
+                continue
+            chunks.append(current)
+            room = cont_limit
+            current = piece
+    if current or not chunks:
+        chunks.append(current)
+    if len(chunks) == 1:
+        return chunks
+    total = len(chunks)
+    return [chunks[0]] + [f"{message.title} (续 {i}/{total})\n{c}" for i, c in enumerate(chunks[1:], 2)]
+
+
+def build_payloads(message, target):
+    """按目标平台生成请求体列表 (分段后的多条消息)"""
+    spec = PLATFORMS[target.kind]
+    if target.kind == 'json':
+        return [{'title': message.title, 'text': message.text(), **message.data}]
+    chunks = chunk_message(message, spec['limit'])
+    if target.kind == 'slack':
+        return [{'text': _slack_markup(c)} for c in chunks]
+    return [{'content': c, 'username': USERNAME} for c in chunks]
+
+
+# ---------- 分发器 ----------
+
+class PermanentError(Exception):
+    """目标拒绝 (4xx)，重试无意义"""
+
+
+class WebhookDispatcher:
+    """持久化发件箱 + 每目标一个发送线程 (线程安全，可多进程共用同一发件箱)"""
+
+    def __init__(self, path=DB_FILE, timeout=WEBHOOK_TIMEOUT, max_attempts=WEBHOOK_MAX_ATTEMPTS,
+                 max_age=WEBHOOK_MAX_AGE, retry_base=WEBHOOK_RETRY_BASE):
+        self.path = path
+        self.timeout = timeout
+        self.max_attempts = max(1, max_attempts)
+        self.max_age = max_age
+        self.retry_base = retry_base
+        self._lock = threading.Lock()
+        self._idle = threading.Condition(self._lock)
+        self._initialized = False
+        self._workers = {}    # target key -> 发送线程
+        self._governors = {}  # target key -> RateGovernor
+        self._stats = {'queued': 0, 'sent': 0, 'failed': 0, 'dropped': 0, 'throttled': 0}
+        self._background = None
+
+    # ---------- 发件箱 ----------
+
+    def _connect(self):
+        if not self._initialized:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=10)
+            try:
+                conn.executescript(SCHEMA)
+            finally:
+                conn.close()
+            self._initialized = True
+        return sqlite3.connect(self.path, timeout=10, isolation_level=None)
+
+    def _count(self, key, n=1):
+        with self._lock:
+            self._stats[key] += n
+
+    def _claim(self, target_key):
+        """原子地取出目标队首的到期消息并加租约；队首未到期或被占用时返回 None (保证同一目标按顺序发送)"""
+        conn = self._connect()
+        try:
+            while True:
+                conn.execute("BEGIN IMMEDIATE")
+                now = time.time()
+                row = conn.execute(
+                    "SELECT id, url, payload, created_at, next_at, lease_until, attempts FROM outbox "
+                    "WHERE target = ? ORDER BY id LIMIT 1", (target_key,)
+                ).fetchone()
+                if row is None or row[4] > now or row[5] > now:
+                    conn.execute("COMMIT")
+                    return None
+                if now - row[3] > self.max_age:
+                    conn.execute("DELETE FROM outbox WHERE id = ?", (row[0],))
+                    conn.execute("COMMIT")
+                    self._count('dropped')
+                    continue
+                conn.execute("UPDATE outbox SET lease_until = ? WHERE id = ?", (now + LEASE_SECONDS, row[0]))
+                conn.execute("COMMIT")
+                return {'id': row[0], 'url': row[1], 'payload': row[2], 'attempts': row[6]}
+        finally:
+            conn.close()
+
+    def _finish(self, row, error=None, permanent=False, retry_in=None):
+        """发送成功或放弃时删除消息，否则记录错误并按指数退避安排下次投递"""
+        conn = self._connect()
+        try:
+            attempts = row['attempts'] + 1
+            if error is None or permanent or attempts >= self.max_attempts:
+                conn.execute("DELETE FROM outbox WHERE id = ?", (row['id'],))
+                return True
+            if retry_in is None:
+                retry_in = min(WEBHOOK_RETRY_MAX, self.retry_base * (2 ** (attempts - 1)))
+                retry_in *= random.uniform(0.8, 1.2)
+            conn.execute("UPDATE outbox SET attempts = ?, next_at = ?, lease_until = 0, last_error = ? WHERE id = ?",
+                         (attempts, time.time() + retry_in, str(error)[:500], row['id']))
+            return False
+        finally:
+            conn.close()
+
+    def _renew(self, row):
+        conn = self._connect()
+        try:
+            conn.execute("UPDATE outbox SET lease_until = ? WHERE id = ?", (time.time() + LEASE_SECONDS, row['id']))
+        finally:
+            conn.close()
+
+    def _release(self, row):
+        conn = self._connect()
+        try:
+            conn.execute("UPDATE outbox SET lease_until = 0 WHERE id = ?", (row['id'],))
+        finally:
+            conn.close()
+
+    def _pending_targets(self, due_only=True):
+        conn = self._connect()
+        try:
+            sql = "SELECT DISTINCT target FROM outbox" + (" WHERE next_at <= ?" if due_only else "")
+            return [r[0] for r in conn.execute(sql, (time.time(),) if due_only else ())]
+        finally:
+            conn.close()
+
+    # ---------- 发送 ----------
+
+    def _governor(self, target_key):
+        with self._lock:
+            gov = self._governors.get(target_key)
+            if gov is None:
+                spec = PLATFORMS.get(target_key.split("-", 1)[0], PLATFORMS['json'])
+                gov = self._governors[target_key] = RateGovernor(
+                    path=self.path, max_rate=spec['rate'], burst=spec['burst'],
+                    min_rate=spec['rate'] / 4, step=spec['rate'] / 5, name=target_key)
+            return gov
+
+    @staticmethod
+    def _acquire(governor):
+        """等待目标的发送额度 (限流暂停期间可能等待较久)，超时返回 False"""
+        return governor.acquire(time.time() + WEBHOOK_RETRY_MAX) is not None
+
+    def _acquire_leased(self, row, governor):
+        """已取得消息租约后等待发送额度: 分段等待并在每段之间续租，
+        限流暂停再长也不会让租约在发送前过期 (否则其它进程会重复发送)；超过 WEBHOOK_RETRY_MAX 返回 False"""
+        deadline = time.time() + WEBHOOK_RETRY_MAX
+        while True:
+            if governor.acquire(min(deadline, time.time() + LEASE_WAIT_STEP)) is not None:
+                return True
+            if time.time() + LEASE_WAIT_STEP > deadline:
+                return False
+            time.sleep(LEASE_WAIT_STEP)
+            self._renew(row)
+
+    def _post(self, url, payload, governor):
+        """发送一条消息 (调用方需先通过 _acquire 取得额度)；返回 None 表示成功，否则抛出异常 (429 时返回需要等待的秒数)"""
+        resp = http.post(url, data=payload.encode('utf-8'), headers={'Content-Type': 'application/json'},
+                         timeout=self.timeout, retries=0)
+        if resp.status_code == 429:
+            retry_after = parse_retry_after(resp.headers.get('Retry-After'))
+            if retry_after is None:
+                try:
+                    retry_after = parse_retry_after(resp.json().get('retry_after'))  # Discord 在正文中给出
+                except (ValueError, TypeError, AttributeError):
+                    retry_after = None
+            governor.throttle(retry_after)
+            self._count('throttled')
+            return retry_after if retry_after is not None else 2.0
+        if 400 <= resp.status_code < 500 and resp.status_code != 408:
+            raise PermanentError(f"HTTP {resp.status_code}: {resp.text[:200]}")
+        resp.raise_for_status()
+        governor.success()
+        return None
+
+    def _drain_target(self, target_key):
+        governor = self._governor(target_key)
+        try:
+            while True:
+                # 先取消息再取额度: 队列为空时不消耗令牌
+                row = self._claim(target_key)
+                if row is None:
+                    return
+                if not self._acquire_leased(row, governor):
+                    self._release(row)
+                    return
+                try:
+                    retry_after = self._post(row['url'], row['payload'], governor)
+                except PermanentError as e:
+                    self._finish(row, e, permanent=True)
+                    self._count('dropped')
+                    continue
+                except Exception as e:
+                    if self._finish(row, e):
+                        self._count('dropped')
+                    else:
+                        self._count('failed')
+                    return
+                if retry_after is None:
+                    self._finish(row)
+                    self._count('sent')
+                elif retry_after <= self.retry_base:
+                    # 短暂限流: 释放租约 (不计入重试次数)，等待在下一轮 acquire 中完成
+                    self._release(row)
+                else:
+                    self._finish(row, "429", retry_in=retry_after)
+                    self._count('failed')
+                    return
+        finally:
+            with self._lock:
+                self._workers.pop(target_key, None)
+                self._idle.notify_all()
+
+    def _kick(self, target_keys):
+        """为有待发消息的目标启动发送线程 (已在运行的不重复启动)"""
+        with self._lock:
+            for key in target_keys:
+                if key in self._workers:
+                    continue
+                worker = threading.Thread(target=self._drain_target, args=(key,),
+                                          name=f"webhook-{key}", daemon=True)
+                self._workers[key] = worker
+                worker.start()
+
+    # ---------- 对外接口 ----------
+
+    def submit(self, message, urls):
+        """把报告按各目标分段写入发件箱并立即在后台发送，返回 (目标数, 消息条数)；不等待网络"""
+        targets = parse_targets(urls) if isinstance(urls, str) else list(urls)
+        if not targets:
+            return 0, 0
+        now = time.time()
+        rows = [(t.key, t.url, json.dumps(p, ensure_ascii=False), now, now)
+                for t in targets for p in build_payloads(message, t)]
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.executemany("INSERT INTO outbox (target, url, payload, created_at, next_at) VALUES (?, ?, ?, ?, ?)", rows)
+            conn.execute("COMMIT")
+        finally:
+            conn.close()
+        self._count('queued', len(rows))
+        self._kick(sorted({t.key for t in targets}))
+        return len(targets), len(rows)
+
+    def send_now(self, message, target):
+        """同步发送到单个目标 (Target 或地址，不经发件箱，用于测试推送)，返回错误信息或 None"""
+        if not isinstance(target, Target):
+            target = parse_targets(target)[0]
+        governor = self._governor(target.key)
+        try:
+            for payload in build_payloads(message, target):
+                if not self._acquire(governor):
+                    return "限速等待超时"
+                retry_after = self._post(target.url, json.dumps(payload, ensure_ascii=False), governor)
+                if retry_after is not None:
+                    return f"被限流，请 {retry_after:.0f}s 后再试"
+        except Exception as e:
+            return str(e)
+        return None
+
+    def drain(self):
+        """投递发件箱中已到期的消息 (包括之前的进程遗留的)，返回启动发送的目标数"""
+        if not self._initialized and not os.path.exists(self.path):
+            return 0
+        try:
+            keys = self._pending_targets()
+        except sqlite3.Error:
+            return 0
+        self._kick(keys)
+        return len(keys)
+
+    def flush(self, timeout=WEBHOOK_FLUSH_TIMEOUT):
+        """等待进行中的发送结束 (最多 timeout 秒)，返回是否全部结束；未成功的消息留在发件箱中"""
+        deadline = time.time() + max(0.0, timeout)
+        with self._lock:
+            return self._idle.wait_for(lambda: not self._workers, max(0.0, deadline - time.time()))
+
+    def start_background(self, interval=60.0):
+        """常驻进程 (Web 服务 / 持续监控) 定期投递到期的重试"""
+        with self._lock:
+            if self._background is not None:
+                return
+
+            def loop():
+                while True:
+                    time.sleep(interval)
+                    self.drain()
+
+            self._background = threading.Thread(target=loop, name="webhook-retry", daemon=True)
+        self._background.start()
+
+    def status(self):
+        """发件箱积压 (按目标) 与本进程的投递统计"""
+        with self._lock:
+            data = dict(self._stats)
+            data['sending'] = len(self._workers)
+        rows = []
+        if self._initialized or os.path.exists(self.path):  # 从未推送过时不创建发件箱
+            try:
+                conn = self._connect()
+                try:
+                    rows = conn.execute("SELECT target, COUNT(*), MIN(created_at), MAX(attempts), "
+                                        "(SELECT last_error FROM outbox o2 WHERE o2.target = o.target ORDER BY id LIMIT 1) "
+                                        "FROM outbox o GROUP BY target").fetchall()
+                finally:
+                    conn.close()
+            except sqlite3.Error:
+                rows = []
+        now = time.time()
+        data['pending'] = sum(r[1] for r in rows)
+        data['targets'] = [{'target': r[0], 'pending': r[1], 'oldest_age_s': round(now - r[2], 1),
+                            'max_attempts': r[3], 'last_error': r[4]} for r in rows]
+        return data
+
+
+# 进程内共享的分发器实例 (发件箱与各目标限速额度通过 SQLite 跨进程共享)
+dispatcher = WebhookDispatcher()